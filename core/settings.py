@@ -29,6 +29,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     
     # Apps de terceiros
     'django_htmx',
@@ -49,6 +50,7 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'django_htmx.middleware.HtmxMiddleware',  # HTMX
+    'missoes.middleware.EscopoMiddleware',  # Escopo de acesso do usuário
 ]
 
 ROOT_URLCONF = 'core.urls'
@@ -88,6 +90,59 @@ DATABASES = {
     }
 }
 
+# ============================================================
+# 🗃️ CACHE
+# ============================================================
+# Padrão: tabela no PostgreSQL (DatabaseCache), criada pelo migrate e
+# compartilhada pelos workers web e pelo worker processar_importacoes. As
+# versões de invalidação (missoes/cache.py) e os ETags dependem disso: com
+# um cache por processo, uma edição em um worker não invalidaria os demais.
+#   REDIS_URL   - Redis (ex.: Render Key Value), mais rápido, compartilhado entre serviços
+#   CACHE_DIR   - arquivos; compartilhado só entre processos da mesma máquina
+#   CACHE_LOCAL - memória de cada processo: apenas com um único processo (runserver)
+REDIS_URL = config('REDIS_URL', default='')
+CACHE_DIR = config('CACHE_DIR', default='')
+CACHE_LOCAL = config('CACHE_LOCAL', default=False, cast=bool)
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'TIMEOUT': 300,
+        }
+    }
+elif CACHE_DIR:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': CACHE_DIR,
+            'TIMEOUT': 300,
+        }
+    }
+elif CACHE_LOCAL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'sigem',
+            'TIMEOUT': 300,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'sigem_cache',
+            'TIMEOUT': 300,
+        }
+    }
+
+# ============================================================
+# 📑 PAGINAÇÃO
+# ============================================================
+# True: tabelas administrativas paginam por cursor (keyset) por padrão.
+# Cada requisição pode escolher com ?paginacao=cursor ou ?paginacao=numero.
+PAGINACAO_CURSOR = config('PAGINACAO_CURSOR', default=False, cast=bool)
+
 # ============================================================
 # 🔑 VALIDAÇÃO DE SENHA
 # ============================================================
@@ -132,6 +187,16 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# ============================================================
+# 📤 IMPORTAÇÃO DE PLANILHAS
+# ============================================================
+# Tamanho máximo da planilha enviada (bytes). O upload vai direto para um
+# arquivo temporário (nunca inteiro em memória) e é lido em modo streaming.
+IMPORTACAO_TAMANHO_MAXIMO = config('IMPORTACAO_TAMANHO_MAXIMO', default=20 * 1024 * 1024, cast=int)
+# Segundos sem sinal do worker para uma importação em andamento ser dada
+# como interrompida (worker encerrado, deploy) e marcada como falha.
+IMPORTACAO_TEMPO_SEM_SINAL = config('IMPORTACAO_TEMPO_SEM_SINAL', default=600, cast=int)
+
 # ============================================================
 # 🔗 CONFIGURAÇÕES DE LOGIN
 # ============================================================
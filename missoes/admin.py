@@ -6,7 +6,7 @@
 
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import Oficial, Missao, Designacao, Unidade, Usuario, SolicitacaoDesignacao
+from .models import Oficial, Missao, Designacao, Unidade, Usuario, SolicitacaoDesignacao, ImportacaoPlanilha
 
 
 @admin.register(Oficial)
@@ -66,6 +66,13 @@ class SolicitacaoDesignacaoAdmin(admin.ModelAdmin):
     search_fields = ['nome_missao', 'solicitante__nome']
 
 
+@admin.register(ImportacaoPlanilha)
+class ImportacaoPlanilhaAdmin(admin.ModelAdmin):
+    list_display = ['nome_arquivo', 'tipo', 'status', 'linhas_processadas', 'criados', 'atualizados', 'total_erros', 'criado_em']
+    list_filter = ['tipo', 'status']
+    search_fields = ['nome_arquivo']
+
+
 # Customização do Admin
 admin.site.site_header = 'SIGEM - Administração'
 admin.site.site_title = 'SIGEM Admin'
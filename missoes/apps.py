@@ -1,7 +1,14 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class MissoesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'missoes'
     verbose_name = 'Gestão de Missões'
+    
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .cache import criar_tabela_cache
+        
+        post_migrate.connect(criar_tabela_cache, sender=self)
@@ -0,0 +1,408 @@
+"""
+============================================================
+🔎 SIGEM - Busca
+Busca textual (full-text do PostgreSQL) sem acentos
+============================================================
+
+A remoção de acentos é feita com translate() (SQL puro) e, para o texto
+digitado, com a mesma tabela em Python: não depende da extensão unaccent.
+
+CPF, RG e números SEI/BG digitados na busca não passam pela busca textual:
+classificar_busca() os reconhece e eles viram igualdade ou prefixo em
+índices b-tree (filtro_identificador, filtro_documento).
+
+As caixas de busca usam o lookup __uicontains (sem acentos e sem
+maiúsculas), servido por índices GIN de trigramas sobre a mesma expressão
+quando a extensão pg_trgm está instalada; sem ela, a busca continua
+correta, apenas sem índice.
+"""
+
+import re
+
+from django.contrib.postgres.lookups import TrigramWordSimilar
+from django.contrib.postgres.search import (
+    SearchQuery, SearchRank, SearchVector, TrigramWordSimilarity,
+)
+from django.db import connections
+from django.db.models import CharField, F, FloatField, Func, Lookup, Q, TextField, Value
+from django.db.models.functions import Cast, Coalesce, Concat, Lower, NullIf
+from django.db.models.lookups import StartsWith
+
+from .cache import em_cache
+
+
+# Configuração de busca textual do PostgreSQL
+CONFIG_BUSCA = 'portuguese'
+
+ACENTOS = 'áàâãäéèêëíìîïóòôõöúùûüçñÁÀÂÃÄÉÈÊËÍÌÎÏÓÒÔÕÖÚÙÛÜÇÑ'
+SEM_ACENTOS = 'aaaaaeeeeiiiiooooouuuucnAAAAAEEEEIIIIOOOOOUUUUCN'
+
+_TABELA_ACENTOS = str.maketrans(ACENTOS, SEM_ACENTOS)
+
+# Campos do oficial no vetor de busca e seus pesos
+CAMPOS_BUSCA_OFICIAL = (
+    ('nome', 'A'),
+    ('nome_guerra', 'A'),
+    ('cpf', 'B'),
+    ('rg', 'B'),
+)
+
+# Campos de cada modelo no vetor de busca (busca global) e seus pesos
+CAMPOS_BUSCA_MISSAO_VETOR = (
+    ('nome', 'A'),
+    ('documento_referencia', 'A'),
+    ('local', 'B'),
+    ('descricao', 'C'),
+)
+CAMPOS_BUSCA_UNIDADE = (
+    ('sigla', 'A'),
+    ('nome', 'A'),
+)
+CAMPOS_BUSCA_SOLICITACAO = (
+    ('nome_missao', 'A'),
+    ('documento_referencia', 'A'),
+    ('local_missao', 'B'),
+)
+
+# Resultados por tipo na busca global
+LIMITE_BUSCA_GLOBAL = 5
+
+# Campos de texto da missão na busca (com índice GIN de trigramas)
+CAMPOS_BUSCA_MISSAO = ('nome', 'local', 'documento_referencia')
+
+# Códigos (documentos SEI): sem acentos, buscados por ILIKE na própria coluna
+CAMPOS_CODIGO_MISSAO = ('documento_referencia',)
+
+# CPF com ou sem pontuação: 000.000.000-00
+RE_CPF = re.compile(r'\d{3}\.?\d{3}\.?\d{3}-?\d{2}')
+
+# Documento SEI/BG: "SEI-123", "SEI nº 2024.001/25", "BG 45"
+RE_DOCUMENTO = re.compile(r'(SEI|BG)[\s:.-]*(?:n[º°o]?\.?\s*)?(\d[\d./-]*)', re.IGNORECASE)
+
+# Identificador (RG): um único termo com ao menos um dígito
+RE_IDENTIFICADOR = re.compile(r'[\w./-]*\d[\w./-]*')
+
+_extensoes = {}
+
+
+# ============================================================
+# 🔤 NORMALIZAÇÃO
+# ============================================================
+def sem_acentos(texto):
+    """Remove acentos com a mesma tabela usada no banco (SemAcento)."""
+    return (texto or '').translate(_TABELA_ACENTOS)
+
+
+class SemAcento(Func):
+    """translate(lower(expr), ACENTOS, SEM_ACENTOS) no banco."""
+
+    function = 'TRANSLATE'
+    output_field = CharField()
+
+    def __init__(self, expressao, **extra):
+        super().__init__(
+            Lower(Coalesce(expressao, Value(''))),
+            Value(ACENTOS.lower()),
+            Value(SEM_ACENTOS.lower()),
+            **extra,
+        )
+
+
+class SoDigitos(Func):
+    """regexp_replace(expr, '[^0-9]', '', 'g'): número de documento sem pontuação."""
+
+    function = 'REGEXP_REPLACE'
+    output_field = TextField()
+
+    def __init__(self, expressao, **extra):
+        super().__init__(expressao, Value('[^0-9]'), Value(''), Value('g'), **extra)
+
+
+class Codigo(Func):
+    """upper(regexp_replace(expr, '[^0-9A-Za-z]', '', 'g')): RG sem pontuação."""
+
+    function = 'UPPER'
+    output_field = TextField()
+
+    def __init__(self, expressao, **extra):
+        super().__init__(
+            Func(expressao, Value('[^0-9A-Za-z]'), Value(''), Value('g'), function='REGEXP_REPLACE'),
+            **extra,
+        )
+
+
+# ============================================================
+# 🔍 LOOKUPS (índices de trigramas)
+# ============================================================
+@CharField.register_lookup
+@TextField.register_lookup
+class ContemSemAcento(Lookup):
+    """
+    campo__uicontains='joao' → SemAcento(campo) LIKE '%joao%': encontra
+    "João" e "JOÃO". Usa os índices GIN criados sobre SemAcento(campo).
+    """
+
+    lookup_name = 'uicontains'
+
+    def get_db_prep_lookup(self, value, connection):
+        texto = sem_acentos(str(value)).lower()
+        return '%s', [f'%{connection.ops.prep_for_like_query(texto)}%']
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = compiler.compile(SemAcento(self.lhs))
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} LIKE {rhs}', [*lhs_params, *rhs_params]
+
+
+@CharField.register_lookup
+@TextField.register_lookup
+class ContemILike(Lookup):
+    """
+    campo__ilike_contem='x' → campo ILIKE '%x%'. O icontains do Django gera
+    UPPER(campo) LIKE ..., que não usa o índice gin_trgm_ops da coluna.
+    """
+
+    lookup_name = 'ilike_contem'
+
+    def get_db_prep_lookup(self, value, connection):
+        return '%s', [f'%{connection.ops.prep_for_like_query(value)}%']
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} ILIKE {rhs}', [*lhs_params, *rhs_params]
+
+
+# ============================================================
+# 🧩 EXTENSÕES DO POSTGRESQL
+# ============================================================
+def extensao_disponivel(nome, using='default'):
+    """True se a extensão está instalada no banco (verificado uma vez por processo)."""
+    chave = (using, nome)
+    if chave not in _extensoes:
+        conexao = connections[using]
+        disponivel = False
+        if conexao.vendor == 'postgresql':
+            with conexao.cursor() as cursor:
+                cursor.execute('SELECT 1 FROM pg_extension WHERE extname = %s', [nome])
+                disponivel = cursor.fetchone() is not None
+        _extensoes[chave] = disponivel
+    return _extensoes[chave]
+
+
+# ============================================================
+# 🧭 VETOR E CONSULTA
+# ============================================================
+def vetor_busca(campos, instancia=None):
+    """
+    Expressão do vetor de busca sobre os (campo, peso) informados. Com uma
+    instância, usa os valores dela (para INSERT/UPDATE no save); sem
+    instância, as colunas (UPDATE em lote).
+    """
+    partes = []
+    for campo, peso in campos:
+        valor = Value(getattr(instancia, campo) or '') if instancia is not None else F(campo)
+        partes.append(SearchVector(SemAcento(valor), config=CONFIG_BUSCA, weight=peso))
+
+    vetor = partes[0]
+    for parte in partes[1:]:
+        vetor = vetor + parte
+    return vetor
+
+
+def vetor_busca_oficial(oficial=None):
+    """Vetor de busca do oficial (nome, nome de guerra, CPF e RG)."""
+    return vetor_busca(CAMPOS_BUSCA_OFICIAL, oficial)
+
+
+def atualizar_vetores_busca(queryset, campos=CAMPOS_BUSCA_OFICIAL):
+    """Recalcula o vetor de busca de um queryset (oficiais, por padrão) em um único UPDATE."""
+    return queryset.update(busca_vetor=vetor_busca(campos))
+
+
+def consulta_prefixo(texto):
+    """
+    SearchQuery com todos os termos digitados como prefixo ('joa:* & silv:*'),
+    para busca enquanto o usuário digita. None se não houver termos.
+    """
+    termos = re.findall(r'[^\W_]+', sem_acentos(texto).lower())
+    if not termos:
+        return None
+    return SearchQuery(
+        ' & '.join(f'{termo}:*' for termo in termos),
+        config=CONFIG_BUSCA,
+        search_type='raw',
+    )
+
+
+def ranking(consulta, campo='busca_vetor'):
+    """
+    Relevância do registro para a consulta. Convertida para float8: o real
+    do ts_rank não sobrevive à ida e volta em Python (cursor de paginação).
+    """
+    return Cast(SearchRank(F(campo), consulta), FloatField())
+
+
+# ============================================================
+# 🔀 ROTEAMENTO (CPF, RG, SEI)
+# ============================================================
+def classificar_busca(texto):
+    """
+    Classifica o texto digitado:
+    ('cpf', '00000000018'), ('documento', ('SEI', '1010')),
+    ('identificador', 'RG18') ou ('texto', texto).
+    """
+    texto = (texto or '').strip()
+    if RE_CPF.fullmatch(texto):
+        return 'cpf', re.sub(r'\D', '', texto)
+
+    documento = RE_DOCUMENTO.fullmatch(texto)
+    if documento:
+        return 'documento', (documento.group(1).upper(), re.sub(r'\D', '', documento.group(2)))
+
+    if RE_IDENTIFICADOR.fullmatch(texto):
+        return 'identificador', re.sub(r'[^0-9A-Za-z]', '', texto).upper()
+
+    return 'texto', texto
+
+
+def filtro_identificador(texto, cpf='cpf', rg='rg'):
+    """
+    Q por igualdade (CPF completo) ou prefixo (RG sem pontuação, início do
+    CPF), servido pelos índices b-tree. None se o texto for livre.
+    """
+    tipo, valor = classificar_busca(texto)
+    if tipo == 'cpf':
+        return Q(**{cpf: valor})
+    if tipo != 'identificador':
+        return None
+
+    filtro = Q(StartsWith(Codigo(rg), Value(valor)))
+    if valor.isdigit():
+        filtro |= Q(**{f'{cpf}__startswith': valor})
+    return filtro
+
+
+def filtro_documento(texto, campo='documento_referencia'):
+    """
+    Q por prefixo do número (sem pontuação) para "SEI-123"/"BG 45", pelo
+    índice sobre SoDigitos(campo). None se o texto não for um documento.
+    """
+    tipo, valor = classificar_busca(texto)
+    if tipo != 'documento':
+        return None
+    sigla, numero = valor
+    return Q(StartsWith(SoDigitos(campo), Value(numero))) & Q(**{f'{campo}__istartswith': sigla})
+
+
+# ============================================================
+# 🗂️ BUSCA DE MISSÕES (trigramas)
+# ============================================================
+def buscar_missoes(missoes, texto, campos=CAMPOS_BUSCA_MISSAO):
+    """
+    Filtra por trecho, sem acentos, em qualquer um dos campos e anota
+    'similaridade'. Um número SEI/BG vai direto ao índice do documento.
+    Com pg_trgm, aceita também nomes com erros de digitação (<% com
+    índice GIN) e ordena por similaridade; sem a extensão, similaridade
+    é sempre 0.
+    """
+    if 'documento_referencia' in campos:
+        documento = filtro_documento(texto)
+        if documento is not None:
+            return missoes.filter(documento).annotate(
+                similaridade=Value(1.0, output_field=FloatField())
+            )
+
+    filtro = Q()
+    for campo in campos:
+        lookup = 'ilike_contem' if campo in CAMPOS_CODIGO_MISSAO else 'uicontains'
+        filtro |= Q(**{f'{campo}__{lookup}': texto})
+
+    if not extensao_disponivel('pg_trgm', missoes.db):
+        return missoes.filter(filtro).annotate(similaridade=Value(0.0, output_field=FloatField()))
+
+    principal = SemAcento(campos[0])
+    normalizado = sem_acentos(texto).lower()
+    filtro |= Q(TrigramWordSimilar(principal, Value(normalizado)))
+    return missoes.filter(filtro).annotate(
+        # float8: o real do pg_trgm não sobrevive à ida e volta em Python (cursor)
+        similaridade=Cast(TrigramWordSimilarity(Value(normalizado), principal), FloatField())
+    )
+
+
+# ============================================================
+# 🌐 BUSCA GLOBAL (oficiais, missões, unidades, solicitações)
+# ============================================================
+def _ramo_busca_global(queryset, tipo, consulta, limite, titulo, subtitulo):
+    """Os 'limite' registros mais relevantes de um modelo, em colunas comuns à UNION."""
+    return (
+        queryset
+        .filter(busca_vetor=consulta)
+        .annotate(
+            tipo_resultado=Value(tipo, output_field=TextField()),
+            ident=F('pk'),
+            titulo=Cast(titulo, TextField()),
+            subtitulo=Cast(subtitulo, TextField()),
+            relevancia=ranking(consulta),
+        )
+        .values('tipo_resultado', 'ident', 'titulo', 'subtitulo', 'relevancia')
+        .order_by('-relevancia', 'pk')[:limite]
+    )
+
+
+def _calcular_busca_global(texto, escopo, ve_solicitacoes, limite):
+    from .models import Missao, Oficial, SolicitacaoDesignacao, Unidade
+
+    consulta = consulta_prefixo(texto)
+    if consulta is None:
+        return []
+
+    if escopo.ve_todos:
+        unidades = Unidade.objects.all()
+    elif escopo.role == 'comandante' and escopo.unidade_ids:
+        unidades = Unidade.objects.filter(pk__in=sorted(escopo.unidade_ids))
+    else:
+        unidades = Unidade.objects.none()
+
+    if ve_solicitacoes:
+        solicitacoes = SolicitacaoDesignacao.objects.all()
+    else:
+        solicitacoes = SolicitacaoDesignacao.objects.filter(
+            escopo.predicado_oficiais(prefixo='solicitante__')
+        )
+
+    ramos = [
+        _ramo_busca_global(
+            Oficial.objects.filter(escopo.predicado_oficiais()), 'oficial', consulta, limite,
+            Concat('posto', Value(' '), 'nome', output_field=TextField()), F('obm'),
+        ),
+        _ramo_busca_global(
+            Missao.objects.all(), 'missao', consulta, limite, F('nome'), F('local'),
+        ),
+        _ramo_busca_global(
+            unidades, 'unidade', consulta, limite, F('sigla'), F('nome'),
+        ),
+        _ramo_busca_global(
+            solicitacoes, 'solicitacao', consulta, limite,
+            Coalesce(NullIf('nome_missao', Value('')), 'missao_existente__nome'),
+            F('solicitante__nome'),
+        ),
+    ]
+    # Uma única consulta: UNION ALL dos quatro ramos, ordenada por relevância
+    resultados = ramos[0].union(*ramos[1:], all=True).order_by('-relevancia')
+    return list(resultados)
+
+
+def busca_global(texto, escopo, ve_solicitacoes=False, limite=LIMITE_BUSCA_GLOBAL):
+    """
+    Até 'limite' resultados de cada tipo, ordenados por relevância, dentro do
+    escopo do usuário: [{'tipo_resultado', 'ident', 'titulo', 'subtitulo', 'relevancia'}].
+    Em cache por texto, escopo e versões das entidades envolvidas.
+    """
+    texto = ' '.join(sem_acentos(texto).lower().split())
+    return em_cache(
+        'busca_global',
+        ('oficiais', 'missoes', 'unidades', 'solicitacoes', 'hierarquia'),
+        lambda: _calcular_busca_global(texto, escopo, ve_solicitacoes, limite),
+        texto, escopo, ve_solicitacoes, limite,
+    )
@@ -0,0 +1,171 @@
+"""
+============================================================
+🗃️ SIGEM - Cache
+Contadores de versão por entidade e chaves de cache versionadas
+============================================================
+
+Cada entidade tem um contador de versão, incrementado pelos signals
+(missoes/signals.py) e pelas rotinas em lote a cada escrita. Dados em
+cache usam uma chave que inclui as versões das entidades de que
+dependem: após qualquer alteração a chave muda e o valor antigo
+simplesmente deixa de ser lido (e expira sozinho).
+
+Funciona com os backends db (padrão), redis, filebased e locmem (ver
+CACHES em settings). Com mais de um processo (vários workers, worker de
+importações), o backend precisa ser compartilhado por todos eles: locmem
+só serve a um único processo.
+"""
+
+import hashlib
+import threading
+import time
+from contextlib import contextmanager
+
+from django.apps import apps
+from django.core.cache import cache
+from django.db import transaction
+
+
+# Entidades com contador de versão próprio
+ENTIDADES = (
+    'oficiais',
+    'missoes',
+    'designacoes',
+    'unidades',
+    'usuarios',
+    'solicitacoes',
+    'estatisticas',  # Cubo EstatisticaDesignacao
+    'hierarquia',  # Árvore de unidades + lotação dos oficiais
+    'carga',  # Contadores de carga dos oficiais (missoes/carga.py)
+)
+
+# Entidade de cada modelo do app missoes
+ENTIDADE_POR_MODELO = {
+    'Oficial': 'oficiais',
+    'Missao': 'missoes',
+    'Designacao': 'designacoes',
+    'Unidade': 'unidades',
+    'Usuario': 'usuarios',
+    'SolicitacaoDesignacao': 'solicitacoes',
+    'EstatisticaDesignacao': 'estatisticas',
+}
+
+# Tempo de vida padrão dos valores em cache (segundos)
+CACHE_TIMEOUT = 300
+
+_AUSENTE = object()
+
+_estado = threading.local()
+
+
+# ============================================================
+# 🔢 VERSÕES
+# ============================================================
+def criar_tabela_cache(using='default', **kwargs):
+    """Cria a tabela do DatabaseCache após o migrate (nada faz se já existir)."""
+    from django.core.management import call_command
+
+    call_command('createcachetable', database=using, verbosity=0)
+
+
+def _chave_versao(nome):
+    return f'sigem:versao:{nome}'
+
+
+def _versao_inicial():
+    # Começa pelo timestamp para não repetir versões após expulsão do cache
+    return int(time.time() * 1000)
+
+
+def versoes(*nomes):
+    """Retorna as versões atuais das entidades informadas, na mesma ordem."""
+    chaves = [_chave_versao(nome) for nome in nomes]
+    atuais = cache.get_many(chaves)
+    for chave in chaves:
+        if chave not in atuais:
+            cache.add(chave, _versao_inicial(), None)
+            atuais[chave] = cache.get(chave)
+    return [atuais[chave] for chave in chaves]
+
+
+def versao(nome):
+    """Retorna a versão atual de uma entidade (ex.: 'oficiais')."""
+    return versoes(nome)[0]
+
+
+def _incrementar(nome):
+    chave = _chave_versao(nome)
+    try:
+        return cache.incr(chave)
+    except ValueError:
+        cache.add(chave, _versao_inicial(), None)
+        return cache.get(chave)
+
+
+def incrementar_versao(*nomes):
+    """
+    Invalida tudo que foi guardado com as versões anteriores. Dentro de uma
+    transação, o incremento só acontece após o commit, para que nenhuma
+    requisição guarde dados antigos sob a versão nova.
+    Dentro de um bloco adiar_invalidacao(), apenas acumula os nomes.
+    """
+    pendentes = getattr(_estado, 'pendentes', None)
+    if pendentes is not None:
+        pendentes.update(nomes)
+        return
+    for nome in nomes:
+        transaction.on_commit(lambda nome=nome: _incrementar(nome))
+
+
+@contextmanager
+def adiar_invalidacao():
+    """
+    Agrupa as invalidações disparadas durante o bloco (importações,
+    operações em lote) em um único incremento por entidade ao final.
+    """
+    if getattr(_estado, 'pendentes', None) is not None:
+        yield
+        return
+
+    _estado.pendentes = set()
+    try:
+        yield
+    finally:
+        pendentes = _estado.pendentes
+        _estado.pendentes = None
+        incrementar_versao(*sorted(pendentes))
+
+
+# ============================================================
+# 🔑 CHAVES E LEITURA VERSIONADAS
+# ============================================================
+def chave_versionada(prefixo, entidades, *partes):
+    """
+    Monta a chave 'sigem:<prefixo>:<versões>:<hash das partes>'.
+    As partes (filtros, busca, escopo...) entram como hash, com tamanho fixo.
+    """
+    versao_str = '.'.join(str(v) for v in versoes(*entidades))
+    resumo = hashlib.md5(repr(partes).encode('utf-8')).hexdigest()
+    return f'sigem:{prefixo}:{versao_str}:{resumo}'
+
+
+def em_cache(prefixo, entidades, calcular, *partes, timeout=CACHE_TIMEOUT):
+    """Lê o valor do cache versionado ou o calcula com calcular() e guarda."""
+    chave = chave_versionada(prefixo, entidades, *partes)
+    valor = cache.get(chave, _AUSENTE)
+    if valor is _AUSENTE:
+        valor = calcular()
+        cache.set(chave, valor, timeout)
+    return valor
+
+
+def entidades_da_consulta(queryset):
+    """Entidades de todas as tabelas usadas pela consulta (FROM e JOINs)."""
+    por_tabela = {
+        modelo._meta.db_table: entidade
+        for modelo in apps.get_app_config('missoes').get_models()
+        if (entidade := ENTIDADE_POR_MODELO.get(modelo.__name__))
+    }
+    tabelas = {alias.table_name for alias in queryset.query.alias_map.values()}
+    tabelas.add(queryset.model._meta.db_table)
+    return tuple(sorted({por_tabela[t] for t in tabelas if t in por_tabela}))
@@ -0,0 +1,171 @@
+"""
+============================================================
+⚖️ SIGEM - Carga de Trabalho dos Oficiais
+Manutenção dos contadores de carga armazenados em Oficial
+============================================================
+"""
+
+import threading
+from contextlib import contextmanager
+
+from django.db.models import Case, Count, F, IntegerField, OuterRef, Subquery, Sum, Value, When, Window
+from django.db.models.functions import Coalesce, RowNumber
+
+from .cache import incrementar_versao
+
+
+# Peso de cada complexidade na carga ponderada
+PESOS_COMPLEXIDADE = {
+    'BAIXA': 1,
+    'MEDIA': 2,
+    'ALTA': 3,
+}
+
+_estado = threading.local()
+
+
+# ============================================================
+# 🔢 RECÁLCULO DOS CONTADORES
+# ============================================================
+def _agregado_ativas(agregado, **filtros):
+    """Subquery que agrega as designações do oficial em missões EM_ANDAMENTO."""
+    from .models import Designacao
+
+    subquery = (
+        Designacao.objects
+        .filter(oficial=OuterRef('pk'), missao__status='EM_ANDAMENTO', **filtros)
+        .order_by()
+        .values('oficial')
+        .annotate(total=agregado)
+        .values('total')
+    )
+    return Coalesce(Subquery(subquery, output_field=IntegerField()), Value(0))
+
+
+def expressao_peso():
+    """Expressão CASE com o peso da complexidade de cada designação."""
+    return Case(
+        *[When(complexidade=c, then=Value(p)) for c, p in PESOS_COMPLEXIDADE.items()],
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+
+
+def recalcular_carga(oficial_ids=None):
+    """
+    Recalcula os contadores de carga dos oficiais informados
+    (ou de todos, se oficial_ids for None) em um único UPDATE.
+    """
+    from .models import Oficial
+
+    oficiais = Oficial.objects.all()
+    if oficial_ids is not None:
+        oficial_ids = {pk for pk in oficial_ids if pk}
+        if not oficial_ids:
+            return 0
+        oficiais = oficiais.filter(pk__in=oficial_ids)
+
+    total = oficiais.update(
+        qtd_ativas=_agregado_ativas(Count('id')),
+        qtd_baixa=_agregado_ativas(Count('id'), complexidade='BAIXA'),
+        qtd_media=_agregado_ativas(Count('id'), complexidade='MEDIA'),
+        qtd_alta=_agregado_ativas(Count('id'), complexidade='ALTA'),
+        carga_ponderada=_agregado_ativas(Sum(expressao_peso())),
+    )
+    # UPDATE em lote não dispara signals. Só os contadores mudaram: invalida a
+    # versão 'carga', sem afetar o restante do cache de oficiais (e o índice
+    # de sugestões, que depende de 'oficiais')
+    incrementar_versao('carga')
+    return total
+
+
+# ============================================================
+# ⏳ RECÁLCULO ADIADO (importações e operações em lote)
+# ============================================================
+def marcar_para_recalculo(oficial_ids):
+    """
+    Recalcula a carga dos oficiais informados. Dentro de um bloco
+    adiar_recalculo_carga(), apenas acumula os IDs para o final.
+    """
+    pendentes = getattr(_estado, 'pendentes', None)
+    if pendentes is not None:
+        pendentes.update(pk for pk in oficial_ids if pk)
+        return
+    recalcular_carga(oficial_ids)
+
+
+@contextmanager
+def adiar_recalculo_carga():
+    """
+    Agrupa os recálculos disparados pelos signals durante o bloco e
+    executa um único recálculo ao final. Pode ser aninhado.
+    """
+    if getattr(_estado, 'pendentes', None) is not None:
+        yield
+        return
+
+    _estado.pendentes = set()
+    try:
+        yield
+    finally:
+        pendentes = _estado.pendentes
+        _estado.pendentes = None
+        if pendentes:
+            recalcular_carga(pendentes)
+
+
+# ============================================================
+# 📊 COMPARAÇÃO DE OFICIAIS
+# ============================================================
+def montar_comparacao(oficial_ids, limite_missoes=5):
+    """
+    Monta os dados de comparação de carga dos oficiais informados.
+
+    Usa duas consultas, independente da quantidade de oficiais:
+    uma agregação (with_carga) e uma consulta com ROW_NUMBER()
+    particionado por oficial para as últimas missões ativas.
+    """
+    from .models import Designacao, Oficial
+
+    oficial_ids = [pk for pk in oficial_ids if pk]
+    if not oficial_ids:
+        return []
+
+    # Cards na ordem em que os oficiais foram selecionados
+    posicao = {}
+    for pk in oficial_ids:
+        posicao.setdefault(int(pk), len(posicao))
+    oficiais = sorted(
+        Oficial.objects.with_carga().filter(pk__in=posicao),
+        key=lambda oficial: posicao[oficial.pk],
+    )
+
+    ultimas_por_oficial = {}
+    recentes = (
+        Designacao.objects
+        .select_related('missao')
+        .filter(oficial_id__in=oficial_ids, missao__status='EM_ANDAMENTO')
+        .annotate(
+            ordem=Window(
+                RowNumber(),
+                partition_by=F('oficial_id'),
+                order_by=[F('criado_em').desc(), F('id').desc()],
+            )
+        )
+        .filter(ordem__lte=limite_missoes)
+        .order_by('oficial_id', 'ordem')
+    )
+    for designacao in recentes:
+        ultimas_por_oficial.setdefault(designacao.oficial_id, []).append(designacao)
+
+    return [
+        {
+            'oficial': oficial,
+            'total_baixa': oficial.total_baixa,
+            'total_media': oficial.total_media,
+            'total_alta': oficial.total_alta,
+            'carga_total': oficial.carga_total,
+            'ultimas_missoes': ultimas_por_oficial.get(oficial.pk, []),
+        }
+        for oficial in oficiais
+    ]
@@ -0,0 +1,78 @@
+"""
+============================================================
+🏷️ SIGEM - GET condicional
+ETag / Last-Modified para fragmentos HTMX e endpoints JSON
+============================================================
+
+O ETag vem das versões das entidades de que o fragmento depende
+(missoes/cache.py), do usuário e da URL completa; nos endpoints de um
+objeto entra também o atualizado_em dele, que vira o Last-Modified.
+Quando o navegador revalida com If-None-Match / If-Modified-Since e
+nada mudou, a resposta 304 sai antes de qualquer consulta ou renderização.
+
+Cache-Control: private, no-cache — só o navegador guarda o fragmento e
+sempre revalida: trocar de aba no painel custa um 304 em vez de renderizar
+a tabela de novo, e uma alteração aparece na próxima requisição.
+"""
+
+import hashlib
+from functools import wraps
+
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from .cache import chave_versionada
+
+# Entidades que definem o escopo de acesso (EscopoAcesso): entram em todo ETag
+ENTIDADES_ESCOPO = ('usuarios', 'hierarquia')
+
+
+def _atualizado_em(request, modelo, pk):
+    """atualizado_em do objeto (uma consulta por requisição); None se não existir."""
+    memo = request.__dict__.setdefault('_sigem_atualizado_em', {})
+    if (modelo, pk) not in memo:
+        memo[(modelo, pk)] = (
+            modelo.objects.filter(pk=pk).values_list('atualizado_em', flat=True).first()
+        )
+    return memo[(modelo, pk)]
+
+
+def get_condicional(*entidades, modelo=None):
+    """
+    Decorator de views GET que dependem das entidades informadas.
+    Com modelo, a view recebe pk e o atualizado_em do objeto entra no
+    ETag e no Last-Modified. Usar abaixo de @login_required.
+    """
+    todas = tuple(sorted(set(entidades) | set(ENTIDADES_ESCOPO)))
+
+    def ultima_alteracao(request, *args, **kwargs):
+        if modelo is None or 'pk' not in kwargs:
+            return None
+        return _atualizado_em(request, modelo, kwargs['pk'])
+
+    def etag(request, *args, **kwargs):
+        usuario = request.user
+        chave = chave_versionada(
+            'etag', todas,
+            usuario.pk, usuario.role,
+            # O fragmento traz {% csrf_token %}: após novo login o token muda
+            request.META.get('CSRF_COOKIE'),
+            request.get_full_path(),
+            ultima_alteracao(request, *args, **kwargs),
+        )
+        return hashlib.md5(chave.encode('utf-8')).hexdigest()
+
+    def decorator(view_func):
+        condicionada = condition(
+            etag_func=etag,
+            last_modified_func=ultima_alteracao if modelo is not None else None,
+        )(view_func)
+
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            response = condicionada(request, *args, **kwargs)
+            if response.status_code in (200, 304):
+                patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,120 @@
+"""
+============================================================
+🔭 SIGEM - Escopo de Acesso
+O que cada usuário pode ver, calculado uma vez por requisição
+============================================================
+"""
+
+from dataclasses import dataclass
+from functools import cached_property
+
+from django.db.models import Q
+
+from .cache import em_cache
+
+
+# Perfis que enxergam todos os oficiais
+PERFIS_VISAO_AMPLA = ('admin', 'corregedor', 'bm3', 'comando_geral')
+
+# Tempo de vida do escopo em cache (segundos)
+ESCOPO_TIMEOUT = 60
+
+
+@dataclass(frozen=True)
+class EscopoAcesso:
+    """Escopo imutável de um usuário: perfil, unidades visíveis e oficial vinculado."""
+
+    usuario_id: int = None
+    role: str = None
+    oficial_id: int = None
+    unidade_ids: frozenset = frozenset()
+    obms: tuple = ()
+
+    @cached_property
+    def obms_normalizadas(self):
+        """OBMs em maiúsculas, para comparar como obm__iexact."""
+        return frozenset(obm.upper() for obm in self.obms)
+
+    @property
+    def ve_todos(self):
+        """Perfis sem restrição de unidade."""
+        return self.role in PERFIS_VISAO_AMPLA
+
+    def predicado_oficiais(self, prefixo=''):
+        """Predicado SQL (Q) com os oficiais visíveis; prefixo permite filtrar por relação."""
+        if self.ve_todos:
+            return Q()
+        if self.role == 'comandante' and (self.unidade_ids or self.obms):
+            predicado = Q(**{f'{prefixo}unidade_id__in': sorted(self.unidade_ids)})
+            # Oficiais cuja OBM não corresponde a nenhuma unidade: pelo texto da OBM
+            sem_unidade = Q()
+            for obm in self.obms:
+                sem_unidade |= Q(**{f'{prefixo}obm__iexact': obm})
+            if self.obms:
+                predicado |= Q(**{f'{prefixo}unidade__isnull': True}) & sem_unidade
+            return predicado
+        if self.role == 'oficial' and self.oficial_id:
+            return Q(**{f'{prefixo}pk': self.oficial_id})
+        # Sem escopo: nenhum oficial
+        return Q(**{f'{prefixo}pk__in': []})
+
+    def pode_ver_oficial(self, oficial):
+        """Verifica, sem consultar o banco, se o oficial está no escopo."""
+        return self.pode_ver(oficial.pk, oficial.unidade_id, oficial.obm)
+
+    def pode_ver(self, oficial_id, unidade_id, obm=''):
+        """Mesma verificação a partir dos ids (índices em memória)."""
+        if self.ve_todos:
+            return True
+        if self.role == 'comandante':
+            if unidade_id is None:
+                return bool(obm) and obm.upper() in self.obms_normalizadas
+            return unidade_id in self.unidade_ids
+        if self.role == 'oficial':
+            return self.oficial_id is not None and self.oficial_id == oficial_id
+        return False
+
+
+ESCOPO_VAZIO = EscopoAcesso()
+
+
+def _calcular_escopo(usuario):
+    """Consulta o banco e monta o escopo do usuário."""
+    unidade_ids = frozenset()
+    obms = ()
+
+    if usuario.role == 'comandante':
+        unidade_ids = frozenset(usuario.get_unidades_subordinadas().values_list('pk', flat=True))
+        obms = tuple(sorted(usuario.get_obm_subordinadas()))
+
+    return EscopoAcesso(
+        usuario_id=usuario.pk,
+        role=usuario.role,
+        oficial_id=usuario.oficial_id,
+        unidade_ids=unidade_ids,
+        obms=obms,
+    )
+
+
+def obter_escopo(usuario):
+    """
+    Escopo do usuário, em cache por ESCOPO_TIMEOUT segundos. A chave inclui a
+    versão da hierarquia, então mudanças em unidades ou lotações invalidam o escopo.
+    """
+    if not usuario or not usuario.is_authenticated:
+        return ESCOPO_VAZIO
+
+    return em_cache(
+        'escopo', ('hierarquia',),
+        lambda: _calcular_escopo(usuario),
+        usuario.pk, usuario.role, usuario.oficial_id,
+        timeout=ESCOPO_TIMEOUT,
+    )
+
+
+def escopo_da_requisicao(request):
+    """Escopo anexado pelo EscopoMiddleware (ou calculado na hora, fora dele)."""
+    escopo = getattr(request, 'escopo', None)
+    if escopo is None:
+        escopo = obter_escopo(getattr(request, 'user', None))
+    return escopo
@@ -0,0 +1,347 @@
+"""
+============================================================
+📊 SIGEM - Estatísticas
+Indicadores dos dashboards, calculados em poucas consultas e em cache
+============================================================
+"""
+
+import threading
+from contextlib import contextmanager
+
+from django.db import connection, transaction
+from django.db.models import Count, F, IntegerField, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .cache import em_cache, incrementar_versao
+from .carga import expressao_peso
+
+_estado = threading.local()
+
+
+# ============================================================
+# 🔢 CONTAGEM DE MISSÕES (tipo × status)
+# ============================================================
+def _calcular_indicadores():
+    """
+    Uma única consulta: GROUP BY tipo, status sobre as missões, com o total
+    de oficiais ativos como subconsulta escalar (avaliada uma vez pelo banco).
+    """
+    from .models import Missao, Oficial
+
+    oficiais_ativos = (
+        Oficial.objects
+        .filter(ativo=True)
+        .order_by()
+        .values('ativo')
+        .annotate(total=Count('id'))
+        .values('total')
+    )
+    linhas = (
+        Missao.objects
+        .order_by()
+        .values('tipo', 'status')
+        .annotate(
+            total=Count('id'),
+            oficiais_ativos=Coalesce(Subquery(oficiais_ativos, output_field=IntegerField()), 0),
+        )
+    )
+
+    por_tipo_status = {}
+    total_oficiais = None
+    for linha in linhas:
+        por_tipo_status[(linha['tipo'], linha['status'])] = linha['total']
+        total_oficiais = linha['oficiais_ativos']
+
+    if total_oficiais is None:
+        # Sem missões cadastradas, a consulta agrupada não retorna linhas
+        total_oficiais = Oficial.objects.filter(ativo=True).count()
+
+    return {
+        'total_oficiais': total_oficiais,
+        'por_tipo_status': por_tipo_status,
+    }
+
+
+def indicadores():
+    """
+    Indicadores gerais: {'total_oficiais': n, 'por_tipo_status': {(tipo, status): n}}.
+    Em cache até a próxima alteração em oficiais ou missões.
+    """
+    return em_cache('indicadores', ('oficiais', 'missoes'), _calcular_indicadores)
+
+
+def totais_por_status(por_tipo_status, status):
+    """Soma, por tipo, as missões em um status: {tipo: n}."""
+    totais = {}
+    for (tipo, status_missao), total in por_tipo_status.items():
+        if status_missao == status:
+            totais[tipo] = totais.get(tipo, 0) + total
+    return totais
+
+
+# ============================================================
+# 🏠 DASHBOARD - VISÃO GERAL
+# ============================================================
+def _calcular_dashboard():
+    from .models import Missao, Oficial
+
+    dados = indicadores()
+    por_tipo_status = dados['por_tipo_status']
+    ativas_por_tipo = totais_por_status(por_tipo_status, 'EM_ANDAMENTO')
+
+    # Usa o contador armazenado (qtd_ativas), sem JOIN com designações
+    oficiais_mais_escalados = list(
+        Oficial.objects
+        .filter(ativo=True)
+        .annotate(total_designacoes=F('qtd_ativas'))
+        .order_by('-total_designacoes', 'nome')[:10]
+    )
+
+    return {
+        'total_oficiais': dados['total_oficiais'],
+        'total_missoes_ativas': sum(ativas_por_tipo.values()),
+        'total_missoes': sum(por_tipo_status.values()),
+        'missoes_por_tipo': sorted(
+            ({'tipo': tipo, 'total': total} for tipo, total in ativas_por_tipo.items()),
+            key=lambda item: -item['total'],
+        ),
+        'oficiais_mais_escalados': oficiais_mais_escalados,
+        'missoes_recentes': list(Missao.objects.order_by('-criado_em')[:5]),
+    }
+
+
+def dados_dashboard():
+    """Contexto do dashboard geral, em cache até a próxima alteração relevante."""
+    return em_cache('dashboard', ('oficiais', 'missoes', 'designacoes', 'carga'), _calcular_dashboard)
+
+
+# ============================================================
+# 🗂️ DASHBOARD DE MISSÕES
+# ============================================================
+def totais_missoes_por_tipo():
+    """Missões em andamento de cada tipo, na ordem de Missao.TIPO_CHOICES."""
+    from .models import Missao
+
+    ativas_por_tipo = totais_por_status(indicadores()['por_tipo_status'], 'EM_ANDAMENTO')
+    return [
+        {
+            'tipo': tipo,
+            'tipo_display': tipo_display,
+            'total': ativas_por_tipo.get(tipo, 0),
+        }
+        for tipo, tipo_display in Missao.TIPO_CHOICES
+    ]
+
+
+# ============================================================
+# 📈 CUBO DE ESTATÍSTICAS (EstatisticaDesignacao)
+# ============================================================
+# Dimensões que identificam uma célula (restrição missoes_estat_celula_unica)
+DIMENSOES_CELULA = ('mes', 'tipo', 'status', 'posto', 'quadro', 'unidade', 'complexidade')
+
+# Chave do advisory lock que serializa as atualizações do cubo
+_TRAVA_CUBO = 7460301
+
+
+def mes_de_referencia(data_inicio, criado_em):
+    """Mês de referência da missão: início ou, sem data, o cadastro (Missao.mes_referencia)."""
+    if data_inicio:
+        return data_inicio.replace(day=1)
+    if criado_em:
+        return timezone.localdate(criado_em).replace(day=1)
+    return None
+
+
+def atualizar_estatisticas(meses=None):
+    """
+    Recalcula as células do cubo dos meses informados (ou de todos, se
+    meses for None): uma agregação agrupada gravada com upsert
+    (INSERT ... ON CONFLICT) e remoção das células que deixaram de existir.
+    As atualizações são serializadas por um advisory lock do PostgreSQL.
+    """
+    from .models import Designacao, EstatisticaDesignacao
+
+    if meses is not None:
+        meses = sorted({mes for mes in meses if mes})
+        if not meses:
+            return 0
+
+    designacoes = Designacao.objects.filter(missao__mes_referencia__isnull=False)
+    celulas = EstatisticaDesignacao.objects.all()
+    if meses is not None:
+        designacoes = designacoes.filter(missao__mes_referencia__in=meses)
+        celulas = celulas.filter(mes__in=meses)
+
+    linhas = (
+        designacoes
+        .order_by()
+        .values(
+            'missao__mes_referencia', 'missao__tipo', 'missao__status', 'oficial__posto',
+            'oficial__quadro', 'oficial__unidade', 'complexidade',
+        )
+        .annotate(total=Count('id'), carga=Coalesce(Sum(expressao_peso()), 0))
+    )
+
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_advisory_xact_lock(%s)', [_TRAVA_CUBO])
+        gravadas = EstatisticaDesignacao.objects.bulk_create(
+            [
+                EstatisticaDesignacao(
+                    mes=linha['missao__mes_referencia'],
+                    tipo=linha['missao__tipo'],
+                    status=linha['missao__status'],
+                    posto=linha['oficial__posto'],
+                    quadro=linha['oficial__quadro'],
+                    unidade_id=linha['oficial__unidade'],
+                    complexidade=linha['complexidade'],
+                    total=linha['total'],
+                    carga=linha['carga'],
+                )
+                for linha in linhas
+            ],
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=DIMENSOES_CELULA,
+            update_fields=['total', 'carga'],
+        )
+        celulas.exclude(pk__in=[celula.pk for celula in gravadas]).delete()
+    incrementar_versao('estatisticas')
+    return len(gravadas)
+
+
+def meses_das_missoes(missao_ids):
+    """Meses de referência das missões informadas."""
+    from .models import Missao
+
+    return set(
+        Missao.objects
+        .filter(pk__in=[pk for pk in missao_ids if pk])
+        .order_by()
+        .values_list('mes_referencia', flat=True)
+        .distinct()
+    )
+
+
+def meses_dos_oficiais(oficial_ids):
+    """Meses em que os oficiais informados têm designações."""
+    from .models import Designacao
+
+    return set(
+        Designacao.objects
+        .filter(oficial_id__in=[pk for pk in oficial_ids if pk])
+        .order_by()
+        .values_list('missao__mes_referencia', flat=True)
+        .distinct()
+    )
+
+
+# ============================================================
+# 📊 DISTRIBUIÇÕES (gráficos do dashboard, lidas do cubo)
+# ============================================================
+def _com_proporcao(itens):
+    """Acrescenta a proporção (0-100) de cada item em relação ao maior, para as barras."""
+    maior = max((item['designacoes'] for item in itens), default=0)
+    for item in itens:
+        item['proporcao'] = round(item['designacoes'] * 100 / maior) if maior else 0
+    return itens
+
+
+def _distribuicao(celulas, campo, rotulos=None):
+    """Itens {'rotulo', 'designacoes', 'carga'} de uma dimensão, na ordem dos rótulos."""
+    totais = {linha[campo]: linha for linha in celulas.distribuicao(campo)}
+    if rotulos is None:
+        rotulos = {chave: chave or 'Sem unidade' for chave in totais}
+    return _com_proporcao([
+        {'rotulo': rotulo, 'designacoes': totais[chave]['designacoes'], 'carga': totais[chave]['carga']}
+        for chave, rotulo in rotulos.items()
+        if chave in totais
+    ])
+
+
+def _calcular_distribuicoes(request):
+    from .models import EstatisticaDesignacao, Missao, Oficial
+
+    celulas = EstatisticaDesignacao.objects.visible_to(request)
+    por_unidade = sorted(
+        _distribuicao(celulas, 'unidade__sigla'),
+        key=lambda item: -item['designacoes'],
+    )[:10]
+    evolucao = [
+        {
+            'rotulo': linha['mes'].strftime('%m/%Y'),
+            'designacoes': linha['designacoes'],
+            'carga': linha['carga'],
+        }
+        for linha in celulas.evolucao_mensal(12)
+    ]
+    return {
+        'por_tipo': _distribuicao(celulas, 'tipo', dict(Missao.TIPO_CHOICES)),
+        'por_posto': _distribuicao(celulas, 'posto', dict(Oficial.POSTO_CHOICES)),
+        'por_quadro': _distribuicao(celulas, 'quadro', dict(Oficial.QUADRO_CHOICES)),
+        'por_unidade': _com_proporcao(por_unidade),
+        'evolucao_mensal': _com_proporcao(evolucao),
+    }
+
+
+def distribuicoes(request):
+    """
+    Designações e carga por tipo, posto, quadro, unidade e mês, somadas no
+    cubo e limitadas ao escopo do usuário. Em cache por escopo até a
+    próxima atualização do cubo ou das unidades.
+    """
+    from .escopo import escopo_da_requisicao
+
+    escopo = escopo_da_requisicao(request)
+    return em_cache(
+        'distribuicoes', ('estatisticas', 'unidades'),
+        lambda: _calcular_distribuicoes(request),
+        escopo.ve_todos, escopo.role, sorted(escopo.unidade_ids),
+    )
+
+
+# ============================================================
+# ⏳ ATUALIZAÇÃO ADIADA (importações e operações em lote)
+# ============================================================
+def marcar_meses_para_atualizacao(meses):
+    """
+    Atualiza as células dos meses informados. Dentro de um bloco
+    adiar_atualizacao_estatisticas(), apenas acumula os meses para o final.
+    """
+    pendentes = getattr(_estado, 'pendentes', None)
+    if pendentes is not None:
+        pendentes.update(mes for mes in meses if mes)
+        return
+    _agendar_atualizacao(meses)
+
+
+def _agendar_atualizacao(meses):
+    """
+    Atualiza o cubo depois do commit, fora da transação de quem escreveu:
+    a agregação vê os dados confirmados e uma falha no cubo não desfaz a
+    gravação do usuário (corrigível com o comando atualizar_estatisticas).
+    """
+    meses = {mes for mes in meses if mes}
+    if meses:
+        transaction.on_commit(lambda: atualizar_estatisticas(meses), robust=True)
+
+
+@contextmanager
+def adiar_atualizacao_estatisticas():
+    """
+    Agrupa as atualizações do cubo disparadas durante o bloco e
+    executa uma única atualização ao final. Pode ser aninhado.
+    """
+    if getattr(_estado, 'pendentes', None) is not None:
+        yield
+        return
+
+    _estado.pendentes = set()
+    try:
+        yield
+    finally:
+        pendentes = _estado.pendentes
+        _estado.pendentes = None
+        if pendentes:
+            _agendar_atualizacao(pendentes)
@@ -0,0 +1,992 @@
+"""
+============================================================
+📤 SIGEM - Importação em Massa
+Importação de planilhas em lotes, com gravações em conjunto
+============================================================
+
+As linhas são processadas em lotes de TAMANHO_LOTE. Em cada lote os
+registros já existentes são buscados de uma vez (dicionários por CPF,
+RG, par missão/oficial...), as linhas são validadas em Python e as gravações saem em
+bulk_create / bulk_update dentro de uma transação por lote. Erros de
+validação são reportados por linha sem interromper o lote; um erro no
+banco desfaz apenas o lote em que ocorreu.
+
+Na planilha completa (importar_pasta) as abas são importadas na ordem
+das dependências, e o que cada aba grava fica em MapasPlanilha para as
+abas seguintes o referenciarem.
+
+Pelo painel, a planilha vira uma ImportacaoPlanilha na fila (conteúdo
+no banco, acessível a qualquer servidor) e é importada pelo comando
+processar_importacoes (processar_importacao), que a copia em blocos para
+um arquivo temporário e grava o progresso no registro a cada lote.
+
+A planilha é aberta em modo somente leitura (abrir_planilha): as linhas
+saem do XML sob demanda e seguem por em_lotes, de modo que a memória
+usada não cresce com o tamanho do arquivo.
+
+bulk_create e bulk_update não chamam save() nem disparam signals: o que
+eles manteriam (unidade pela OBM, vetor de busca, atualizado_em, versões
+do cache e cubo de estatísticas) é feito aqui explicitamente.
+"""
+
+import itertools
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import DatabaseError, transaction
+from django.db.models import BinaryField, Q
+from django.db.models.functions import Substr, Upper
+from django.utils import timezone
+
+from .busca import (
+    CAMPOS_BUSCA_MISSAO_VETOR, CAMPOS_BUSCA_UNIDADE, atualizar_vetores_busca, sem_acentos,
+)
+from .cache import adiar_invalidacao, incrementar_versao
+from .carga import adiar_recalculo_carga, marcar_para_recalculo
+from .estatisticas import (
+    adiar_atualizacao_estatisticas, marcar_meses_para_atualizacao, mes_de_referencia,
+    meses_das_missoes, meses_dos_oficiais,
+)
+from .models import (
+    Designacao, ImportacaoPlanilha, Missao, Oficial, Unidade, Usuario, hash_senha_padrao,
+)
+
+# Linhas por lote (uma transação e poucas consultas por lote)
+TAMANHO_LOTE = 500
+
+# Bytes da planilha lidos do banco por consulta no worker
+BLOCO_CONTEUDO = 1024 * 1024
+
+# Colunas da aba de oficiais, na ordem do modelo de importação
+COLUNAS_OFICIAL = (
+    'cpf', 'rg', 'nome', 'nome_guerra', 'posto', 'quadro',
+    'obm', 'funcao', 'email', 'telefone',
+)
+
+# Campos gravados por bulk_update nos oficiais já existentes
+CAMPOS_ATUALIZACAO_OFICIAL = COLUNAS_OFICIAL[1:] + ('unidade', 'atualizado_em')
+
+
+# ============================================================
+# 📋 RESULTADO
+# ============================================================
+class ResultadoImportacao:
+    """Contagens e erros (por linha da planilha) de uma importação."""
+
+    def __init__(self):
+        self.criados = 0
+        self.atualizados = 0
+        self.erros = []  # (aba, linha, mensagem)
+        self.aba = None  # Aba em importação (planilha completa)
+        self.por_aba = {}  # Registros importados/atualizados por aba
+
+    @property
+    def total(self):
+        return self.criados + self.atualizados
+
+    def erro(self, linha, mensagem):
+        self.erros.append((self.aba, linha, mensagem))
+
+    def mensagens_erro(self):
+        return [
+            f'{aba}, linha {linha}: {mensagem}' if aba else f'Linha {linha}: {mensagem}'
+            for aba, linha, mensagem in self.erros
+        ]
+
+
+# ============================================================
+# 🔧 LEITURA DAS LINHAS
+# ============================================================
+def abrir_planilha(arquivo):
+    """
+    Abre a planilha em modo somente leitura (streaming), com os valores
+    calculados das fórmulas. Aceita caminho ou arquivo; fechar com close().
+    """
+    import openpyxl
+    return openpyxl.load_workbook(arquivo, read_only=True, data_only=True)
+
+
+def linhas_planilha(ws, colunas, primeira=2):
+    """
+    Pares (número da linha, valores) a partir da linha `primeira`, sempre
+    com `colunas` valores: no modo somente leitura as células vazias do
+    fim da linha podem não vir.
+    """
+    linhas = ws.iter_rows(min_row=primeira, max_col=colunas, values_only=True)
+    for numero, valores in enumerate(linhas, start=primeira):
+        yield numero, tuple(valores) + (None,) * (colunas - len(valores))
+
+
+def em_lotes(linhas, tamanho=TAMANHO_LOTE):
+    """Agrupa um iterável em listas de até `tamanho` itens, sem carregá-lo inteiro."""
+    iterador = iter(linhas)
+    while lote := list(itertools.islice(iterador, tamanho)):
+        yield lote
+
+
+def texto_celula(valor):
+    """Valor da célula como texto ('' se vazia); 123.0 do Excel vira '123'."""
+    if isinstance(valor, float) and valor.is_integer():
+        valor = int(valor)
+    return str(valor).strip() if valor else ''
+
+
+def normalizar_cpf(valor):
+    return texto_celula(valor).replace('.', '').replace('-', '')
+
+
+def pico_memoria_mb():
+    """Pico de memória residente do processo, em MB; None sem o módulo resource (Windows)."""
+    if resource is None:
+        return None
+    # ru_maxrss: KB no Linux, bytes no macOS
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+def _mensagem_validacao(erro):
+    """'campo: mensagem; ...' a partir de uma ValidationError do modelo."""
+    return '; '.join(
+        f'{campo}: {" ".join(mensagens)}' for campo, mensagens in erro.message_dict.items()
+    )
+
+
+# ============================================================
+# 🎖️ OFICIAIS
+# ============================================================
+def importar_oficiais(linhas, resultado=None, mapas=None):
+    """
+    Importa oficiais de pares (número da linha, valores) com as colunas de
+    COLUNAS_OFICIAL: atualiza pelo CPF os existentes e cria os novos, cada
+    um com um usuário 'oficial' (se o CPF ainda não tiver usuário). Com
+    mapas, registra o RG de cada oficial gravado para as abas seguintes.
+    """
+    resultado = resultado or ResultadoImportacao()
+    for lote in em_lotes(linhas):
+        _importar_lote_oficiais(lote, resultado, mapas)
+    return resultado
+
+
+def _importar_lote_oficiais(lote, resultado, mapas):
+    # Linhas com CPF; a última ocorrência de um CPF no lote prevalece
+    dados_por_cpf = {}
+    for numero, valores in lote:
+        if not valores or not valores[0]:
+            continue
+        dados = {
+            campo: texto_celula(valor)
+            for campo, valor in zip(COLUNAS_OFICIAL, valores)
+        }
+        dados['cpf'] = normalizar_cpf(valores[0])
+        dados_por_cpf.pop(dados['cpf'], None)
+        dados_por_cpf[dados['cpf']] = (numero, dados)
+    if not dados_por_cpf:
+        return
+
+    # Uma consulta traz os oficiais do lote e os donos dos RGs informados
+    rgs = {dados['rg'] for _, dados in dados_por_cpf.values() if dados['rg']}
+    existentes = list(Oficial.objects.filter(Q(cpf__in=list(dados_por_cpf)) | Q(rg__in=rgs)))
+    por_cpf = {oficial.cpf: oficial for oficial in existentes}
+    dono_do_rg = {oficial.rg: oficial.cpf for oficial in existentes}
+
+    unidades = Unidade.objects.resolver_obms(
+        {dados['obm'] for _, dados in dados_por_cpf.values()}
+    )
+    excluir_validacao = [
+        campo.name for campo in Oficial._meta.fields if campo.name not in COLUNAS_OFICIAL
+    ]
+    agora = timezone.now()
+
+    novos, alterados, linhas_validas = [], [], []
+    for numero, dados in dados_por_cpf.values():
+        cpf, rg = dados['cpf'], dados['rg']
+        if rg and dono_do_rg.get(rg, cpf) != cpf:
+            resultado.erro(numero, f'RG {rg} já pertence a outro oficial (CPF {dono_do_rg[rg]}).')
+            continue
+
+        oficial = por_cpf.get(cpf) or Oficial()
+        obm_anterior = oficial.obm if oficial.pk else None
+        for campo, valor in dados.items():
+            setattr(oficial, campo, valor)
+        try:
+            oficial.clean_fields(exclude=excluir_validacao)
+        except ValidationError as e:
+            resultado.erro(numero, _mensagem_validacao(e))
+            continue
+
+        # Mesma regra de Oficial.save(): OBM alterada ou oficial ainda sem unidade
+        if oficial.obm != obm_anterior or (oficial.obm and not oficial.unidade_id):
+            oficial.unidade = unidades.get(oficial.obm)
+        if rg:
+            dono_do_rg[rg] = cpf
+
+        if oficial.pk:
+            oficial.atualizado_em = agora
+            alterados.append(oficial)
+        else:
+            novos.append(oficial)
+        linhas_validas.append(numero)
+
+    if not novos and not alterados:
+        return
+
+    try:
+        with transaction.atomic():
+            Oficial.objects.bulk_create(novos)
+            Oficial.objects.bulk_update(alterados, CAMPOS_ATUALIZACAO_OFICIAL)
+            atualizar_vetores_busca(
+                Oficial.objects.filter(pk__in=[oficial.pk for oficial in novos + alterados])
+            )
+            usuarios_criados = _criar_usuarios(novos)
+    except DatabaseError as e:
+        for numero in linhas_validas:
+            resultado.erro(numero, f'Lote não gravado: {e}')
+        return
+
+    resultado.criados += len(novos)
+    resultado.atualizados += len(alterados)
+    if mapas is not None:
+        mapas.oficiais.update((oficial.rg, oficial.pk) for oficial in novos + alterados if oficial.rg)
+
+    # O que os signals de Oficial/Usuario fariam a cada save()
+    incrementar_versao('oficiais')
+    if usuarios_criados:
+        incrementar_versao('usuarios')
+    if any(oficial.unidade_id for oficial in novos) or any(
+        oficial.unidade_id != oficial._unidade_id_original for oficial in alterados
+    ):
+        incrementar_versao('hierarquia')
+    mudaram_dimensoes = [
+        oficial.pk for oficial in alterados
+        if (oficial.posto, oficial.quadro, oficial.unidade_id) != oficial._dimensoes_original
+    ]
+    if mudaram_dimensoes:
+        marcar_meses_para_atualizacao(meses_dos_oficiais(mudaram_dimensoes))
+
+
+def _criar_usuarios(oficiais):
+    """Usuário 'oficial' para cada oficial novo cujo CPF ainda não tem conta."""
+    if not oficiais:
+        return 0
+    com_conta = set(
+        Usuario.objects.filter(cpf__in=[oficial.cpf for oficial in oficiais])
+        .values_list('cpf', flat=True)
+    )
+    # Hash provisório compartilhado: nenhum PBKDF2 por conta durante a importação
+    senha = hash_senha_padrao()
+    usuarios = [
+        Usuario(cpf=oficial.cpf, password=senha, oficial=oficial, role='oficial')
+        for oficial in oficiais
+        if oficial.cpf not in com_conta
+    ]
+    Usuario.objects.bulk_create(usuarios)
+    return len(usuarios)
+
+
+# ============================================================
+# 🏢 UNIDADES
+# ============================================================
+def importar_unidades(linhas, resultado=None, mapas=None):
+    """
+    Cria ou atualiza unidades pelo nome: nome, sigla, tipo e comando
+    superior (nome, sigla ou ID; pode estar na própria aba). A aba é lida
+    inteira (são poucas linhas) e gravada por níveis da hierarquia, um
+    bulk_create / bulk_update por nível, em uma transação.
+    """
+    resultado = resultado or ResultadoImportacao()
+
+    # Uma linha por nome; a última ocorrência prevalece
+    dados_por_chave = {}
+    for numero, row in linhas:
+        if not row[0]:
+            continue
+        nome = ' '.join(texto_celula(row[0]).split())
+        dados_por_chave.pop(chave_texto(nome), None)
+        dados_por_chave[chave_texto(nome)] = (numero, {
+            'nome': nome,
+            'sigla': texto_celula(row[1]),
+            'tipo': texto_celula(row[2]).upper(),
+            'superior': texto_celula(row[3]),
+        })
+    if not dados_por_chave:
+        return resultado
+
+    existentes = {}
+    for unidade in Unidade.objects.annotate(nome_upper=Upper('nome')).filter(
+        nome_upper__in=list(dados_por_chave)
+    ):
+        existentes.setdefault(unidade.nome_upper, []).append(unidade)
+
+    # Valida as linhas e monta as unidades (ainda sem o comando superior)
+    excluir_validacao = ['comando_superior', 'caminho', 'criado_em', 'busca_vetor']
+    unidades = {}
+    for chave, (numero, dados) in dados_por_chave.items():
+        if len(existentes.get(chave, [])) > 1:
+            resultado.erro(numero, f'Há mais de uma unidade com o nome "{dados["nome"]}".')
+            continue
+        unidade = existentes[chave][0] if chave in existentes else Unidade()
+        unidade.nome, unidade.sigla, unidade.tipo = dados['nome'], dados['sigla'], dados['tipo']
+        try:
+            unidade.clean_fields(exclude=excluir_validacao)
+        except ValidationError as e:
+            resultado.erro(numero, _mensagem_validacao(e))
+            continue
+        unidades[chave] = unidade
+
+    # Comando superior: outra linha da aba (nome ou sigla) ou unidade do banco
+    na_aba = {}
+    for chave, unidade in unidades.items():
+        for referencia in {chave, chave_texto(unidade.sigla)} - {''}:
+            na_aba[referencia] = chave if referencia not in na_aba else None
+    no_banco = Unidade.objects.resolver_obms(
+        dados['superior'] for _, dados in dados_por_chave.values()
+        if dados['superior'] and chave_texto(dados['superior']) not in na_aba
+    )
+    ids_no_banco = _ids_existentes(Unidade, (
+        dados['superior'] for _, dados in dados_por_chave.values() if dados['superior']
+    ))
+
+    superior_na_aba = {}
+    for chave in list(unidades):
+        numero, dados = dados_por_chave[chave]
+        referencia = dados['superior']
+        unidade = unidades[chave]
+        unidade.comando_superior_id = None
+        if not referencia:
+            continue
+        if chave_texto(referencia) in na_aba:
+            superior = na_aba[chave_texto(referencia)]
+            if superior is None:
+                resultado.erro(numero, f'Comando superior "{referencia}" é ambíguo na aba.')
+                del unidades[chave]
+            elif superior == chave:
+                resultado.erro(numero, 'Uma unidade não pode ser subordinada a si mesma.')
+                del unidades[chave]
+            else:
+                superior_na_aba[chave] = superior
+        elif no_banco.get(referencia):
+            unidade.comando_superior_id = no_banco[referencia].pk
+        elif referencia.isdigit() and int(referencia) in ids_no_banco:
+            unidade.comando_superior_id = int(referencia)
+        else:
+            resultado.erro(numero, f'Comando superior "{referencia}" não encontrado.')
+            del unidades[chave]
+
+    # Níveis: cada unidade é gravada depois do seu comando superior
+    niveis, gravadas = [], set()
+    pendentes = set(unidades)
+    while pendentes:
+        nivel = [
+            chave for chave in pendentes
+            if superior_na_aba.get(chave) is None or superior_na_aba[chave] in gravadas
+        ]
+        if not nivel:
+            break
+        niveis.append(nivel)
+        gravadas.update(nivel)
+        pendentes.difference_update(nivel)
+    for chave in pendentes:
+        superior = superior_na_aba[chave]
+        numero = dados_por_chave[chave][0]
+        if superior in unidades:
+            resultado.erro(numero, 'Ciclo na hierarquia de comando da aba.')
+        else:
+            resultado.erro(numero, f'Comando superior "{dados_por_chave[chave][1]["superior"]}" não foi importado.')
+
+    criadas = atualizadas = 0
+    try:
+        with transaction.atomic():
+            for nivel in niveis:
+                novas, alteradas = [], []
+                for chave in nivel:
+                    unidade = unidades[chave]
+                    if chave in superior_na_aba:
+                        unidade.comando_superior_id = unidades[superior_na_aba[chave]].pk
+                    (alteradas if unidade.pk else novas).append(unidade)
+                Unidade.objects.bulk_create(novas)
+                Unidade.objects.bulk_update(alteradas, ['nome', 'sigla', 'tipo', 'comando_superior'])
+                criadas += len(novas)
+                atualizadas += len(alteradas)
+            refazer_caminhos()
+            atualizar_vetores_busca(
+                Unidade.objects.filter(pk__in=[unidades[chave].pk for chave in gravadas]),
+                CAMPOS_BUSCA_UNIDADE,
+            )
+            vinculados = _vincular_oficiais_sem_unidade()
+    except (DatabaseError, ValueError) as e:
+        for chave in gravadas:
+            resultado.erro(dados_por_chave[chave][0], f'Unidades não gravadas: {e}')
+        return resultado
+
+    resultado.criados += criadas
+    resultado.atualizados += atualizadas
+
+    # O que os signals de Unidade fariam a cada save()
+    incrementar_versao('unidades', 'hierarquia')
+    if vinculados:
+        incrementar_versao('oficiais')
+        marcar_meses_para_atualizacao(meses_dos_oficiais(vinculados))
+    return resultado
+
+
+def refazer_caminhos():
+    """
+    Recalcula o caminho materializado de todas as unidades a partir do
+    comando superior (uma leitura e um bulk_update com as que mudaram).
+    """
+    unidades = {
+        pk: (superior_id, caminho)
+        for pk, superior_id, caminho in Unidade.objects.values_list('pk', 'comando_superior_id', 'caminho')
+    }
+    caminhos = {}
+    for pk in unidades:
+        cadeia, vistas = [], set()
+        atual = pk
+        while atual is not None and atual not in caminhos:
+            if atual in vistas:
+                raise ValueError('Ciclo na hierarquia de unidades.')
+            vistas.add(atual)
+            cadeia.append(atual)
+            atual = unidades[atual][0]
+        caminho = caminhos[atual] if atual is not None else '/'
+        for elo in reversed(cadeia):
+            caminho = f'{caminho}{elo}/'
+            caminhos[elo] = caminho
+    alteradas = [
+        Unidade(pk=pk, caminho=caminho)
+        for pk, caminho in caminhos.items() if caminho != unidades[pk][1]
+    ]
+    Unidade.objects.bulk_update(alteradas, ['caminho'], batch_size=TAMANHO_LOTE)
+    return len(alteradas)
+
+
+def _vincular_oficiais_sem_unidade():
+    """Lota pela OBM os oficiais ainda sem unidade (o signal de Unidade faz isso a cada save())."""
+    sem_unidade = {}
+    for pk, obm in Oficial.objects.filter(unidade__isnull=True).exclude(obm='').values_list('pk', 'obm'):
+        sem_unidade.setdefault(obm, []).append(pk)
+    por_unidade = {}
+    for obm, unidade in Unidade.objects.resolver_obms(sem_unidade).items():
+        if unidade:
+            por_unidade.setdefault(unidade.pk, []).extend(sem_unidade[obm])
+    for unidade_id, oficial_ids in por_unidade.items():
+        Oficial.objects.filter(pk__in=oficial_ids).update(unidade_id=unidade_id)
+    return [pk for oficial_ids in por_unidade.values() for pk in oficial_ids]
+
+
+# ============================================================
+# 👤 USUÁRIOS
+# ============================================================
+def importar_usuarios(linhas, resultado=None, mapas=None):
+    """Cria ou atualiza usuários pelo CPF: CPF, perfil e RG do oficial vinculado."""
+    resultado = resultado or ResultadoImportacao()
+    for lote in em_lotes(linhas):
+        _importar_lote_usuarios(lote, resultado, mapas)
+    return resultado
+
+
+def _importar_lote_usuarios(lote, resultado, mapas):
+    # Linhas com CPF; a última ocorrência de um CPF no lote prevalece
+    dados_por_cpf = {}
+    for numero, row in lote:
+        if not row[0]:
+            continue
+        cpf = normalizar_cpf(row[0])
+        dados_por_cpf.pop(cpf, None)
+        dados_por_cpf[cpf] = (numero, texto_celula(row[1]).lower() or 'oficial', texto_celula(row[2]))
+    if not dados_por_cpf:
+        return
+
+    existentes = {usuario.cpf: usuario for usuario in Usuario.objects.filter(cpf__in=list(dados_por_cpf))}
+    oficiais = _oficiais_por_rg({rg for _, _, rg in dados_por_cpf.values() if rg}, mapas)
+    # Cada oficial tem no máximo um usuário
+    dono_do_oficial = dict(
+        Usuario.objects.filter(oficial_id__in=list(oficiais.values())).values_list('oficial_id', 'cpf')
+    )
+    excluir_validacao = [campo.name for campo in Usuario._meta.fields if campo.name not in ('cpf', 'role')]
+    senha = hash_senha_padrao()
+
+    novos, alterados, linhas_validas = [], [], []
+    for cpf, (numero, role, rg) in dados_por_cpf.items():
+        usuario = existentes.get(cpf) or Usuario(cpf=cpf, password=senha)
+        usuario.role = role
+        # RG não encontrado: o usuário fica sem (ou com o mesmo) oficial
+        oficial_id = oficiais.get(rg)
+        if oficial_id:
+            if dono_do_oficial.get(oficial_id, cpf) != cpf:
+                resultado.erro(numero, f'Oficial RG {rg} já vinculado ao usuário {dono_do_oficial[oficial_id]}.')
+                continue
+            usuario.oficial_id = oficial_id
+        try:
+            usuario.clean_fields(exclude=excluir_validacao)
+        except ValidationError as e:
+            resultado.erro(numero, _mensagem_validacao(e))
+            continue
+        if oficial_id:
+            dono_do_oficial[oficial_id] = cpf
+        (alterados if usuario.pk else novos).append(usuario)
+        linhas_validas.append(numero)
+
+    if not novos and not alterados:
+        return
+
+    try:
+        with transaction.atomic():
+            Usuario.objects.bulk_create(novos)
+            Usuario.objects.bulk_update(alterados, ['role', 'oficial'])
+    except DatabaseError as e:
+        for numero in linhas_validas:
+            resultado.erro(numero, f'Lote não gravado: {e}')
+        return
+
+    resultado.criados += len(novos)
+    resultado.atualizados += len(alterados)
+    incrementar_versao('usuarios')
+
+
+# ============================================================
+# 🗂️ MISSÕES
+# ============================================================
+def importar_missoes(linhas, resultado=None, mapas=None):
+    """
+    Cria uma missão por linha: tipo, nome, descrição, local, início, fim,
+    status e documento. Com mapas, registra o nome de cada missão criada
+    para a aba de designações.
+    """
+    resultado = resultado or ResultadoImportacao()
+    for lote in em_lotes(linhas):
+        _importar_lote_missoes(lote, resultado, mapas)
+    return resultado
+
+
+def _data_celula(valor):
+    if isinstance(valor, datetime):
+        return valor.date()
+    return datetime.strptime(str(valor), '%Y-%m-%d').date()
+
+
+def _importar_lote_missoes(lote, resultado, mapas):
+    excluir_validacao = ['criado_em', 'atualizado_em', 'busca_vetor']
+    novas, linhas_validas = [], []
+    for numero, row in lote:
+        if not (row[0] and row[1]):  # Sem tipo ou nome
+            continue
+        try:
+            missao = Missao(
+                tipo=texto_celula(row[0]).upper(),
+                nome=texto_celula(row[1]),
+                descricao=texto_celula(row[2]),
+                local=texto_celula(row[3]),
+                data_inicio=_data_celula(row[4]) if row[4] else None,
+                data_fim=_data_celula(row[5]) if row[5] else None,
+                status=texto_celula(row[6]).upper() or 'PLANEJADA',
+                documento_referencia=texto_celula(row[7]),
+            )
+            missao.clean_fields(exclude=excluir_validacao)
+        except ValidationError as e:
+            resultado.erro(numero, _mensagem_validacao(e))
+            continue
+        except ValueError as e:
+            resultado.erro(numero, f'Data inválida: {e}')
+            continue
+        # bulk_create não passa pelo save(): mesmo mês de referência do modelo
+        missao.mes_referencia = mes_de_referencia(missao.data_inicio, timezone.now())
+        novas.append(missao)
+        linhas_validas.append(numero)
+
+    if not novas:
+        return
+
+    try:
+        with transaction.atomic():
+            Missao.objects.bulk_create(novas)
+            atualizar_vetores_busca(
+                Missao.objects.filter(pk__in=[missao.pk for missao in novas]),
+                CAMPOS_BUSCA_MISSAO_VETOR,
+            )
+    except DatabaseError as e:
+        for numero in linhas_validas:
+            resultado.erro(numero, f'Lote não gravado: {e}')
+        return
+
+    resultado.criados += len(novas)
+    if mapas is not None:
+        for missao in novas:
+            mapas.registrar_missao(missao.nome, missao.pk)
+    # Missões novas ainda sem designações: carga e cubo não mudam
+    incrementar_versao('missoes')
+
+
+# ============================================================
+# 🤝 DESIGNAÇÕES
+# ============================================================
+def importar_designacoes(linhas, resultado=None, mapas=None):
+    """
+    Cria ou atualiza designações pelo par (missão, oficial): missão (ID,
+    ou nome de uma missão da aba de missões), RG do oficial, função,
+    complexidade e observações.
+    """
+    resultado = resultado or ResultadoImportacao()
+    # Recalcula a carga dos oficiais uma única vez, ao final
+    with adiar_recalculo_carga():
+        for lote in em_lotes(linhas):
+            _importar_lote_designacoes(lote, resultado, mapas)
+    return resultado
+
+
+def _importar_lote_designacoes(lote, resultado, mapas):
+    linhas = [(numero, row) for numero, row in lote if row[0] and row[1]]
+    if not linhas:
+        return
+
+    missoes_da_aba = mapas.missoes if mapas is not None else {}
+    ids_missoes = _ids_existentes(Missao, (
+        texto_celula(row[0]) for _, row in linhas
+        if chave_texto(texto_celula(row[0])) not in missoes_da_aba
+    ))
+    oficiais = _oficiais_por_rg({texto_celula(row[1]) for _, row in linhas}, mapas)
+
+    # Uma linha por par (missão, oficial); a última ocorrência prevalece
+    dados_por_par = {}
+    for numero, row in linhas:
+        referencia, rg = texto_celula(row[0]), texto_celula(row[1])
+        chave = chave_texto(referencia)
+        if chave in missoes_da_aba:
+            missao_id = missoes_da_aba[chave]
+            if missao_id is None:
+                resultado.erro(numero, f'Missão "{referencia}" aparece mais de uma vez na aba de missões')
+                continue
+        elif referencia.isdigit() and int(referencia) in ids_missoes:
+            missao_id = int(referencia)
+        elif referencia.isdigit():
+            resultado.erro(numero, f'Missão ID {referencia} não encontrada')
+            continue
+        else:
+            resultado.erro(numero, f'Missão "{referencia}" não encontrada')
+            continue
+        if rg not in oficiais:
+            resultado.erro(numero, f'Oficial RG {rg} não encontrado')
+            continue
+        par = (missao_id, oficiais[rg])
+        dados_por_par.pop(par, None)
+        dados_por_par[par] = (numero, {
+            'funcao_na_missao': texto_celula(row[2]).upper() or 'MEMBRO',
+            'complexidade': texto_celula(row[3]).upper() or 'MEDIA',
+            'observacoes': texto_celula(row[4]),
+        })
+    if not dados_por_par:
+        return
+
+    missao_ids = {missao_id for missao_id, _ in dados_por_par}
+    oficial_ids = {oficial_id for _, oficial_id in dados_por_par}
+    existentes = {
+        (designacao.missao_id, designacao.oficial_id): designacao
+        for designacao in Designacao.objects.filter(missao_id__in=missao_ids, oficial_id__in=oficial_ids)
+    }
+    excluir_validacao = ['missao', 'oficial', 'status', 'criado_em', 'atualizado_em']
+    agora = timezone.now()
+
+    novas, alteradas, linhas_validas = [], [], []
+    for (missao_id, oficial_id), (numero, dados) in dados_por_par.items():
+        designacao = existentes.get((missao_id, oficial_id)) or Designacao(
+            missao_id=missao_id, oficial_id=oficial_id,
+        )
+        for campo, valor in dados.items():
+            setattr(designacao, campo, valor)
+        try:
+            designacao.clean_fields(exclude=excluir_validacao)
+        except ValidationError as e:
+            resultado.erro(numero, _mensagem_validacao(e))
+            continue
+        if designacao.pk:
+            designacao.atualizado_em = agora
+            alteradas.append(designacao)
+        else:
+            novas.append(designacao)
+        linhas_validas.append(numero)
+
+    if not novas and not alteradas:
+        return
+
+    try:
+        with transaction.atomic():
+            Designacao.objects.bulk_create(novas)
+            Designacao.objects.bulk_update(
+                alteradas, ['funcao_na_missao', 'complexidade', 'observacoes', 'atualizado_em'],
+            )
+    except DatabaseError as e:
+        for numero in linhas_validas:
+            resultado.erro(numero, f'Lote não gravado: {e}')
+        return
+
+    resultado.criados += len(novas)
+    resultado.atualizados += len(alteradas)
+
+    # O que os signals de Designacao fariam a cada save()
+    gravadas = novas + alteradas
+    marcar_para_recalculo({designacao.oficial_id for designacao in gravadas})
+    marcar_meses_para_atualizacao(meses_das_missoes({designacao.missao_id for designacao in gravadas}))
+    incrementar_versao('designacoes')
+
+
+# ============================================================
+# 🗺️ REFERÊNCIAS ENTRE ABAS
+# ============================================================
+class MapasPlanilha:
+    """
+    Registros gravados pelas abas já importadas de uma planilha completa,
+    para as abas seguintes os referenciarem sem nova consulta.
+    """
+
+    def __init__(self):
+        self.oficiais = {}  # RG → id do oficial
+        self.missoes = {}  # nome (chave_texto) → id da missão; None se o nome se repete
+
+    def registrar_missao(self, nome, pk):
+        chave = chave_texto(nome)
+        self.missoes[chave] = None if chave in self.missoes else pk
+
+
+def chave_texto(valor):
+    """Texto normalizado para comparar referências: espaços simples, maiúsculas."""
+    return ' '.join(texto_celula(valor).split()).upper()
+
+
+def _oficiais_por_rg(rgs, mapas):
+    """{RG: id do oficial}: primeiro os oficiais da planilha, os demais em uma consulta."""
+    da_planilha = mapas.oficiais if mapas is not None else {}
+    encontrados = {rg: da_planilha[rg] for rg in rgs if rg in da_planilha}
+    faltam = [rg for rg in rgs if rg not in encontrados]
+    if faltam:
+        encontrados.update(Oficial.objects.filter(rg__in=faltam).values_list('rg', 'pk'))
+    return encontrados
+
+
+def _ids_existentes(modelo, referencias):
+    """IDs (referências numéricas) que existem na tabela do modelo, em uma consulta."""
+    ids = {int(referencia) for referencia in referencias if referencia.isdigit()}
+    if not ids:
+        return set()
+    return set(modelo.objects.filter(pk__in=ids).values_list('pk', flat=True))
+
+
+# ============================================================
+# 📚 PLANILHA DE UM TIPO OU COMPLETA
+# ============================================================
+# Importador e número de colunas de cada tipo (abas do modelo de importação)
+IMPORTADORES = {
+    'oficiais': (importar_oficiais, len(COLUNAS_OFICIAL)),
+    'missoes': (importar_missoes, 8),
+    'designacoes': (importar_designacoes, 5),
+    'unidades': (importar_unidades, 4),
+    'usuarios': (importar_usuarios, 3),
+}
+
+# Ordem das abas na planilha completa: cada aba só referencia as anteriores
+ORDEM_ABAS = ('unidades', 'oficiais', 'usuarios', 'missoes', 'designacoes')
+
+
+def importar_planilha(tipo, ws, resultado=None, progresso=None, mapas=None):
+    """
+    Importa a aba `ws` com o importador do tipo. progresso(linhas_lidas),
+    se informado, é chamado a cada TAMANHO_LOTE linhas e no fim da aba.
+    Cache e cubo de estatísticas são atualizados uma vez, ao final.
+    """
+    importador, colunas = IMPORTADORES[tipo]
+    resultado = resultado or ResultadoImportacao()
+    linhas = linhas_planilha(ws, colunas)
+    if progresso:
+        linhas = _com_progresso(linhas, progresso)
+    with adiar_invalidacao(), adiar_atualizacao_estatisticas():
+        importador(linhas, resultado, mapas)
+    return resultado
+
+
+def abas_da_pasta(wb):
+    """{tipo: aba} das abas reconhecidas pelo título ('Missões' → missoes), em ORDEM_ABAS."""
+    abas = {}
+    for ws in wb.worksheets:
+        tipo = sem_acentos(ws.title).strip().lower()
+        if tipo in IMPORTADORES:
+            abas.setdefault(tipo, ws)
+    return {tipo: abas[tipo] for tipo in ORDEM_ABAS if tipo in abas}
+
+
+def importar_pasta(wb, resultado=None, progresso=None):
+    """
+    Planilha completa (modelo de importação): importa todas as abas
+    reconhecidas, na ordem das dependências (ORDEM_ABAS). As referências a
+    abas anteriores (RG → oficial, nome → missão) saem de MapasPlanilha;
+    cada aba grava em lotes, com uma transação por lote.
+    """
+    resultado = resultado or ResultadoImportacao()
+    abas = abas_da_pasta(wb)
+    if not abas:
+        raise ValueError('Nenhuma aba reconhecida (Unidades, Oficiais, Usuarios, Missoes, Designacoes).')
+
+    mapas = MapasPlanilha()
+    lidas_antes = lidas = 0
+
+    def progresso_aba(n):
+        nonlocal lidas
+        lidas = n
+        if progresso:
+            progresso(lidas_antes + n)
+
+    with adiar_invalidacao(), adiar_atualizacao_estatisticas():
+        for tipo, ws in abas.items():
+            resultado.aba = ws.title
+            total_antes = resultado.total
+            importar_planilha(tipo, ws, resultado, progresso_aba, mapas)
+            resultado.por_aba[ws.title] = resultado.total - total_antes
+            lidas_antes, lidas = lidas_antes + lidas, 0
+    resultado.aba = None
+    return resultado
+
+
+def _com_progresso(linhas, progresso, intervalo=TAMANHO_LOTE):
+    lidas = 0
+    for linha in linhas:
+        yield linha
+        lidas += 1
+        if lidas % intervalo == 0:
+            progresso(lidas)
+    progresso(lidas)
+
+
+# ============================================================
+# ⏳ FILA DE IMPORTAÇÕES
+# ============================================================
+def encerrar_importacoes_interrompidas():
+    """
+    Marca como FALHOU as importações em PROCESSANDO cujo worker não dá sinal
+    há mais de IMPORTACAO_TEMPO_SEM_SINAL segundos (processo encerrado no
+    meio, deploy). Não voltam para a fila: os lotes já gravados ficaram no
+    banco e reimportar a planilha duplicaria as missões criadas.
+    """
+    limite = timezone.now() - timedelta(seconds=settings.IMPORTACAO_TEMPO_SEM_SINAL)
+    with transaction.atomic():
+        interrompidas = list(
+            ImportacaoPlanilha.objects
+            .select_for_update(skip_locked=True)
+            .filter(status='PROCESSANDO', sinal_em__lt=limite)
+            .defer('conteudo')
+        )
+        for importacao in interrompidas:
+            importacao.status = 'FALHOU'
+            importacao.mensagem = (
+                f'Importação interrompida após {importacao.linhas_processadas} linhas '
+                f'(o worker parou de responder). Os lotes já gravados foram mantidos; '
+                f'confira os dados antes de reenviar a planilha.'
+            )
+            importacao.concluido_em = timezone.now()
+            importacao.conteudo = None
+            importacao.save(update_fields=['status', 'mensagem', 'concluido_em', 'conteudo'])
+    return len(interrompidas)
+
+
+def copiar_conteudo(fila, destino, tamanho=BLOCO_CONTEUDO):
+    """
+    Copia a planilha guardada no banco para o arquivo destino em blocos
+    (SUBSTRING no bytea), sem carregar o conteúdo inteiro em memória.
+    """
+    inicio = 1
+    while True:
+        bloco = fila.annotate(
+            bloco=Substr('conteudo', inicio, tamanho, output_field=BinaryField()),
+        ).values_list('bloco', flat=True).get()
+        if bloco:
+            destino.write(bloco)
+        if not bloco or len(bloco) < tamanho:
+            break
+        inicio += tamanho
+    destino.seek(0)
+
+
+def proxima_importacao():
+    """
+    Reserva a importação pendente mais antiga (PROCESSANDO) e a retorna;
+    None se a fila estiver vazia. Vários workers não pegam a mesma.
+    Antes, encerra as importações cujo worker foi interrompido.
+    """
+    encerrar_importacoes_interrompidas()
+    with transaction.atomic():
+        importacao = (
+            ImportacaoPlanilha.objects
+            .select_for_update(skip_locked=True)
+            .filter(status='PENDENTE')
+            .order_by('criado_em')
+            .defer('conteudo')
+            .first()
+        )
+        if importacao is not None:
+            importacao.status = 'PROCESSANDO'
+            importacao.iniciado_em = importacao.sinal_em = timezone.now()
+            importacao.save(update_fields=['status', 'iniciado_em', 'sinal_em'])
+    return importacao
+
+
+def processar_importacao(importacao):
+    """
+    Importa a planilha de uma importação reservada, gravando o progresso a
+    cada lote e, ao final, contagens, erros e status (CONCLUIDA ou FALHOU).
+    """
+    fila = ImportacaoPlanilha.objects.filter(pk=importacao.pk)
+    resultado = ResultadoImportacao()
+    lidas = 0
+
+    def progresso(n):
+        nonlocal lidas
+        lidas = n
+        fila.update(
+            linhas_processadas=lidas,
+            criados=resultado.criados,
+            atualizados=resultado.atualizados,
+            total_erros=len(resultado.erros),
+            sinal_em=timezone.now(),
+        )
+
+    try:
+        # Copiada do banco em blocos para um arquivo temporário e lida dele
+        with tempfile.TemporaryFile(suffix='.xlsx') as arquivo:
+            copiar_conteudo(fila, arquivo)
+            wb = abrir_planilha(arquivo)
+            try:
+                completa = importacao.tipo == 'completa'
+                abas = list(abas_da_pasta(wb).values()) if completa else [wb.active]
+                # Estimativa pela dimensão gravada nas abas (pode faltar)
+                if abas and all(ws.max_row for ws in abas):
+                    importacao.total_linhas = sum(max(ws.max_row - 1, 0) for ws in abas)
+                    fila.update(total_linhas=importacao.total_linhas)
+                if completa:
+                    importar_pasta(wb, resultado, progresso)
+                    importacao.mensagem = ' · '.join(
+                        f'{aba}: {total}' for aba, total in resultado.por_aba.items()
+                    )
+                else:
+                    importar_planilha(importacao.tipo, wb.active, resultado, progresso)
+            finally:
+                wb.close()
+        importacao.status = 'CONCLUIDA'
+    except Exception as e:
+        importacao.status = 'FALHOU'
+        importacao.mensagem = f'Erro na importação: {e}'
+
+    importacao.linhas_processadas = lidas
+    importacao.criados = resultado.criados
+    importacao.atualizados = resultado.atualizados
+    importacao.total_erros = len(resultado.erros)
+    importacao.erros = resultado.mensagens_erro()[:ImportacaoPlanilha.LIMITE_ERROS]
+    importacao.pico_memoria_mb = pico_memoria_mb()
+    importacao.concluido_em = timezone.now()
+    importacao.conteudo = None
+    importacao.save()
+    return importacao
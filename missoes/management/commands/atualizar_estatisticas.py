@@ -0,0 +1,18 @@
+"""
+============================================================
+📈 SIGEM - Comando: atualizar_estatisticas
+Reconstrói o cubo de estatísticas de designações
+============================================================
+"""
+
+from django.core.management.base import BaseCommand
+
+from missoes.estatisticas import atualizar_estatisticas
+
+
+class Command(BaseCommand):
+    help = 'Reconstrói por completo o cubo de estatísticas (EstatisticaDesignacao) a partir das designações.'
+
+    def handle(self, *args, **options):
+        total = atualizar_estatisticas()
+        self.stdout.write(self.style.SUCCESS(f'Cubo de estatísticas reconstruído: {total} célula(s).'))
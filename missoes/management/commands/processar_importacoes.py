@@ -0,0 +1,73 @@
+"""
+============================================================
+📤 SIGEM - Comando: processar_importacoes
+Worker da fila de importações de planilha (ImportacaoPlanilha)
+============================================================
+
+Roda fora dos workers web: as planilhas enviadas pelo painel ficam na
+fila e são importadas aqui, uma por vez. Pode haver várias instâncias
+(cada importação é reservada com SELECT ... FOR UPDATE SKIP LOCKED).
+Uma importação cujo worker parou de dar sinal (processo encerrado,
+deploy) por IMPORTACAO_TEMPO_SEM_SINAL segundos é marcada como falha.
+
+As versões do cache (missoes/cache.py) precisam ser vistas pelo site:
+o worker se recusa a rodar com o cache em memória local (CACHE_LOCAL).
+Use o cache no banco (padrão) ou REDIS_URL (ou CACHE_DIR, se o worker
+roda na mesma máquina do site).
+"""
+
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from missoes.importacao import processar_importacao, proxima_importacao
+
+
+class Command(BaseCommand):
+    help = 'Processa as importações de planilha enfileiradas pelo painel administrativo.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--continuo',
+            action='store_true',
+            help='Continua aguardando novas importações em vez de sair com a fila vazia.',
+        )
+        parser.add_argument(
+            '--intervalo',
+            type=float,
+            default=5,
+            help='Segundos entre consultas à fila no modo contínuo (padrão: 5).',
+        )
+
+    def handle(self, *args, **options):
+        backend = settings.CACHES['default']['BACKEND']
+        if 'LocMemCache' in backend:
+            raise CommandError(
+                'Cache em memória local: o site não veria as invalidações feitas pelo worker '
+                '(listas, escopos e autocompletar ficariam desatualizados). '
+                'Remova CACHE_LOCAL (cache no banco) ou defina REDIS_URL.'
+            )
+        if 'FileBasedCache' in backend:
+            self.stderr.write(self.style.WARNING(
+                'Cache em arquivos (CACHE_DIR): compartilhado apenas com processos desta máquina.'
+            ))
+
+        while True:
+            close_old_connections()
+            while (importacao := proxima_importacao()) is not None:
+                self.stdout.write(f'Importando {importacao}...')
+                importacao = processar_importacao(importacao)
+                resumo = (
+                    f'{importacao}: {importacao.criados} criado(s), '
+                    f'{importacao.atualizados} atualizado(s), {importacao.total_erros} erro(s).'
+                )
+                if importacao.status == 'FALHOU':
+                    self.stdout.write(self.style.ERROR(f'{resumo} {importacao.mensagem}'))
+                else:
+                    self.stdout.write(self.style.SUCCESS(resumo))
+
+            if not options['continuo']:
+                break
+            time.sleep(options['intervalo'])
@@ -0,0 +1,27 @@
+"""
+============================================================
+⚖️ SIGEM - Comando: recalcular_carga
+Reconstrói os contadores de carga armazenados em Oficial
+============================================================
+"""
+
+from django.core.management.base import BaseCommand
+
+from missoes.carga import recalcular_carga
+
+
+class Command(BaseCommand):
+    help = 'Recalcula os contadores de carga de trabalho dos oficiais a partir das designações.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'oficial_ids',
+            nargs='*',
+            type=int,
+            help='IDs dos oficiais a recalcular (padrão: todos).',
+        )
+
+    def handle(self, *args, **options):
+        oficial_ids = options['oficial_ids'] or None
+        total = recalcular_carga(oficial_ids)
+        self.stdout.write(self.style.SUCCESS(f'Carga recalculada para {total} oficial(is).'))
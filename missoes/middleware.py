@@ -0,0 +1,23 @@
+"""
+============================================================
+🧩 SIGEM - Middleware
+============================================================
+"""
+
+from django.utils.functional import SimpleLazyObject
+
+from .escopo import obter_escopo
+
+
+class EscopoMiddleware:
+    """
+    Anexa request.escopo (EscopoAcesso imutável) a cada requisição.
+    O escopo só é calculado no primeiro acesso e reaproveitado até o fim dela.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.escopo = SimpleLazyObject(lambda: obter_escopo(request.user))
+        return self.get_response(request)
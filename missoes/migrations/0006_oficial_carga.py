@@ -0,0 +1,77 @@
+# Generated by Django 6.0.1 on 2026-10-16 23:58
+
+from django.db import migrations, models
+from django.db.models import Case, Count, IntegerField, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+
+
+def popular_carga(apps, schema_editor):
+    """Preenche os contadores de carga a partir das designações existentes."""
+    Oficial = apps.get_model('missoes', 'Oficial')
+    Designacao = apps.get_model('missoes', 'Designacao')
+
+    def agregado(expressao, **filtros):
+        subquery = (
+            Designacao.objects
+            .filter(oficial=OuterRef('pk'), missao__status='EM_ANDAMENTO', **filtros)
+            .order_by()
+            .values('oficial')
+            .annotate(total=expressao)
+            .values('total')
+        )
+        return Coalesce(Subquery(subquery, output_field=IntegerField()), Value(0))
+
+    peso = Case(
+        When(complexidade='BAIXA', then=Value(1)),
+        When(complexidade='MEDIA', then=Value(2)),
+        When(complexidade='ALTA', then=Value(3)),
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+    Oficial.objects.update(
+        qtd_ativas=agregado(Count('id')),
+        qtd_baixa=agregado(Count('id'), complexidade='BAIXA'),
+        qtd_media=agregado(Count('id'), complexidade='MEDIA'),
+        qtd_alta=agregado(Count('id'), complexidade='ALTA'),
+        carga_ponderada=agregado(Sum(peso)),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('missoes', '0005_remove_oficial_score'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='oficial',
+            name='carga_ponderada',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Carga Ponderada'),
+        ),
+        migrations.AddField(
+            model_name='oficial',
+            name='qtd_alta',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Designações de Alta Complexidade'),
+        ),
+        migrations.AddField(
+            model_name='oficial',
+            name='qtd_ativas',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Missões Ativas'),
+        ),
+        migrations.AddField(
+            model_name='oficial',
+            name='qtd_baixa',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Designações de Baixa Complexidade'),
+        ),
+        migrations.AddField(
+            model_name='oficial',
+            name='qtd_media',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Designações de Média Complexidade'),
+        ),
+        migrations.AddIndex(
+            model_name='oficial',
+            index=models.Index(fields=['carga_ponderada'], name='missoes_ofi_carga_p_6473b6_idx'),
+        ),
+        migrations.RunPython(popular_carga, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 6.0.1 on 2026-10-17 00:20
+
+from django.db import migrations, models
+
+
+def popular_caminhos(apps, schema_editor):
+    """Calcula o caminho materializado de todas as unidades existentes."""
+    Unidade = apps.get_model('missoes', 'Unidade')
+
+    superiores = dict(Unidade.objects.values_list('id', 'comando_superior_id'))
+    caminhos = {}
+
+    def caminho(pk, visitados=()):
+        if pk in caminhos:
+            return caminhos[pk]
+        superior = superiores.get(pk)
+        if superior is None or superior in visitados or superior not in superiores:
+            # Raiz (ou ciclo pré-existente, tratado como raiz)
+            caminhos[pk] = f'/{pk}/'
+        else:
+            caminhos[pk] = f'{caminho(superior, visitados + (pk,))}{pk}/'
+        return caminhos[pk]
+
+    for pk in superiores:
+        Unidade.objects.filter(pk=pk).update(caminho=caminho(pk))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('missoes', '0006_oficial_carga'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='unidade',
+            name='caminho',
+            field=models.CharField(blank=True, editable=False, max_length=500, verbose_name='Caminho na Hierarquia'),
+        ),
+        migrations.AddIndex(
+            model_name='unidade',
+            index=models.Index(fields=['caminho'], name='missoes_uni_caminho_idx', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.RunPython(popular_caminhos, migrations.RunPython.noop),
+    ]
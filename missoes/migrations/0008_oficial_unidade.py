@@ -0,0 +1,59 @@
+# Generated by Django 6.0.1 on 2026-10-17 01:05
+
+import logging
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+logger = logging.getLogger(__name__)
+
+
+def vincular_unidades(apps, schema_editor):
+    """
+    Vincula cada oficial à unidade cuja sigla ou nome corresponde exatamente
+    ao texto livre da OBM e registra no log os valores sem correspondência ou
+    ambíguos.
+    """
+    Oficial = apps.get_model('missoes', 'Oficial')
+    Unidade = apps.get_model('missoes', 'Unidade')
+
+    por_texto = {}
+    for unidade in Unidade.objects.all():
+        for texto in {unidade.sigla, unidade.nome}:
+            chave = ' '.join((texto or '').split()).lower()
+            if chave:
+                por_texto.setdefault(chave, set()).add(unidade.pk)
+
+    vinculados = 0
+    sem_correspondencia = []
+    ambiguas = []
+    for obm in Oficial.objects.exclude(obm='').order_by().values_list('obm', flat=True).distinct():
+        candidatas = por_texto.get(' '.join(obm.split()).lower(), set())
+        if len(candidatas) == 1:
+            vinculados += Oficial.objects.filter(obm=obm).update(unidade_id=next(iter(candidatas)))
+        elif candidatas:
+            ambiguas.append(obm)
+        else:
+            sem_correspondencia.append(obm)
+
+    logger.info('Oficiais vinculados a unidades: %d', vinculados)
+    if ambiguas:
+        logger.warning('OBMs ambíguas (mais de uma unidade): %s', ', '.join(sorted(ambiguas)))
+    if sem_correspondencia:
+        logger.warning('OBMs sem unidade correspondente: %s', ', '.join(sorted(sem_correspondencia)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('missoes', '0007_unidade_caminho'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='oficial',
+            name='unidade',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='oficiais', to='missoes.unidade', verbose_name='Unidade de Lotação'),
+        ),
+        migrations.RunPython(vincular_unidades, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,92 @@
+# Generated by Django 6.0.1 on 2026-10-17 00:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Case, Count, DateField, IntegerField, Sum, Value, When
+from django.db.models.functions import Cast, Coalesce, TruncDate, TruncMonth
+
+
+def popular_estatisticas(apps, schema_editor):
+    """Preenche o mês de referência das missões e monta o cubo a partir dele."""
+    Missao = apps.get_model('missoes', 'Missao')
+    Designacao = apps.get_model('missoes', 'Designacao')
+    EstatisticaDesignacao = apps.get_model('missoes', 'EstatisticaDesignacao')
+
+    Missao.objects.update(mes_referencia=Coalesce(
+        Cast(TruncMonth('data_inicio'), DateField()),
+        TruncDate(TruncMonth('criado_em')),
+    ))
+
+    peso = Case(
+        When(complexidade='BAIXA', then=Value(1)),
+        When(complexidade='MEDIA', then=Value(2)),
+        When(complexidade='ALTA', then=Value(3)),
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+    linhas = (
+        Designacao.objects
+        .filter(missao__mes_referencia__isnull=False)
+        .order_by()
+        .values(
+            'missao__mes_referencia', 'missao__tipo', 'missao__status', 'oficial__posto',
+            'oficial__quadro', 'oficial__unidade', 'complexidade',
+        )
+        .annotate(total=Count('id'), carga=Coalesce(Sum(peso), 0))
+    )
+    EstatisticaDesignacao.objects.bulk_create([
+        EstatisticaDesignacao(
+            mes=linha['missao__mes_referencia'],
+            tipo=linha['missao__tipo'],
+            status=linha['missao__status'],
+            posto=linha['oficial__posto'],
+            quadro=linha['oficial__quadro'],
+            unidade_id=linha['oficial__unidade'],
+            complexidade=linha['complexidade'],
+            total=linha['total'],
+            carga=linha['carga'],
+        )
+        for linha in linhas
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('missoes', '0008_oficial_unidade'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='missao',
+            name='mes_referencia',
+            field=models.DateField(editable=False, null=True, verbose_name='Mês de Referência'),
+        ),
+        migrations.AddIndex(
+            model_name='missao',
+            index=models.Index(fields=['mes_referencia'], name='missoes_mis_mes_ref_1e94e4_idx'),
+        ),
+        migrations.CreateModel(
+            name='EstatisticaDesignacao',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mes', models.DateField(verbose_name='Mês de Referência')),
+                ('tipo', models.CharField(choices=[('OPERACIONAL', 'Operacional'), ('ADMINISTRATIVA', 'Administrativa'), ('ENSINO', 'Ensino'), ('CORREICIONAL', 'Correicional'), ('COMISSAO', 'Comissão'), ('ACAO_SOCIAL', 'Ação Social')], max_length=20, verbose_name='Tipo da Missão')),
+                ('status', models.CharField(choices=[('PLANEJADA', 'Planejada'), ('EM_ANDAMENTO', 'Em andamento'), ('CONCLUIDA', 'Concluída'), ('CANCELADA', 'Cancelada')], max_length=20, verbose_name='Status da Missão')),
+                ('posto', models.CharField(choices=[('Cel', 'Coronel'), ('Ten Cel', 'Tenente-Coronel'), ('Maj', 'Major'), ('Cap', 'Capitão'), ('1º Ten', 'Primeiro-Tenente'), ('2º Ten', 'Segundo-Tenente'), ('Asp', 'Aspirante')], max_length=20, verbose_name='Posto')),
+                ('quadro', models.CharField(choices=[('QOC', 'QOC'), ('QOA/Adm', 'QOA/Adm'), ('QOA/Mús', 'QOA/Mús'), ('QOM/Médico', 'QOM/Médico'), ('QOM/Dentista', 'QOM/Dentista')], max_length=20, verbose_name='Quadro')),
+                ('complexidade', models.CharField(choices=[('BAIXA', 'Baixa'), ('MEDIA', 'Média'), ('ALTA', 'Alta')], max_length=10, verbose_name='Complexidade')),
+                ('total', models.PositiveIntegerField(default=0, verbose_name='Designações')),
+                ('carga', models.PositiveIntegerField(default=0, verbose_name='Carga Ponderada')),
+                ('unidade', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='estatisticas', to='missoes.unidade', verbose_name='Unidade')),
+            ],
+            options={
+                'verbose_name': 'Estatística de Designações',
+                'verbose_name_plural': 'Estatísticas de Designações',
+                'ordering': ['-mes'],
+                'indexes': [models.Index(fields=['unidade', 'mes'], name='missoes_estat_unidade_idx')],
+                'constraints': [models.UniqueConstraint(fields=('mes', 'tipo', 'status', 'posto', 'quadro', 'unidade', 'complexidade'), name='missoes_estat_celula_unica', nulls_distinct=False)],
+            },
+        ),
+        migrations.RunPython(popular_estatisticas, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 6.0.1 on 2026-10-17 00:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('missoes', '0009_estatisticadesignacao'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='designacao',
+            index=models.Index(fields=['criado_em', 'id'], name='missoes_des_cursor_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='missao',
+            index=models.Index(fields=['data_inicio', 'id'], name='missoes_mis_cursor_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='oficial',
+            index=models.Index(fields=['posto', 'nome', 'id'], name='missoes_ofi_cursor_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='solicitacaodesignacao',
+            index=models.Index(fields=['criado_em', 'id'], name='missoes_sol_cursor_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='unidade',
+            index=models.Index(fields=['nome', 'id'], name='missoes_uni_cursor_idx'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 6.0.1 on 2026-10-17 00:13
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+# Expressões congeladas nesta migração (cópia de missoes/busca.py na época):
+# alterações posteriores na busca não mudam o que ela faz.
+ACENTOS = 'áàâãäéèêëíìîïóòôõöúùûüçñáàâãäéèêëíìîïóòôõöúùûüçñ'
+SEM_ACENTOS = 'aaaaaeeeeiiiiooooouuuucnaaaaaeeeeiiiiooooouuuucn'
+
+
+def _vetor(campos):
+    """setweight(to_tsvector(translate(lower(campo)))) de cada (campo, peso), concatenados."""
+    return ' || '.join(
+        f"setweight(to_tsvector('portuguese'::regconfig, "
+        f"TRANSLATE(LOWER(COALESCE({campo}, '')), '{ACENTOS}', '{SEM_ACENTOS}')), '{peso}')"
+        for campo, peso in campos
+    )
+
+
+# Calcula o vetor de busca dos oficiais existentes
+POPULAR_VETORES = 'UPDATE missoes_oficial SET busca_vetor = ' + _vetor(
+    (('nome', 'A'), ('nome_guerra', 'A'), ('cpf', 'B'), ('rg', 'B'))
+)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('missoes', '0010_indices_paginacao_cursor'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='oficial',
+            name='busca_vetor',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='Vetor de Busca'),
+        ),
+        migrations.AddIndex(
+            model_name='oficial',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['busca_vetor'], name='missoes_ofi_busca_gin'),
+        ),
+        migrations.RunSQL(POPULAR_VETORES, migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 6.0.1 on 2026-10-17 00:15
+
+import logging
+
+from django.db import DatabaseError, migrations, transaction
+
+logger = logging.getLogger(__name__)
+
+COLUNAS_TRIGRAM = ('nome', 'local', 'documento_referencia')
+
+
+def criar_indices_trigram(apps, schema_editor):
+    """
+    Habilita o pg_trgm e cria índices GIN (gin_trgm_ops) para as buscas por
+    trecho. Sem permissão para criar a extensão, segue sem os índices: a
+    busca continua funcionando por ILIKE (ver missoes/busca.py).
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    try:
+        with transaction.atomic(using=schema_editor.connection.alias):
+            schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    except DatabaseError:
+        logger.warning('Extensão pg_trgm indisponível; índices de trigramas não criados.')
+        return
+    for coluna in COLUNAS_TRIGRAM:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS missoes_mis_{coluna}_trgm '
+            f'ON missoes_missao USING gin ({coluna} gin_trgm_ops)'
+        )
+
+
+def remover_indices_trigram(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for coluna in COLUNAS_TRIGRAM:
+        schema_editor.execute(f'DROP INDEX IF EXISTS missoes_mis_{coluna}_trgm')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('missoes', '0011_oficial_busca_vetor'),
+    ]
+
+    operations = [
+        migrations.RunPython(criar_indices_trigram, remover_indices_trigram),
+    ]
@@ -0,0 +1,79 @@
+# Generated by Django 6.0.1 on 2026-10-17 01:05
+
+import logging
+
+from django.db import migrations
+
+logger = logging.getLogger(__name__)
+
+# Expressão de SemAcento (missoes/busca.py) congelada nesta migração. Precisa
+# ser idêntica, constantes incluídas, à gerada nas consultas para o índice ser usado.
+ACENTOS = 'áàâãäéèêëíìîïóòôõöúùûüçñáàâãäéèêëíìîïóòôõöúùûüçñ'
+SEM_ACENTOS = 'aaaaaeeeeiiiiooooouuuucnaaaaaeeeeiiiiooooouuuucn'
+
+# (tabela, coluna, nome do índice) buscados com __uicontains
+INDICES_SEM_ACENTO = (
+    ('missoes_oficial', 'nome', 'missoes_ofi_nome_sa_trgm'),
+    ('missoes_oficial', 'nome_guerra', 'missoes_ofi_guerra_sa_trgm'),
+    ('missoes_missao', 'nome', 'missoes_mis_nome_sa_trgm'),
+    ('missoes_missao', 'local', 'missoes_mis_local_sa_trgm'),
+    ('missoes_unidade', 'nome', 'missoes_uni_nome_sa_trgm'),
+    ('missoes_unidade', 'sigla', 'missoes_uni_sigla_sa_trgm'),
+)
+
+# Substituídos pelos índices sem acento (0012); documento_referencia continua
+INDICES_SUBSTITUIDOS = ('missoes_mis_nome_trgm', 'missoes_mis_local_trgm')
+
+
+def _pg_trgm_instalada(schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return False
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        return cursor.fetchone() is not None
+
+
+def _indice(tabela, coluna, nome):
+    return (
+        f'CREATE INDEX {nome} ON {tabela} USING gin '
+        f"((TRANSLATE(LOWER(COALESCE({coluna}, '')), '{ACENTOS}', '{SEM_ACENTOS}')) gin_trgm_ops)"
+    )
+
+
+def criar_indices_sem_acento(apps, schema_editor):
+    """
+    Índices GIN de trigramas sobre translate(lower(campo)) — a expressão de
+    SemAcento, imutável, no lugar de unaccent() (que não é IMMUTABLE e exige
+    a extensão). Sem pg_trgm, a busca funciona sem índice.
+    """
+    if not _pg_trgm_instalada(schema_editor):
+        logger.warning('Extensão pg_trgm indisponível; índices sem acento não criados.')
+        return
+    for nome in INDICES_SUBSTITUIDOS:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {nome}')
+    for tabela, coluna, nome in INDICES_SEM_ACENTO:
+        schema_editor.execute(_indice(tabela, coluna, nome))
+
+
+def remover_indices_sem_acento(apps, schema_editor):
+    if not _pg_trgm_instalada(schema_editor):
+        return
+    for _, _, nome in INDICES_SEM_ACENTO:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {nome}')
+    for nome in INDICES_SUBSTITUIDOS:
+        coluna = nome.removeprefix('missoes_mis_').removesuffix('_trgm')
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {nome} '
+            f'ON missoes_missao USING gin ({coluna} gin_trgm_ops)'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('missoes', '0012_indices_trigram_missao'),
+    ]
+
+    operations = [
+        migrations.RunPython(criar_indices_sem_acento, remover_indices_sem_acento),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 6.0.1 on 2026-10-17 01:40
+
+import django.contrib.postgres.indexes
+import missoes.busca
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('missoes', '0013_indices_sem_acento'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='missao',
+            index=models.Index(django.contrib.postgres.indexes.OpClass(missoes.busca.SoDigitos('documento_referencia'), name='text_pattern_ops'), name='missoes_mis_doc_digitos'),
+        ),
+        migrations.AddIndex(
+            model_name='oficial',
+            index=models.Index(fields=['cpf'], name='missoes_ofi_cpf_prefixo', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='oficial',
+            index=models.Index(django.contrib.postgres.indexes.OpClass(missoes.busca.Codigo('rg'), name='text_pattern_ops'), name='missoes_ofi_rg_codigo'),
+        ),
+        migrations.AddIndex(
+            model_name='usuario',
+            index=models.Index(fields=['cpf'], name='missoes_usu_cpf_prefixo', opclasses=['varchar_pattern_ops']),
+        ),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 6.0.1 on 2026-10-17 02:10
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+# Expressões congeladas nesta migração (cópia de missoes/busca.py na época):
+# alterações posteriores na busca não mudam o que ela faz.
+ACENTOS = 'áàâãäéèêëíìîïóòôõöúùûüçñáàâãäéèêëíìîïóòôõöúùûüçñ'
+SEM_ACENTOS = 'aaaaaeeeeiiiiooooouuuucnaaaaaeeeeiiiiooooouuuucn'
+
+
+def _vetor(campos):
+    """setweight(to_tsvector(translate(lower(campo)))) de cada (campo, peso), concatenados."""
+    return ' || '.join(
+        f"setweight(to_tsvector('portuguese'::regconfig, "
+        f"TRANSLATE(LOWER(COALESCE({campo}, '')), '{ACENTOS}', '{SEM_ACENTOS}')), '{peso}')"
+        for campo, peso in campos
+    )
+
+
+# Calcula o vetor de busca das missões, unidades e solicitações existentes
+POPULAR_VETORES = [
+    f'UPDATE {tabela} SET busca_vetor = {_vetor(campos)}'
+    for tabela, campos in (
+        ('missoes_missao', (
+            ('nome', 'A'), ('documento_referencia', 'A'), ('local', 'B'), ('descricao', 'C'),
+        )),
+        ('missoes_unidade', (('sigla', 'A'), ('nome', 'A'))),
+        ('missoes_solicitacaodesignacao', (
+            ('nome_missao', 'A'), ('documento_referencia', 'A'), ('local_missao', 'B'),
+        )),
+    )
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('missoes', '0014_indices_identificadores'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='missao',
+            name='busca_vetor',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='Vetor de Busca'),
+        ),
+        migrations.AddField(
+            model_name='solicitacaodesignacao',
+            name='busca_vetor',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='Vetor de Busca'),
+        ),
+        migrations.AddField(
+            model_name='unidade',
+            name='busca_vetor',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='Vetor de Busca'),
+        ),
+        migrations.AddIndex(
+            model_name='missao',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['busca_vetor'], name='missoes_mis_busca_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='solicitacaodesignacao',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['busca_vetor'], name='missoes_sol_busca_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='unidade',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['busca_vetor'], name='missoes_uni_busca_gin'),
+        ),
+        migrations.RunSQL(POPULAR_VETORES, migrations.RunSQL.noop),
+    ]
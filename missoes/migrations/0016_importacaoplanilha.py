@@ -0,0 +1,44 @@
+# Generated by Django 6.0.1 on 2026-10-17 02:40
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('missoes', '0015_vetores_busca_global'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportacaoPlanilha',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('oficiais', 'Oficiais'), ('missoes', 'Missões'), ('designacoes', 'Designações'), ('unidades', 'Unidades'), ('usuarios', 'Usuários')], max_length=20, verbose_name='Tipo')),
+                ('nome_arquivo', models.CharField(max_length=255, verbose_name='Arquivo')),
+                ('conteudo', models.BinaryField(null=True, verbose_name='Conteúdo')),
+                ('status', models.CharField(choices=[('PENDENTE', 'Na fila'), ('PROCESSANDO', 'Processando'), ('CONCLUIDA', 'Concluída'), ('FALHOU', 'Falhou')], default='PENDENTE', max_length=20, verbose_name='Status')),
+                ('total_linhas', models.PositiveIntegerField(blank=True, null=True, verbose_name='Linhas da Planilha')),
+                ('linhas_processadas', models.PositiveIntegerField(default=0, verbose_name='Linhas Processadas')),
+                ('criados', models.PositiveIntegerField(default=0, verbose_name='Criados')),
+                ('atualizados', models.PositiveIntegerField(default=0, verbose_name='Atualizados')),
+                ('total_erros', models.PositiveIntegerField(default=0, verbose_name='Erros')),
+                ('erros', models.JSONField(blank=True, default=list, verbose_name='Mensagens de Erro')),
+                ('mensagem', models.TextField(blank=True, verbose_name='Mensagem')),
+                ('pico_memoria_mb', models.FloatField(blank=True, null=True, verbose_name='Pico de Memória (MB)')),
+                ('criado_em', models.DateTimeField(auto_now_add=True, verbose_name='Enviado em')),
+                ('iniciado_em', models.DateTimeField(blank=True, null=True, verbose_name='Iniciado em')),
+                ('sinal_em', models.DateTimeField(blank=True, null=True, verbose_name='Último Sinal do Worker')),
+                ('concluido_em', models.DateTimeField(blank=True, null=True, verbose_name='Concluído em')),
+                ('criado_por', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='importacoes', to=settings.AUTH_USER_MODEL, verbose_name='Enviado por')),
+            ],
+            options={
+                'verbose_name': 'Importação de Planilha',
+                'verbose_name_plural': 'Importações de Planilha',
+                'ordering': ['-criado_em'],
+                'indexes': [models.Index(fields=['status', 'criado_em'], name='missoes_imp_fila_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-17 03:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('missoes', '0016_importacaoplanilha'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='importacaoplanilha',
+            name='tipo',
+            field=models.CharField(choices=[('oficiais', 'Oficiais'), ('missoes', 'Missões'), ('designacoes', 'Designações'), ('unidades', 'Unidades'), ('usuarios', 'Usuários'), ('completa', 'Planilha completa')], max_length=20, verbose_name='Tipo'),
+        ),
+    ]
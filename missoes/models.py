@@ -5,10 +5,49 @@ Sistema de Gestão de Missões - CBMGO
 ============================================================
 """
 
+from functools import lru_cache
+
+from django.contrib.auth.hashers import get_hasher, make_password
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
+from django.db.models.functions import Coalesce, Concat, Substr, Upper
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
 from django.utils import timezone
 
+from .busca import (
+    CAMPOS_BUSCA_MISSAO_VETOR, CAMPOS_BUSCA_SOLICITACAO, CAMPOS_BUSCA_UNIDADE, Codigo, SoDigitos,
+    buscar_missoes, consulta_prefixo, filtro_identificador, ranking, vetor_busca,
+    vetor_busca_oficial,
+)
+from .cache import incrementar_versao
+from .carga import PESOS_COMPLEXIDADE
+from .estatisticas import mes_de_referencia
+
+
+# ============================================================
+# 🔑 SENHA PADRÃO DAS CONTAS PROVISIONADAS
+# ============================================================
+# Senha inicial das contas criadas pelo sistema (cadastro, importação, reset)
+SENHA_PADRAO = '123456'
+
+# Sal fixo do hash provisório. É curto de propósito: o Django o considera
+# fraco (must_update) e, no primeiro login, refaz o hash com sal próprio.
+SAL_PROVISORIO = 'sigemprovisorio'
+
+
+@lru_cache(maxsize=None)
+def _hash_provisorio(algoritmo):
+    return make_password(SENHA_PADRAO, SAL_PROVISORIO, hasher=algoritmo)
+
+
+def hash_senha_padrao():
+    """
+    Hash da senha padrão compartilhado pelas contas provisionadas: um único
+    cálculo por processo em vez de um PBKDF2 completo por conta criada.
+    """
+    return _hash_provisorio(get_hasher().algorithm)
+
 
 # ============================================================
 # 👤 GERENCIADOR DE USUÁRIO CUSTOMIZADO
@@ -16,6 +55,18 @@ from django.utils import timezone
 class UsuarioManager(BaseUserManager):
     """Gerenciador customizado para o modelo Usuario."""
     
+    def provisionar(self, cpf, **extra_fields):
+        """
+        Cria e salva um usuário com a senha padrão, sem calcular hash
+        (ver hash_senha_padrao); o hash próprio é gerado no primeiro login.
+        """
+        if not cpf:
+            raise ValueError('O CPF é obrigatório')
+        
+        user = self.model(cpf=cpf, password=hash_senha_padrao(), **extra_fields)
+        user.save(using=self._db)
+        return user
+    
     def create_user(self, cpf, password=None, **extra_fields):
         """Cria e salva um usuário comum."""
         if not cpf:
@@ -36,6 +87,63 @@ class UsuarioManager(BaseUserManager):
         return self.create_user(cpf, password, **extra_fields)
 
 
+# ============================================================
+# 🎖️ QUERYSET: OFICIAL
+# ============================================================
+class OficialQuerySet(models.QuerySet):
+    """QuerySet customizado para o modelo Oficial."""
+    
+    def with_carga(self):
+        """
+        Anota a carga de trabalho atual (missões EM_ANDAMENTO) em um único
+        GROUP BY: atual_ativas, atual_baixa, atual_media, atual_alta e atual_carga.
+        """
+        ativa = models.Q(designacoes__missao__status='EM_ANDAMENTO')
+        
+        return self.annotate(
+            atual_ativas=models.Count('designacoes', filter=ativa),
+            atual_baixa=models.Count('designacoes', filter=ativa & models.Q(designacoes__complexidade='BAIXA')),
+            atual_media=models.Count('designacoes', filter=ativa & models.Q(designacoes__complexidade='MEDIA')),
+            atual_alta=models.Count('designacoes', filter=ativa & models.Q(designacoes__complexidade='ALTA')),
+            atual_carga=Coalesce(
+                models.Sum(
+                    models.Case(
+                        *[
+                            models.When(designacoes__complexidade=c, then=models.Value(p))
+                            for c, p in PESOS_COMPLEXIDADE.items()
+                        ],
+                        default=models.Value(0),
+                    ),
+                    filter=ativa,
+                ),
+                models.Value(0),
+            ),
+        )
+    
+    def visible_to(self, request):
+        """Oficiais dentro do escopo de acesso da requisição (um único predicado SQL)."""
+        from .escopo import escopo_da_requisicao
+        
+        return self.filter(escopo_da_requisicao(request).predicado_oficiais())
+    
+    def buscar(self, texto):
+        """
+        Busca textual (nome, nome de guerra, CPF, RG) pelo índice GIN,
+        sem acentos e por prefixo. Anota 'relevancia' para ordenação.
+        CPF e RG digitados vão direto aos índices b-tree.
+        """
+        identificador = filtro_identificador(texto)
+        if identificador is not None:
+            return self.filter(identificador).annotate(
+                relevancia=models.Value(1.0, output_field=models.FloatField())
+            )
+        
+        consulta = consulta_prefixo(texto)
+        if consulta is None:
+            return self
+        return self.filter(busca_vetor=consulta).annotate(relevancia=ranking(consulta))
+
+
 # ============================================================
 # 🎖️ MODELO: OFICIAL
 # ============================================================
@@ -67,6 +175,14 @@ class Oficial(models.Model):
     posto = models.CharField('Posto', max_length=20, choices=POSTO_CHOICES)
     quadro = models.CharField('Quadro', max_length=20, choices=QUADRO_CHOICES)
     obm = models.CharField('OBM de Lotação', max_length=100, blank=True)
+    unidade = models.ForeignKey(
+        'Unidade',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='oficiais',
+        verbose_name='Unidade de Lotação'
+    )
     funcao = models.CharField('Função', max_length=100, blank=True)
     email = models.EmailField('E-mail', blank=True)
     telefone = models.CharField('Telefone', max_length=20, blank=True)
@@ -75,14 +191,58 @@ class Oficial(models.Model):
     criado_em = models.DateTimeField('Criado em', auto_now_add=True)
     atualizado_em = models.DateTimeField('Atualizado em', auto_now=True)
     
+    # Carga de trabalho em missões EM_ANDAMENTO (mantida por missoes/carga.py)
+    qtd_ativas = models.PositiveIntegerField('Missões Ativas', default=0, editable=False)
+    qtd_baixa = models.PositiveIntegerField('Designações de Baixa Complexidade', default=0, editable=False)
+    qtd_media = models.PositiveIntegerField('Designações de Média Complexidade', default=0, editable=False)
+    qtd_alta = models.PositiveIntegerField('Designações de Alta Complexidade', default=0, editable=False)
+    carga_ponderada = models.PositiveIntegerField('Carga Ponderada', default=0, editable=False)
+    
+    # Vetor de busca textual (mantido no save; ver missoes/busca.py)
+    busca_vetor = SearchVectorField('Vetor de Busca', null=True, editable=False)
+    
+    objects = OficialQuerySet.as_manager()
+    
     class Meta:
         verbose_name = 'Oficial'
         verbose_name_plural = 'Oficiais'
         ordering = ['posto', 'nome']
+        indexes = [
+            models.Index(fields=['carga_ponderada']),
+            # Paginação por cursor: (posto, nome, id)
+            models.Index(fields=['posto', 'nome', 'id'], name='missoes_ofi_cursor_idx'),
+            GinIndex(fields=['busca_vetor'], name='missoes_ofi_busca_gin'),
+            # Busca por identificador: início do CPF e RG sem pontuação
+            models.Index(fields=['cpf'], name='missoes_ofi_cpf_prefixo', opclasses=['varchar_pattern_ops']),
+            models.Index(OpClass(Codigo('rg'), name='text_pattern_ops'), name='missoes_ofi_rg_codigo'),
+        ]
     
     def __str__(self):
         return f"{self.posto} {self.nome_guerra or self.nome}"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._obm_original = instance.__dict__.get('obm')
+        instance._unidade_id_original = instance.__dict__.get('unidade_id')
+        return instance
+    
+    def save(self, *args, **kwargs):
+        """
+        Salva o oficial. Se a OBM mudou e a unidade não foi escolhida no mesmo
+        salvamento, vincula a unidade a partir do texto da OBM.
+        """
+        obm_alterada = self.obm != getattr(self, '_obm_original', '')
+        unidade_escolhida = self.unidade_id != getattr(self, '_unidade_id_original', None)
+        if obm_alterada and not unidade_escolhida:
+            self.unidade = Unidade.objects.resolver_obm(self.obm)
+        self.busca_vetor = vetor_busca_oficial(self)
+        super().save(*args, **kwargs)
+        # O vetor fica adiado: é lido do banco apenas se acessado
+        self.__dict__.pop('busca_vetor', None)
+        self._obm_original = self.obm
+        self._unidade_id_original = self.unidade_id
+    
     @property
     def foto_url(self):
         """Retorna a URL da foto ou uma imagem padrão."""
@@ -90,39 +250,34 @@ class Oficial(models.Model):
             return self.foto.url
         return '/static/img/default_avatar.png'
     
+    def _valor_carga(self, anotacao, campo):
+        """Usa a anotação de with_carga() quando presente, senão o contador armazenado."""
+        return self.__dict__.get(anotacao, getattr(self, campo))
+    
     @property
     def total_missoes_ativas(self):
         """Retorna o total de missões ativas do oficial."""
-        return self.designacoes.filter(missao__status='EM_ANDAMENTO').count()
+        return self._valor_carga('atual_ativas', 'qtd_ativas')
     
     @property
     def total_baixa(self):
         """Total de designações de complexidade BAIXA em missões EM_ANDAMENTO."""
-        return self.designacoes.filter(
-            missao__status='EM_ANDAMENTO',
-            complexidade='BAIXA'
-        ).count()
+        return self._valor_carga('atual_baixa', 'qtd_baixa')
     
     @property
     def total_media(self):
         """Total de designações de complexidade MÉDIA em missões EM_ANDAMENTO."""
-        return self.designacoes.filter(
-            missao__status='EM_ANDAMENTO',
-            complexidade='MEDIA'
-        ).count()
+        return self._valor_carga('atual_media', 'qtd_media')
     
     @property
     def total_alta(self):
         """Total de designações de complexidade ALTA em missões EM_ANDAMENTO."""
-        return self.designacoes.filter(
-            missao__status='EM_ANDAMENTO',
-            complexidade='ALTA'
-        ).count()
+        return self._valor_carga('atual_alta', 'qtd_alta')
     
     @property
     def carga_total(self):
         """Carga ponderada: Baixa=1, Média=2, Alta=3."""
-        return self.total_baixa + (self.total_media * 2) + (self.total_alta * 3)
+        return self._valor_carga('atual_carga', 'carga_ponderada')
     
     def get_ultimas_missoes(self, limit=5):
         """Retorna as últimas missões do oficial."""
@@ -131,6 +286,40 @@ class Oficial(models.Model):
         ).order_by('-criado_em')[:limit]
 
 
+# ============================================================
+# 🗂️ QUERYSET: MISSÃO
+# ============================================================
+class MissaoQuerySet(models.QuerySet):
+    """QuerySet customizado para o modelo Missao."""
+    
+    def buscar(self, texto, campos=None):
+        """
+        Busca por trecho, sem acentos, em nome, local e documento (índices de
+        trigramas), tolerante a erros de digitação no nome. Anota 'similaridade'.
+        """
+        if not texto:
+            return self
+        if campos is None:
+            return buscar_missoes(self, texto)
+        return buscar_missoes(self, texto, campos)
+    
+    def visible_to(self, request):
+        """
+        Missões dentro do escopo de acesso da requisição: perfis de visão ampla
+        veem todas; os demais, as que têm designação de um oficial visível.
+        """
+        from .escopo import escopo_da_requisicao
+        
+        escopo = escopo_da_requisicao(request)
+        if escopo.ve_todos:
+            return self
+        return self.filter(models.Exists(
+            Designacao.objects.filter(
+                escopo.predicado_oficiais(prefixo='oficial__'), missao=models.OuterRef('pk'),
+            )
+        ))
+
+
 # ============================================================
 # 🗂️ MODELO: MISSÃO
 # ============================================================
@@ -164,6 +353,14 @@ class Missao(models.Model):
     criado_em = models.DateTimeField('Criado em', auto_now_add=True)
     atualizado_em = models.DateTimeField('Atualizado em', auto_now=True)
     
+    # Mês de referência no cubo de estatísticas (início ou cadastro; mantido no save)
+    mes_referencia = models.DateField('Mês de Referência', null=True, editable=False)
+    
+    # Vetor de busca textual (busca global; mantido no save)
+    busca_vetor = SearchVectorField('Vetor de Busca', null=True, editable=False)
+    
+    objects = MissaoQuerySet.as_manager()
+    
     class Meta:
         verbose_name = 'Missão'
         verbose_name_plural = 'Missões'
@@ -173,11 +370,27 @@ class Missao(models.Model):
             models.Index(fields=['status']),
             models.Index(fields=['data_inicio']),
             models.Index(fields=['criado_em']),
+            models.Index(fields=['mes_referencia']),
+            # Paginação por cursor: (data_inicio, id)
+            models.Index(fields=['data_inicio', 'id'], name='missoes_mis_cursor_idx'),
+            # Busca por número SEI/BG (prefixo, sem pontuação)
+            models.Index(
+                OpClass(SoDigitos('documento_referencia'), name='text_pattern_ops'),
+                name='missoes_mis_doc_digitos',
+            ),
+            GinIndex(fields=['busca_vetor'], name='missoes_mis_busca_gin'),
         ]
     
     def __str__(self):
         return f"{self.nome} ({self.get_tipo_display()})"
     
+    def save(self, *args, **kwargs):
+        """Salva a missão atualizando o mês de referência e o vetor de busca."""
+        self.mes_referencia = mes_de_referencia(self.data_inicio, self.criado_em or timezone.now())
+        self.busca_vetor = vetor_busca(CAMPOS_BUSCA_MISSAO_VETOR, self)
+        super().save(*args, **kwargs)
+        self.__dict__.pop('busca_vetor', None)
+    
     @property
     def total_designados(self):
         """Retorna o total de oficiais designados."""
@@ -265,6 +478,8 @@ class Designacao(models.Model):
             models.Index(fields=['complexidade']),
             models.Index(fields=['funcao_na_missao']),
             models.Index(fields=['status']),
+            # Paginação por cursor: (criado_em, id)
+            models.Index(fields=['criado_em', 'id'], name='missoes_des_cursor_idx'),
         ]
     
     def __str__(self):
@@ -276,6 +491,61 @@ class Designacao(models.Model):
         return self.funcao_na_missao in ['COMANDANTE', 'SUBCOMANDANTE', 'COORDENADOR', 'PRESIDENTE', 'ENCARREGADO']
 
 
+# ============================================================
+# 🏢 QUERYSET: UNIDADE
+# ============================================================
+class UnidadeQuerySet(models.QuerySet):
+    """Consultas na hierarquia de unidades via caminho materializado."""
+    
+    def resolver_obm(self, obm):
+        """
+        Unidade cuja sigla ou nome corresponde exatamente ao texto da OBM.
+        Retorna None se não houver correspondência ou se ela for ambígua.
+        """
+        obm = ' '.join((obm or '').split())
+        if not obm:
+            return None
+        candidatas = list(self.filter(models.Q(sigla__iexact=obm) | models.Q(nome__iexact=obm))[:2])
+        return candidatas[0] if len(candidatas) == 1 else None
+    
+    def resolver_obms(self, obms):
+        """
+        resolver_obm() para vários textos em uma única consulta (importações).
+        Retorna {obm: unidade ou None} para cada texto informado.
+        """
+        normalizados = {obm: ' '.join((obm or '').split()).upper() for obm in obms}
+        procurados = sorted({n for n in normalizados.values() if n})
+        candidatas = {}
+        if procurados:
+            unidades = self.annotate(
+                sigla_upper=Upper('sigla'), nome_upper=Upper('nome'),
+            ).filter(models.Q(sigla_upper__in=procurados) | models.Q(nome_upper__in=procurados))
+            for unidade in unidades:
+                for chave in {unidade.sigla_upper, unidade.nome_upper}:
+                    candidatas.setdefault(chave, []).append(unidade)
+        resolvidas = {}
+        for obm, normalizado in normalizados.items():
+            encontradas = candidatas.get(normalizado, [])
+            resolvidas[obm] = encontradas[0] if len(encontradas) == 1 else None
+        return resolvidas
+    
+    def subordinadas_de(self, unidade, incluir_propria=True):
+        """Unidade e toda a sua cadeia de subordinadas (uma consulta indexada)."""
+        if not unidade.caminho:
+            return self.filter(pk=unidade.pk) if incluir_propria else self.none()
+        subarvore = self.filter(caminho__startswith=unidade.caminho)
+        if not incluir_propria:
+            subarvore = subarvore.exclude(pk=unidade.pk)
+        return subarvore
+    
+    def superiores_de(self, unidade, incluir_propria=False):
+        """Cadeia de comando acima da unidade, da raiz até ela."""
+        ids = unidade.ids_caminho
+        if not incluir_propria:
+            ids = ids[:-1]
+        return self.filter(pk__in=ids).order_by('caminho')
+
+
 # ============================================================
 # 🏢 MODELO: UNIDADE
 # ============================================================
@@ -302,15 +572,106 @@ class Unidade(models.Model):
         related_name='subordinadas',
         verbose_name='Comando Superior'
     )
+    # Caminho materializado na hierarquia: "/<id raiz>/.../<id própria>/"
+    caminho = models.CharField('Caminho na Hierarquia', max_length=500, blank=True, editable=False)
     criado_em = models.DateTimeField('Criado em', auto_now_add=True)
     
+    # Vetor de busca textual (busca global; mantido no save)
+    busca_vetor = SearchVectorField('Vetor de Busca', null=True, editable=False)
+    
+    objects = UnidadeQuerySet.as_manager()
+    
     class Meta:
         verbose_name = 'Unidade'
         verbose_name_plural = 'Unidades'
         ordering = ['nome']
+        indexes = [
+            models.Index(
+                fields=['caminho'],
+                name='missoes_uni_caminho_idx',
+                opclasses=['varchar_pattern_ops'],
+            ),
+            # Paginação por cursor: (nome, id)
+            models.Index(fields=['nome', 'id'], name='missoes_uni_cursor_idx'),
+            GinIndex(fields=['busca_vetor'], name='missoes_uni_busca_gin'),
+        ]
     
     def __str__(self):
         return self.sigla or self.nome
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._identificacao_original = (instance.__dict__.get('nome'), instance.__dict__.get('sigla'))
+        return instance
+    
+    @property
+    def identificacao_alterada(self):
+        """Nome ou sigla diferentes dos carregados do banco (sempre True para unidade nova)."""
+        return (self.nome, self.sigla) != getattr(self, '_identificacao_original', None)
+    
+    @property
+    def ids_caminho(self):
+        """IDs da cadeia de comando, da raiz até a própria unidade."""
+        return [int(pk) for pk in self.caminho.strip('/').split('/') if pk]
+    
+    def get_subordinadas(self, incluir_propria=True):
+        """Retorna a unidade e todas as subordinadas, em qualquer nível."""
+        return Unidade.objects.subordinadas_de(self, incluir_propria)
+    
+    def get_superiores(self, incluir_propria=False):
+        """Retorna a cadeia de comando acima da unidade."""
+        return Unidade.objects.superiores_de(self, incluir_propria)
+    
+    def _caminho_superior(self):
+        """Caminho do comando superior (ou raiz)."""
+        if not self.comando_superior_id:
+            return '/'
+        caminho = Unidade.objects.filter(pk=self.comando_superior_id).values_list('caminho', flat=True).first()
+        return caminho or '/'
+    
+    def clean(self):
+        """Impede ciclos na hierarquia."""
+        from django.core.exceptions import ValidationError
+        
+        if self.pk and self.comando_superior_id and f'/{self.pk}/' in self._caminho_superior():
+            raise ValidationError({
+                'comando_superior': 'Uma unidade não pode ser subordinada a si mesma ou a uma subordinada.'
+            })
+    
+    def save(self, *args, **kwargs):
+        """Salva e mantém o caminho materializado da unidade e das subordinadas."""
+        caminho_superior = self._caminho_superior()
+        if self.pk and f'/{self.pk}/' in caminho_superior:
+            raise ValueError('Uma unidade não pode ser subordinada a si mesma ou a uma subordinada.')
+        
+        identificacao_alterada = self.identificacao_alterada
+        self.busca_vetor = vetor_busca(CAMPOS_BUSCA_UNIDADE, self)
+        super().save(*args, **kwargs)
+        self.__dict__.pop('busca_vetor', None)
+        self._identificacao_original = (self.nome, self.sigla)
+        
+        novo_caminho = f'{caminho_superior}{self.pk}/'
+        caminho_alterado = novo_caminho != self.caminho
+        if caminho_alterado:
+            caminho_antigo = self.caminho
+            if caminho_antigo:
+                # Move a subárvore inteira em um único UPDATE
+                Unidade.objects.filter(caminho__startswith=caminho_antigo).update(
+                    caminho=Concat(
+                        models.Value(novo_caminho),
+                        Substr('caminho', len(caminho_antigo) + 1),
+                        output_field=models.CharField(),
+                    )
+                )
+            else:
+                Unidade.objects.filter(pk=self.pk).update(caminho=novo_caminho)
+            self.caminho = novo_caminho
+        
+        # Escopos em cache dependem da árvore e das siglas/nomes: invalida só
+        # agora, com os caminhos da subárvore já gravados
+        if caminho_alterado or identificacao_alterada:
+            incrementar_versao('hierarquia')
 
 
 # ============================================================
@@ -351,6 +712,10 @@ class Usuario(AbstractBaseUser, PermissionsMixin):
     class Meta:
         verbose_name = 'Usuário'
         verbose_name_plural = 'Usuários'
+        indexes = [
+            # Busca por início do CPF
+            models.Index(fields=['cpf'], name='missoes_usu_cpf_prefixo', opclasses=['varchar_pattern_ops']),
+        ]
     
     def __str__(self):
         if self.oficial:
@@ -458,60 +823,46 @@ class Usuario(AbstractBaseUser, PermissionsMixin):
     # 🏢 MÉTODOS PARA COMANDANTE (OBM)
     # ============================================================
     
+    def get_unidade_comandante(self):
+        """Unidade de lotação do oficial vinculado ao usuário."""
+        if not self.oficial:
+            return None
+        return self.oficial.unidade
+    
+    def get_unidades_subordinadas(self):
+        """Unidade do comandante e todas as subordinadas (QuerySet)."""
+        unidade = self.get_unidade_comandante()
+        if not unidade:
+            return Unidade.objects.none()
+        return unidade.get_subordinadas()
+    
     def get_obm_subordinadas(self):
         """Retorna lista de OBMs subordinadas ao comandante."""
         if not self.oficial:
             return []
         
         obm_usuario = self.oficial.obm
-        if not obm_usuario:
-            return []
-        
-        # Buscar a unidade do comandante
-        try:
-            unidade_comandante = Unidade.objects.get(
-                models.Q(nome__icontains=obm_usuario) | models.Q(sigla__icontains=obm_usuario)
-            )
-        except Unidade.DoesNotExist:
-            return [obm_usuario]
-        except Unidade.MultipleObjectsReturned:
-            unidade_comandante = Unidade.objects.filter(
-                models.Q(nome__icontains=obm_usuario) | models.Q(sigla__icontains=obm_usuario)
-            ).first()
+        unidade_comandante = self.get_unidade_comandante()
+        if not unidade_comandante:
+            return [obm_usuario] if obm_usuario else []
         
-        # Buscar subordinadas recursivamente
-        obms = [obm_usuario]
-        obms.extend(self._get_subordinadas_recursivo(unidade_comandante))
+        # Subordinadas em todos os níveis (uma única consulta)
+        obms = [obm_usuario] if obm_usuario else []
+        for sigla, nome in unidade_comandante.get_subordinadas().values_list('sigla', 'nome'):
+            if sigla:
+                obms.append(sigla)
+            if nome:
+                obms.append(nome)
         
         return list(set(obms))
     
-    def _get_subordinadas_recursivo(self, unidade):
-        """Busca recursiva de unidades subordinadas."""
-        subordinadas = []
-        for sub in unidade.subordinadas.all():
-            if sub.sigla:
-                subordinadas.append(sub.sigla)
-            if sub.nome:
-                subordinadas.append(sub.nome)
-            subordinadas.extend(self._get_subordinadas_recursivo(sub))
-        return subordinadas
-    
     def pode_ver_oficial(self, oficial):
         """Verifica se o usuário pode ver determinado oficial."""
-        # Admin, Corregedor, BM/3 e Comando-Geral veem todos
-        if self.role in ['admin', 'corregedor', 'bm3', 'comando_geral']:
-            return True
-        
-        # Comandante vê apenas sua OBM e subordinadas
-        if self.role == 'comandante':
-            obms_permitidas = self.get_obm_subordinadas()
-            return any(obm in (oficial.obm or '') for obm in obms_permitidas)
+        # Admin, Corregedor, BM/3 e Comando-Geral veem todos; comandante vê
+        # sua OBM e subordinadas; oficial comum vê apenas a si mesmo
+        from .escopo import obter_escopo
         
-        # Oficial comum vê apenas a si mesmo
-        if self.role == 'oficial':
-            return self.oficial and self.oficial.id == oficial.id
-        
-        return False
+        return obter_escopo(self).pode_ver_oficial(oficial)
     
     @property
     def foto_url(self):
@@ -610,6 +961,9 @@ class SolicitacaoDesignacao(models.Model):
     criado_em = models.DateTimeField('Criado em', auto_now_add=True)
     atualizado_em = models.DateTimeField('Atualizado em', auto_now=True)
     
+    # Vetor de busca textual (busca global; mantido no save)
+    busca_vetor = SearchVectorField('Vetor de Busca', null=True, editable=False)
+    
     class Meta:
         verbose_name = 'Solicitação de Designação'
         verbose_name_plural = 'Solicitações de Designação'
@@ -618,12 +972,21 @@ class SolicitacaoDesignacao(models.Model):
             models.Index(fields=['status']),
             models.Index(fields=['criado_em']),
             models.Index(fields=['solicitante']),
+            # Paginação por cursor: (criado_em, id)
+            models.Index(fields=['criado_em', 'id'], name='missoes_sol_cursor_idx'),
+            GinIndex(fields=['busca_vetor'], name='missoes_sol_busca_gin'),
         ]
     
     def __str__(self):
         missao_nome = self.missao_existente.nome if self.missao_existente else self.nome_missao
         return f"{self.solicitante} - {missao_nome} ({self.get_status_display()})"
     
+    def save(self, *args, **kwargs):
+        """Salva a solicitação atualizando o vetor de busca."""
+        self.busca_vetor = vetor_busca(CAMPOS_BUSCA_SOLICITACAO, self)
+        super().save(*args, **kwargs)
+        self.__dict__.pop('busca_vetor', None)
+    
     def aprovar(self, usuario_aprovador, observacao=''):
         """
         Aprova a solicitação e cria a missão/designação automaticamente.
@@ -685,4 +1048,177 @@ class SolicitacaoDesignacao(models.Model):
         self.avaliado_por = usuario_aprovador
         self.data_avaliacao = timezone.now()
         self.observacao_avaliador = observacao
-        self.save()
\ No newline at end of file
+        self.save()
+
+# ============================================================
+# 📈 QUERYSET: ESTATÍSTICAS
+# ============================================================
+class EstatisticaQuerySet(models.QuerySet):
+    """Consultas sobre o cubo de estatísticas (sempre somando as células)."""
+    
+    def visible_to(self, request):
+        """Células visíveis ao usuário: comandante vê apenas suas unidades."""
+        from .escopo import escopo_da_requisicao
+        
+        escopo = escopo_da_requisicao(request)
+        if escopo.ve_todos:
+            return self
+        if escopo.role == 'comandante' and escopo.unidade_ids:
+            return self.filter(unidade_id__in=sorted(escopo.unidade_ids))
+        return self.none()
+    
+    def distribuicao(self, campo):
+        """Totais agrupados por uma dimensão (ex.: 'tipo', 'posto', 'unidade__sigla')."""
+        return (
+            self.order_by()
+            .values(campo)
+            .annotate(designacoes=models.Sum('total'), carga=models.Sum('carga'))
+            .order_by(campo)
+        )
+    
+    def evolucao_mensal(self, meses=12):
+        """Totais por mês, dos últimos N meses (incluindo o atual)."""
+        hoje = timezone.localdate()
+        indice = hoje.year * 12 + hoje.month - meses
+        inicio = hoje.replace(year=indice // 12, month=indice % 12 + 1, day=1)
+        return self.filter(mes__gte=inicio).distribuicao('mes')
+
+
+# ============================================================
+# 📈 MODELO: ESTATÍSTICA DE DESIGNAÇÕES (cubo)
+# ============================================================
+class EstatisticaDesignacao(models.Model):
+    """
+    Cubo pré-agregado de designações: quantidade e carga ponderada por
+    (mês, tipo, status, posto, quadro, unidade, complexidade).
+    Mantido por missoes/estatisticas.py; não editar manualmente.
+    """
+    
+    mes = models.DateField('Mês de Referência')
+    tipo = models.CharField('Tipo da Missão', max_length=20, choices=Missao.TIPO_CHOICES)
+    status = models.CharField('Status da Missão', max_length=20, choices=Missao.STATUS_CHOICES)
+    posto = models.CharField('Posto', max_length=20, choices=Oficial.POSTO_CHOICES)
+    quadro = models.CharField('Quadro', max_length=20, choices=Oficial.QUADRO_CHOICES)
+    unidade = models.ForeignKey(
+        'Unidade',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='estatisticas',
+        verbose_name='Unidade'
+    )
+    complexidade = models.CharField('Complexidade', max_length=10, choices=Designacao.COMPLEXIDADE_CHOICES)
+    total = models.PositiveIntegerField('Designações', default=0)
+    carga = models.PositiveIntegerField('Carga Ponderada', default=0)
+    
+    objects = EstatisticaQuerySet.as_manager()
+    
+    class Meta:
+        verbose_name = 'Estatística de Designações'
+        verbose_name_plural = 'Estatísticas de Designações'
+        ordering = ['-mes']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['mes', 'tipo', 'status', 'posto', 'quadro', 'unidade', 'complexidade'],
+                name='missoes_estat_celula_unica',
+                # Células sem unidade também são únicas (upsert em atualizar_estatisticas);
+                # NULLS NOT DISTINCT exige PostgreSQL 15+
+                nulls_distinct=False,
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['unidade', 'mes'], name='missoes_estat_unidade_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.mes:%m/%Y} {self.tipo}/{self.status} {self.posto} {self.complexidade}: {self.total}"
+
+
+# ============================================================
+# 📤 MODELO: IMPORTAÇÃO DE PLANILHA (fila)
+# ============================================================
+class ImportacaoPlanilha(models.Model):
+    """
+    Planilha enviada pelo painel e importada fora da requisição pelo
+    comando processar_importacoes (missoes/importacao.py). O painel
+    acompanha o progresso consultando este registro.
+    """
+    
+    TIPO_CHOICES = [
+        ('oficiais', 'Oficiais'),
+        ('missoes', 'Missões'),
+        ('designacoes', 'Designações'),
+        ('unidades', 'Unidades'),
+        ('usuarios', 'Usuários'),
+        ('completa', 'Planilha completa'),
+    ]
+    
+    STATUS_CHOICES = [
+        ('PENDENTE', 'Na fila'),
+        ('PROCESSANDO', 'Processando'),
+        ('CONCLUIDA', 'Concluída'),
+        ('FALHOU', 'Falhou'),
+    ]
+    
+    # Mensagens de erro guardadas por importação (as demais só entram na contagem)
+    LIMITE_ERROS = 100
+    
+    tipo = models.CharField('Tipo', max_length=20, choices=TIPO_CHOICES)
+    nome_arquivo = models.CharField('Arquivo', max_length=255)
+    # Planilha enviada, no banco para que o worker a leia de qualquer servidor;
+    # apagada ao fim do processamento
+    conteudo = models.BinaryField('Conteúdo', null=True, editable=False)
+    status = models.CharField('Status', max_length=20, choices=STATUS_CHOICES, default='PENDENTE')
+    criado_por = models.ForeignKey(
+        'Usuario',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='importacoes',
+        verbose_name='Enviado por'
+    )
+    
+    # Progresso e resultado
+    total_linhas = models.PositiveIntegerField('Linhas da Planilha', null=True, blank=True)
+    linhas_processadas = models.PositiveIntegerField('Linhas Processadas', default=0)
+    criados = models.PositiveIntegerField('Criados', default=0)
+    atualizados = models.PositiveIntegerField('Atualizados', default=0)
+    total_erros = models.PositiveIntegerField('Erros', default=0)
+    erros = models.JSONField('Mensagens de Erro', default=list, blank=True)
+    mensagem = models.TextField('Mensagem', blank=True)
+    pico_memoria_mb = models.FloatField('Pico de Memória (MB)', null=True, blank=True)
+    
+    criado_em = models.DateTimeField('Enviado em', auto_now_add=True)
+    iniciado_em = models.DateTimeField('Iniciado em', null=True, blank=True)
+    # Renovado pelo worker a cada lote; sem renovação, a importação é dada como interrompida
+    sinal_em = models.DateTimeField('Último Sinal do Worker', null=True, blank=True)
+    concluido_em = models.DateTimeField('Concluído em', null=True, blank=True)
+    
+    class Meta:
+        verbose_name = 'Importação de Planilha'
+        verbose_name_plural = 'Importações de Planilha'
+        ordering = ['-criado_em']
+        indexes = [
+            # Fila do worker: pendentes por ordem de envio
+            models.Index(fields=['status', 'criado_em'], name='missoes_imp_fila_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_tipo_display()} - {self.nome_arquivo} ({self.get_status_display()})"
+    
+    @property
+    def em_andamento(self):
+        return self.status in ('PENDENTE', 'PROCESSANDO')
+    
+    @property
+    def total_importados(self):
+        return self.criados + self.atualizados
+    
+    @property
+    def percentual(self):
+        """Progresso (0-100); None enquanto o total de linhas é desconhecido."""
+        if self.status == 'CONCLUIDA':
+            return 100
+        if not self.total_linhas:
+            return None
+        return min(100, self.linhas_processadas * 100 // self.total_linhas)
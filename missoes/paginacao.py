@@ -0,0 +1,431 @@
+"""
+============================================================
+📑 SIGEM - Paginação
+Paginação por cursor (keyset) para as tabelas administrativas
+============================================================
+
+Com ?paginacao=cursor (ou PAGINACAO_CURSOR=True nas configurações) as
+tabelas deixam de usar OFFSET/LIMIT + COUNT(*): cada página é buscada a
+partir dos valores da chave de ordenação (mais o id) da última linha
+exibida, com custo constante em qualquer profundidade.
+
+No modo por número, PaginatorAproximado evita o COUNT(*) exato:
+estimativa do PostgreSQL para tabelas sem filtro, contagem limitada
+(e em cache) para listas filtradas, e contagem exata só com ?contagem=exata.
+Com total aproximado, a existência da próxima página vem das linhas
+buscadas, não do total.
+"""
+
+import base64
+import binascii
+import datetime
+import json
+from math import ceil
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, FieldError, ValidationError
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger, Paginator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.db.models import F, OrderBy, Q
+from django.utils.functional import cached_property
+
+from .cache import em_cache, entidades_da_consulta
+
+# Contagens acima deste limite aparecem como "1000+" (ou estimadas)
+LIMITE_CONTAGEM = 1000
+
+
+# ============================================================
+# 🎟️ TOKENS (opacos: JSON em base64)
+# ============================================================
+class _EncoderCursor(DjangoJSONEncoder):
+    """
+    Valores tipados: datas em isoformat (com microssegundos, que o
+    DjangoJSONEncoder trunca), decimais como texto, inteiros como números.
+    """
+
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def _codificar_token(dados):
+    texto = json.dumps(dados, cls=_EncoderCursor, separators=(',', ':'))
+    return base64.urlsafe_b64encode(texto.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def _decodificar_token(token):
+    """Retorna o dicionário do token ou None se for inválido."""
+    try:
+        preenchimento = '=' * (-len(token) % 4)
+        dados = json.loads(base64.urlsafe_b64decode(token + preenchimento))
+    except (binascii.Error, ValueError, UnicodeDecodeError):
+        return None
+    return dados if isinstance(dados, dict) else None
+
+
+# ============================================================
+# 🔑 CHAVE DE ORDENAÇÃO
+# ============================================================
+def _campo_do_modelo(modelo, caminho):
+    """Resolve 'oficial__nome' até o campo final; None para anotações."""
+    campo = None
+    for parte in caminho.split('__'):
+        try:
+            campo = modelo._meta.get_field(parte)
+        except FieldDoesNotExist:
+            return None
+        if campo.is_relation and campo.related_model:
+            modelo = campo.related_model
+    return campo
+
+
+def _valor_do_objeto(objeto, caminho):
+    for parte in caminho.split('__'):
+        if objeto is None:
+            return None
+        objeto = getattr(objeto, parte)
+    return getattr(objeto, 'pk', objeto)
+
+
+def _termo_de_ordenacao(termo):
+    """(caminho, descendente) de 'campo', '-campo', F('campo') ou F('campo').desc()."""
+    if isinstance(termo, str):
+        return termo.lstrip('-'), termo.startswith('-')
+    if isinstance(termo, F):
+        return termo.name, False
+    if isinstance(termo, OrderBy) and isinstance(termo.expression, F):
+        return termo.expression.name, termo.descending
+    raise TypeError(f'Ordenação não suportada na paginação por cursor: {termo!r}')
+
+
+def _campo_da_chave(queryset, caminho):
+    """Campo do modelo ou, para anotações, o output_field (para restaurar o tipo)."""
+    anotacao = queryset.query.annotations.get(caminho)
+    if anotacao is None:
+        return _campo_do_modelo(queryset.model, caminho)
+    try:
+        return anotacao.output_field
+    except FieldError:
+        return None
+
+
+def chave_de_ordenacao(queryset):
+    """
+    Lista de (caminho, descendente, campo) a partir do order_by do queryset,
+    sempre terminando no pk para desempate.
+    """
+    modelo = queryset.model
+    chave = []
+    for termo in queryset.query.order_by or modelo._meta.ordering:
+        caminho, descendente = _termo_de_ordenacao(termo)
+        if caminho == 'pk':
+            caminho = modelo._meta.pk.name
+        if any(caminho == c for c, _, _ in chave):
+            continue
+        chave.append((caminho, descendente, _campo_da_chave(queryset, caminho)))
+
+    pk = modelo._meta.pk.name
+    if not any(caminho == pk for caminho, _, _ in chave):
+        descendente = chave[0][1] if chave else False
+        chave.append((pk, descendente, modelo._meta.pk))
+    return chave
+
+
+def _aceita_nulo(campo):
+    # Anotações (output_field sem modelo, ou sem campo) são tratadas como possivelmente nulas
+    return campo is None or campo.null or getattr(campo, 'model', None) is None
+
+
+def _depois_de(caminho, descendente, campo, valor):
+    """
+    Predicado "vem depois de valor" nesta coluna, seguindo a ordenação do
+    PostgreSQL: NULLs no fim em ordem crescente e no início em decrescente.
+    """
+    if valor is None:
+        if descendente:
+            return Q(**{f'{caminho}__isnull': False})
+        return None
+    predicado = Q(**{f'{caminho}__{"lt" if descendente else "gt"}': valor})
+    if not descendente and _aceita_nulo(campo):
+        predicado |= Q(**{f'{caminho}__isnull': True})
+    return predicado
+
+
+def _igual_a(caminho, valor):
+    if valor is None:
+        return Q(**{f'{caminho}__isnull': True})
+    return Q(**{caminho: valor})
+
+
+def _predicado_keyset(chave, valores):
+    """(c1 depois de v1) OU (c1 = v1 E c2 depois de v2) OU ..."""
+    predicado = Q(pk__in=[])
+    iguais = Q()
+    for (caminho, descendente, campo), valor in zip(chave, valores):
+        depois = _depois_de(caminho, descendente, campo, valor)
+        if depois is not None:
+            predicado |= iguais & depois
+        iguais &= _igual_a(caminho, valor)
+    return predicado
+
+
+# ============================================================
+# 📄 PÁGINA POR CURSOR
+# ============================================================
+class PaginaCursor:
+    """Página obtida por keyset, iterável como uma Page do Paginator."""
+
+    por_cursor = True
+
+    def __init__(self, object_list, cursor_anterior, cursor_proximo):
+        self.object_list = object_list
+        self.cursor_anterior = cursor_anterior
+        self.cursor_proximo = cursor_proximo
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_previous(self):
+        return self.cursor_anterior is not None
+
+    def has_next(self):
+        return self.cursor_proximo is not None
+
+    def has_other_pages(self):
+        return self.has_previous() or self.has_next()
+
+
+def _restaurar_valores(chave, valores):
+    """
+    Valores do token convertidos de volta ao tipo de cada coluna (datas,
+    decimais, inteiros), para a comparação ser nativa no banco. None se o
+    token não corresponder à chave.
+    """
+    if not isinstance(valores, list) or len(valores) != len(chave):
+        return None
+    try:
+        return [
+            campo.to_python(valor) if campo is not None and valor is not None else valor
+            for (_, _, campo), valor in zip(chave, valores)
+        ]
+    except (ValidationError, TypeError):
+        return None
+
+
+def paginar_por_cursor(queryset, token, por_pagina):
+    """Busca a página seguinte (ou anterior) ao cursor; sem token, a primeira."""
+    chave = chave_de_ordenacao(queryset)
+    assinatura = [f'{"-" if d else ""}{c}' for c, d, _ in chave]
+
+    dados = _decodificar_token(token) if token else None
+    if dados and dados.get('o') != assinatura:
+        dados = None  # Ordenação mudou: recomeça do início
+
+    voltando = bool(dados) and dados.get('d') == 'p'
+    if dados:
+        valores = _restaurar_valores(chave, dados.get('v'))
+        if valores is not None:
+            if voltando:
+                invertida = [(c, not d, f) for c, d, f in chave]
+                queryset = queryset.filter(_predicado_keyset(invertida, valores))
+            else:
+                queryset = queryset.filter(_predicado_keyset(chave, valores))
+        else:
+            dados, voltando = None, False
+
+    ordem = [f'{"-" if d != voltando else ""}{c}' for c, d, _ in chave]
+    linhas = list(queryset.order_by(*ordem)[:por_pagina + 1])
+    ha_mais = len(linhas) > por_pagina
+    linhas = linhas[:por_pagina]
+    if voltando:
+        linhas.reverse()
+
+    def cursor(objeto, direcao):
+        return _codificar_token({
+            'o': assinatura,
+            'd': direcao,
+            'v': [_valor_do_objeto(objeto, c) for c, _, _ in chave],
+        })
+
+    tem_anterior = ha_mais if voltando else bool(dados)
+    tem_proximo = True if voltando else ha_mais
+    return PaginaCursor(
+        linhas,
+        cursor_anterior=cursor(linhas[0], 'p') if linhas and tem_anterior else None,
+        cursor_proximo=cursor(linhas[-1], 'n') if linhas and tem_proximo else None,
+    )
+
+
+# ============================================================
+# 🔢 CONTAGEM APROXIMADA
+# ============================================================
+def estimativa_de_linhas(modelo, using='default'):
+    """Estimativa do planejador (pg_class.reltuples); None se indisponível."""
+    conexao = connections[using]
+    if conexao.vendor != 'postgresql':
+        return None
+    with conexao.cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)',
+            [modelo._meta.db_table],
+        )
+        linha = cursor.fetchone()
+    # -1: tabela ainda não analisada pelo ANALYZE/autovacuum
+    if not linha or linha[0] is None or linha[0] < 0:
+        return None
+    return linha[0]
+
+
+class PaginaAproximada(Page):
+    """Página de um total aproximado: o fim da lista vem das linhas buscadas, não do total."""
+
+    def __init__(self, object_list, number, paginator, tem_proxima):
+        super().__init__(object_list, number, paginator)
+        self.tem_proxima = tem_proxima
+
+    def has_next(self):
+        return self.tem_proxima
+
+    def end_index(self):
+        return self.start_index() + len(self) - 1
+
+
+class PaginatorAproximado(Paginator):
+    """
+    Paginator que não executa COUNT(*) completo a cada página:
+    - sem filtros: estimativa do PostgreSQL (se passar do limite);
+    - com filtros: conta até LIMITE_CONTAGEM + 1, em cache por filtros e versões;
+    - exata=True: COUNT(*) completo, também em cache.
+
+    Com total aproximado, o total não limita as páginas: cada página busca
+    uma linha a mais para saber se existe a seguinte, e num_pages passa a
+    ser a última página conhecida.
+    """
+
+    def __init__(self, object_list, per_page, exata=False, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.exata = exata
+        self.limitada = False
+        self.estimada = False
+
+    def _em_cache(self, prefixo, calcular):
+        consulta = self.object_list.order_by()
+        sql, params = consulta.query.sql_with_params()
+        return em_cache(prefixo, entidades_da_consulta(consulta), calcular, sql, params)
+
+    @cached_property
+    def count(self):
+        consulta = self.object_list.order_by()
+
+        if self.exata:
+            return self._em_cache('contagem_exata', consulta.count)
+
+        if not consulta.query.where:
+            estimativa = estimativa_de_linhas(consulta.model, consulta.db)
+            if estimativa is not None and estimativa > LIMITE_CONTAGEM:
+                self.estimada = True
+                return estimativa
+
+        total = self._em_cache(
+            'contagem', lambda: consulta.values('pk')[:LIMITE_CONTAGEM + 1].count()
+        )
+        if total > LIMITE_CONTAGEM:
+            self.limitada = True
+        return total
+
+    @property
+    def num_pages(self):
+        if not self.aproximada:
+            return super().num_pages
+        paginas = ceil(max(1, self.count - self.orphans) / self.per_page)
+        pagina = getattr(self, '_pagina_atual', None)
+        if pagina is not None:
+            if not pagina.tem_proxima:
+                return pagina.number
+            paginas = max(paginas, pagina.number + 1)
+        return paginas
+
+    def validate_number(self, number):
+        if not self.aproximada:
+            return super().validate_number(number)
+        # Sem limite superior: ele é descoberto ao buscar a página
+        try:
+            if isinstance(number, float) and not number.is_integer():
+                raise ValueError
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger(self.error_messages['invalid_page'])
+        if number < 1:
+            raise EmptyPage(self.error_messages['min_page'])
+        return number
+
+    def page(self, number):
+        if not self.aproximada:
+            return super().page(number)
+        number = self.validate_number(number)
+        inicio = (number - 1) * self.per_page
+        linhas = list(self.object_list[inicio:inicio + self.per_page + 1])
+        if not linhas and number > 1:
+            raise EmptyPage(self.error_messages['no_results'])
+        pagina = PaginaAproximada(
+            linhas[:self.per_page], number, self, tem_proxima=len(linhas) > self.per_page,
+        )
+        self._pagina_atual = pagina
+        return pagina
+
+    def get_page(self, number):
+        if not self.aproximada:
+            return super().get_page(number)
+        try:
+            number = self.validate_number(number)
+        except (PageNotAnInteger, EmptyPage):
+            number = 1
+        try:
+            return self.page(number)
+        except EmptyPage:
+            # Além do fim da lista: vai para a última página (contagem exata, caso raro)
+            total = self._em_cache('contagem_exata', self.object_list.order_by().count)
+            return self.page(max(1, ceil(total / self.per_page)))
+
+    @property
+    def aproximada(self):
+        """True quando o total exibido não é exato."""
+        self.count  # Calcula o total (e os indicadores), se ainda não calculado
+        return self.estimada or self.limitada
+
+    @property
+    def contagem_exibicao(self):
+        """Texto do total: '1.234', '~12.345' (estimada) ou '1000+' (limitada)."""
+        total = self.count
+        if self.estimada:
+            return f'~{total}'
+        if self.limitada:
+            return f'{LIMITE_CONTAGEM}+'
+        return str(total)
+
+
+# ============================================================
+# 🔀 SELEÇÃO DO MODO
+# ============================================================
+def usa_cursor(request):
+    """Paginação por cursor: ?paginacao=cursor ou PAGINACAO_CURSOR nas configurações."""
+    modo = request.GET.get('paginacao')
+    if modo:
+        return modo == 'cursor'
+    return getattr(settings, 'PAGINACAO_CURSOR', False)
+
+
+def paginar(request, queryset, por_pagina):
+    """Página da requisição: por cursor (opt-in) ou por número (Paginator)."""
+    if usa_cursor(request):
+        return paginar_por_cursor(queryset, request.GET.get('cursor', ''), por_pagina)
+    paginator = PaginatorAproximado(
+        queryset, por_pagina, exata=request.GET.get('contagem') == 'exata'
+    )
+    return paginator.get_page(request.GET.get('pagina', 1))
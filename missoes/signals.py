@@ -0,0 +1,196 @@
+"""
+============================================================
+📡 SIGEM - Signals
+Mantém dados derivados atualizados a cada escrita
+============================================================
+"""
+
+from django.db.models import CharField, Q, Value
+from django.db.models.functions import Concat, Substr
+from django.db.models.signals import post_init, post_save, post_delete, pre_delete
+from django.dispatch import receiver
+
+from .cache import ENTIDADE_POR_MODELO, incrementar_versao
+from .carga import marcar_para_recalculo
+from .estatisticas import (
+    marcar_meses_para_atualizacao, meses_das_missoes, meses_dos_oficiais,
+)
+from .models import Designacao, Missao, Oficial, SolicitacaoDesignacao, Unidade, Usuario
+
+
+# ============================================================
+# ⚖️ CARGA DE TRABALHO DOS OFICIAIS
+# ============================================================
+@receiver(post_init, sender=Designacao)
+def designacao_guardar_original(sender, instance, **kwargs):
+    """Guarda o oficial original para detectar troca na edição."""
+    # __dict__ evita carregar o campo quando ele foi adiado (.only/.defer)
+    instance._oficial_id_original = instance.__dict__.get('oficial_id')
+
+
+@receiver(post_save, sender=Designacao)
+def designacao_salva(sender, instance, **kwargs):
+    """Recalcula a carga do oficial (e do anterior, se foi trocado)."""
+    marcar_para_recalculo({instance.oficial_id, instance._oficial_id_original})
+    instance._oficial_id_original = instance.oficial_id
+
+
+@receiver(post_delete, sender=Designacao)
+def designacao_excluida(sender, instance, **kwargs):
+    """Recalcula a carga do oficial que perdeu a designação."""
+    marcar_para_recalculo({instance.oficial_id})
+
+
+@receiver(post_init, sender=Missao)
+def missao_guardar_original(sender, instance, **kwargs):
+    """Guarda o status original para detectar mudança."""
+    instance._status_original = instance.__dict__.get('status')
+
+
+@receiver(post_save, sender=Missao)
+def missao_salva(sender, instance, created, **kwargs):
+    """Se o status mudou, recalcula a carga de todos os designados."""
+    if not created and instance.status != instance._status_original:
+        marcar_para_recalculo(
+            instance.designacoes.values_list('oficial_id', flat=True)
+        )
+    instance._status_original = instance.status
+
+
+# ============================================================
+# 🏢 HIERARQUIA DE UNIDADES
+# ============================================================
+@receiver(post_save, sender=Unidade)
+def unidade_salva(sender, instance, **kwargs):
+    """
+    Unidade nova ou com nome/sigla alterados: vincula oficiais ainda sem
+    unidade cuja OBM corresponde à sigla ou ao nome. A versão 'hierarquia'
+    é incrementada por Unidade.save(), após atualizar os caminhos.
+    """
+    if not instance.identificacao_alterada:
+        return
+    correspondencia = Q(obm__iexact=instance.nome)
+    if instance.sigla:
+        correspondencia |= Q(obm__iexact=instance.sigla)
+    vinculados = list(
+        Oficial.objects.filter(correspondencia, unidade__isnull=True).values_list('pk', flat=True)
+    )
+    if vinculados:
+        Oficial.objects.filter(pk__in=vinculados).update(unidade=instance)
+        incrementar_versao('oficiais')
+        marcar_meses_para_atualizacao(meses_dos_oficiais(vinculados))
+
+
+@receiver(post_delete, sender=Unidade)
+def unidade_excluida(sender, instance, **kwargs):
+    """
+    As subordinadas diretas ficam sem comando superior (SET_NULL):
+    promove a subárvore delas a raiz no caminho materializado.
+    """
+    # Oficiais lotados ficaram sem unidade (SET_NULL, sem signals)
+    incrementar_versao('oficiais')
+    if instance.caminho:
+        Unidade.objects.filter(caminho__startswith=instance.caminho).update(
+            caminho=Concat(
+                Value('/'),
+                Substr('caminho', len(instance.caminho) + 1),
+                output_field=CharField(),
+            )
+        )
+    incrementar_versao('hierarquia')
+
+
+@receiver(post_save, sender=Oficial)
+def oficial_salvo(sender, instance, **kwargs):
+    """Mudança de lotação altera o escopo dos comandantes."""
+    if instance.unidade_id != getattr(instance, '_unidade_id_original', None):
+        incrementar_versao('hierarquia')
+
+
+@receiver(post_delete, sender=Oficial)
+def oficial_excluido(sender, instance, **kwargs):
+    """Oficial lotado deixa de fazer parte do escopo da sua unidade."""
+    if instance.unidade_id:
+        incrementar_versao('hierarquia')
+
+
+# ============================================================
+# 📈 CUBO DE ESTATÍSTICAS
+# ============================================================
+@receiver(post_init, sender=Designacao)
+def designacao_guardar_missao(sender, instance, **kwargs):
+    """Guarda a missão original para atualizar também o mês anterior."""
+    instance._missao_id_original = instance.__dict__.get('missao_id')
+
+
+@receiver(post_save, sender=Designacao)
+@receiver(post_delete, sender=Designacao)
+def designacao_estatisticas(sender, instance, **kwargs):
+    """Atualiza as células do mês da missão (e da anterior, se foi trocada)."""
+    marcar_meses_para_atualizacao(
+        meses_das_missoes({instance.missao_id, instance._missao_id_original})
+    )
+    instance._missao_id_original = instance.missao_id
+
+
+@receiver(post_init, sender=Missao)
+def missao_guardar_dimensoes(sender, instance, **kwargs):
+    """Guarda tipo, status e mês originais para detectar mudança."""
+    instance._dimensoes_original = (
+        instance.__dict__.get('tipo'),
+        instance.__dict__.get('status'),
+        instance.__dict__.get('mes_referencia'),
+    )
+
+
+@receiver(post_save, sender=Missao)
+def missao_estatisticas(sender, instance, created, **kwargs):
+    """Tipo, status ou mês alterado: atualiza o mês antigo e o novo."""
+    dimensoes = (instance.tipo, instance.status, instance.mes_referencia)
+    if not created and dimensoes != instance._dimensoes_original:
+        marcar_meses_para_atualizacao({dimensoes[2], instance._dimensoes_original[2]})
+    instance._dimensoes_original = dimensoes
+
+
+@receiver(pre_delete, sender=Missao)
+def missao_guardar_mes(sender, instance, **kwargs):
+    """As designações são excluídas em cascata: o mês é atualizado após a exclusão."""
+    instance._mes_exclusao = instance.mes_referencia
+
+
+@receiver(post_delete, sender=Missao)
+def missao_excluida_estatisticas(sender, instance, **kwargs):
+    """Atualiza o mês da missão excluída."""
+    marcar_meses_para_atualizacao({instance._mes_exclusao})
+
+
+@receiver(post_init, sender=Oficial)
+def oficial_guardar_dimensoes(sender, instance, **kwargs):
+    """Guarda posto, quadro e unidade originais para detectar mudança."""
+    instance._dimensoes_original = (
+        instance.__dict__.get('posto'),
+        instance.__dict__.get('quadro'),
+        instance.__dict__.get('unidade_id'),
+    )
+
+
+@receiver(post_save, sender=Oficial)
+def oficial_estatisticas(sender, instance, created, **kwargs):
+    """Promoção, troca de quadro ou de lotação: atualiza os meses do oficial."""
+    dimensoes = (instance.posto, instance.quadro, instance.unidade_id)
+    if not created and dimensoes != instance._dimensoes_original:
+        marcar_meses_para_atualizacao(meses_dos_oficiais([instance.pk]))
+    instance._dimensoes_original = dimensoes
+
+
+# ============================================================
+# 🗃️ VERSÕES DO CACHE
+# ============================================================
+def entidade_alterada(sender, **kwargs):
+    """Qualquer escrita invalida o cache versionado da entidade."""
+    incrementar_versao(ENTIDADE_POR_MODELO[sender.__name__])
+
+
+for _modelo in (Oficial, Missao, Designacao, Unidade, Usuario, SolicitacaoDesignacao):
+    post_save.connect(entidade_alterada, sender=_modelo, dispatch_uid=f'versao_{_modelo.__name__}_save')
+    post_delete.connect(entidade_alterada, sender=_modelo, dispatch_uid=f'versao_{_modelo.__name__}_delete')
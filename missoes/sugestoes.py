@@ -0,0 +1,166 @@
+"""
+============================================================
+⌨️ SIGEM - Sugestões de Oficiais
+Índice de prefixos em memória para o autocompletar dos seletores
+============================================================
+
+Cada processo mantém os oficiais ativos em arrays compactos: uma lista
+ordenada de termos (posto, nome de guerra, nome e RG, sem acentos) e, em
+paralelo, o oficial de cada termo. Um prefixo é o intervalo contíguo de
+termos encontrado por busca binária, sem consultar o banco.
+
+O índice é montado na primeira consulta do processo e refeito quando a
+versão 'oficiais' do cache (missoes/cache.py) muda.
+"""
+
+import re
+import threading
+from array import array
+from bisect import bisect_left
+
+from .busca import sem_acentos
+from .cache import versao
+
+# Sugestões retornadas por consulta
+LIMITE_SUGESTOES = 10
+
+_lock = threading.Lock()
+_indice = None
+
+
+def _termos(texto):
+    return re.findall(r'[^\W_]+', sem_acentos(texto).lower())
+
+
+class IndiceOficiais:
+    """Índice de prefixos imutável sobre os oficiais ativos."""
+
+    def __init__(self, oficiais, versao_oficiais=None):
+        from .models import Oficial
+
+        ordem_posto = {posto: i for i, (posto, _) in enumerate(Oficial.POSTO_CHOICES)}
+        self.versao = versao_oficiais
+
+        # Oficiais na ordem de exibição (posto, rótulo): posição menor = melhor
+        linhas = sorted(
+            (
+                (ordem_posto.get(posto, len(ordem_posto)), f'{posto} {nome_guerra or nome}',
+                 pk, unidade_id, obm, f'{posto} {nome_guerra} {nome}', rg)
+                for pk, posto, nome_guerra, nome, rg, unidade_id, obm in oficiais
+            ),
+            key=lambda linha: linha[:2],
+        )
+
+        # Dados por oficial (posição i)
+        self.ids = array('q')
+        self.unidades = array('q')  # -1: sem unidade
+        self.obms = []  # Texto da OBM, só dos oficiais sem unidade
+        self.rotulos = []
+        self.textos = []
+
+        termos = []
+        for posicao, (_, rotulo, pk, unidade_id, obm, texto, rg) in enumerate(linhas):
+            self.ids.append(pk)
+            self.unidades.append(unidade_id if unidade_id is not None else -1)
+            self.obms.append(obm if unidade_id is None else '')
+            self.rotulos.append(rotulo)
+
+            proprios = set(_termos(texto))
+            rg_normalizado = re.sub(r'[^0-9A-Za-z]', '', rg or '').lower()
+            if rg_normalizado:
+                proprios.add(rg_normalizado)
+            self.textos.append(' ' + ' '.join(sorted(proprios)))
+            termos.extend((termo, posicao) for termo in proprios)
+
+        # Termos ordenados e, em paralelo, a posição do oficial de cada termo
+        termos.sort()
+        self.termos = [termo for termo, _ in termos]
+        self.posicoes = array('I', (posicao for _, posicao in termos))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _intervalo(self, prefixo):
+        """Intervalo [inicio, fim) dos termos que começam pelo prefixo."""
+        inicio = bisect_left(self.termos, prefixo)
+        return inicio, bisect_left(self.termos, prefixo + '\uffff', inicio)
+
+    def buscar(self, texto, escopo=None, limite=LIMITE_SUGESTOES, deslocamento=0):
+        """
+        Até 'limite' oficiais em que cada termo digitado é prefixo de algum
+        termo do oficial: [{'id', 'rotulo'}], por posto e rótulo. Sem termos,
+        todos os oficiais; 'deslocamento' pula os primeiros (paginação).
+        """
+        termos = _termos(texto)
+        if not termos:
+            return self._coletar(range(len(self.ids)), [], escopo, limite, deslocamento)
+
+        # Percorre o intervalo do termo mais seletivo; os demais são conferidos no texto
+        intervalos = {termo: self._intervalo(termo) for termo in termos}
+        principal = min(intervalos, key=lambda termo: intervalos[termo][1] - intervalos[termo][0])
+        inicio, fim = intervalos[principal]
+        demais = [f' {termo}' for termo in intervalos if termo != principal]
+
+        if fim - inicio > len(self.ids) // 4:
+            # Prefixo comum: percorre os oficiais em ordem e para no limite
+            posicoes = range(len(self.ids))
+            demais.append(f' {principal}')
+        else:
+            posicoes = sorted(set(self.posicoes[inicio:fim]))
+
+        return self._coletar(posicoes, demais, escopo, limite, deslocamento)
+
+    def _visivel(self, posicao, escopo):
+        unidade_id = self.unidades[posicao]
+        return escopo.pode_ver(
+            self.ids[posicao], unidade_id if unidade_id >= 0 else None, self.obms[posicao],
+        )
+
+    def _coletar(self, posicoes, demais, escopo, limite, deslocamento):
+        """Percorre as posições em ordem e para ao completar a página."""
+        resultados = []
+        for posicao in posicoes:
+            if demais and not all(termo in self.textos[posicao] for termo in demais):
+                continue
+            if escopo is not None and not self._visivel(posicao, escopo):
+                continue
+            if deslocamento:
+                deslocamento -= 1
+                continue
+            resultados.append({'id': self.ids[posicao], 'rotulo': self.rotulos[posicao]})
+            if len(resultados) == limite:
+                break
+        return resultados
+
+
+def _montar_indice(versao_oficiais):
+    from .models import Oficial
+
+    oficiais = (
+        Oficial.objects
+        .filter(ativo=True)
+        .order_by()
+        .values_list('pk', 'posto', 'nome_guerra', 'nome', 'rg', 'unidade_id', 'obm')
+        .iterator(chunk_size=2000)
+    )
+    return IndiceOficiais(oficiais, versao_oficiais)
+
+
+def indice_oficiais():
+    """Índice do processo, refeito se a versão 'oficiais' mudou desde a montagem."""
+    global _indice
+
+    versao_atual = versao('oficiais')
+    indice = _indice
+    if indice is not None and indice.versao == versao_atual:
+        return indice
+
+    with _lock:
+        if _indice is None or _indice.versao != versao_atual:
+            _indice = _montar_indice(versao_atual)
+        return _indice
+
+
+def sugerir_oficiais(texto, escopo=None, limite=LIMITE_SUGESTOES, deslocamento=0):
+    """Sugestões de oficiais ativos para o texto digitado, no escopo informado."""
+    return indice_oficiais().buscar(texto, escopo, limite, deslocamento)
@@ -1,3 +1,443 @@
+"""
+============================================================
+🧪 SIGEM - Testes
+============================================================
+"""
+
+import datetime
+import io
+
+import openpyxl
+from django.core.cache import cache
 from django.test import TestCase
+from django.urls import reverse
+
+from .cache import versao
+from .carga import adiar_recalculo_carga
+from .escopo import obter_escopo
+from .importacao import copiar_conteudo, processar_importacao, proxima_importacao
+from .models import (
+    Designacao, EstatisticaDesignacao, ImportacaoPlanilha, Missao, Oficial, SolicitacaoDesignacao,
+    Unidade, Usuario,
+)
+from .paginacao import paginar_por_cursor
+from .sugestoes import sugerir_oficiais
+
+
+def criar_oficial(numero, **extra):
+    """Oficial mínimo com CPF e RG únicos."""
+    dados = {
+        'cpf': f'{numero:011d}',
+        'rg': f'RG{numero}',
+        'nome': f'Oficial {numero}',
+        'posto': 'Cap',
+        'quadro': 'QOC',
+    }
+    dados.update(extra)
+    return Oficial.objects.create(**dados)
+
+
+# ============================================================
+# ⚖️ CARGA DE TRABALHO
+# ============================================================
+class CargaOficialTests(TestCase):
+    """Contadores de carga mantidos nas escritas de designações e missões."""
+
+    def setUp(self):
+        self.oficial = criar_oficial(1)
+        self.missao = self.criar_missao()
+
+    def criar_missao(self, status='EM_ANDAMENTO'):
+        return Missao.objects.create(nome='Operação Verão', tipo='OPERACIONAL', status=status)
+
+    def designar(self, complexidade, missao=None, oficial=None):
+        # Um oficial aparece uma única vez em cada missão
+        return Designacao.objects.create(
+            missao=missao or self.criar_missao(),
+            oficial=oficial or self.oficial,
+            complexidade=complexidade,
+        )
+
+    def assertCarga(self, oficial, ativas, baixa, media, alta, ponderada):
+        oficial.refresh_from_db()
+        self.assertEqual(
+            (oficial.qtd_ativas, oficial.qtd_baixa, oficial.qtd_media, oficial.qtd_alta, oficial.carga_ponderada),
+            (ativas, baixa, media, alta, ponderada),
+        )
+
+    def test_designacoes_atualizam_contadores(self):
+        self.designar('BAIXA')
+        self.designar('ALTA')
+        self.assertCarga(self.oficial, 2, 1, 0, 1, 4)
+
+    def test_edicao_e_exclusao_recalculam(self):
+        designacao = self.designar('MEDIA')
+        designacao.complexidade = 'ALTA'
+        designacao.save()
+        self.assertCarga(self.oficial, 1, 0, 0, 1, 3)
+
+        designacao.delete()
+        self.assertCarga(self.oficial, 0, 0, 0, 0, 0)
+
+    def test_troca_de_oficial_recalcula_os_dois(self):
+        outro = criar_oficial(2)
+        designacao = self.designar('MEDIA')
+        designacao.oficial = outro
+        designacao.save()
+        self.assertCarga(self.oficial, 0, 0, 0, 0, 0)
+        self.assertCarga(outro, 1, 0, 1, 0, 2)
+
+    def test_mudanca_de_status_da_missao(self):
+        self.designar('ALTA', missao=self.missao)
+        self.missao.status = 'CONCLUIDA'
+        self.missao.save()
+        self.assertCarga(self.oficial, 0, 0, 0, 0, 0)
+
+        self.missao.status = 'EM_ANDAMENTO'
+        self.missao.save()
+        self.assertCarga(self.oficial, 1, 0, 0, 1, 3)
+
+    def test_missao_planejada_nao_conta(self):
+        self.designar('ALTA', missao=self.criar_missao('PLANEJADA'))
+        self.assertCarga(self.oficial, 0, 0, 0, 0, 0)
+
+    def test_recalculo_adiado(self):
+        with adiar_recalculo_carga():
+            self.designar('BAIXA')
+            self.designar('MEDIA')
+            self.assertCarga(self.oficial, 0, 0, 0, 0, 0)
+        self.assertCarga(self.oficial, 2, 1, 1, 0, 3)
+
+    def test_recalculo_invalida_apenas_a_carga(self):
+        antes = (versao('oficiais'), versao('carga'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.designar('BAIXA', missao=self.missao)
+        self.assertEqual(versao('oficiais'), antes[0])
+        self.assertNotEqual(versao('carga'), antes[1])
+
+
+# ============================================================
+# 📊 CUBO DE ESTATÍSTICAS
+# ============================================================
+class EstatisticasTests(TestCase):
+    """Células do cubo mantidas pelas escritas de designações."""
+
+    def setUp(self):
+        self.missao = Missao.objects.create(
+            nome='Operação Verão', tipo='OPERACIONAL', status='EM_ANDAMENTO',
+            data_inicio=datetime.date(2026, 3, 15),
+        )
+
+    def designar(self, numero, complexidade='ALTA'):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Designacao.objects.create(
+                missao=self.missao, oficial=criar_oficial(numero), complexidade=complexidade,
+            )
+
+    def test_celula_sem_unidade_e_unica(self):
+        self.designar(1)
+        self.designar(2)
+
+        celula = EstatisticaDesignacao.objects.get()
+        self.assertEqual(celula.mes, datetime.date(2026, 3, 1))
+        self.assertIsNone(celula.unidade)
+        self.assertEqual((celula.total, celula.carga), (2, 6))
+
+    def test_exclusao_e_mudanca_de_status(self):
+        primeira = self.designar(1)
+        self.designar(2, complexidade='BAIXA')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            primeira.delete()
+        self.assertEqual(
+            list(EstatisticaDesignacao.objects.values_list('complexidade', 'total')), [('BAIXA', 1)],
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.missao.status = 'CONCLUIDA'
+            self.missao.save()
+        self.assertEqual(list(EstatisticaDesignacao.objects.values_list('status', flat=True)), ['CONCLUIDA'])
+
+
+# ============================================================
+# 📑 PAGINAÇÃO POR CURSOR
+# ============================================================
+class PaginacaoCursorTests(TestCase):
+    """Ida e volta pelas páginas seguindo a ordenação do queryset."""
+
+    @classmethod
+    def setUpTestData(cls):
+        inicio = datetime.date(2026, 1, 1)
+        for i in range(11):
+            # Datas repetidas e nulas exercitam o desempate e os NULLs
+            data = None if i % 5 == 0 else inicio + datetime.timedelta(days=i // 3)
+            Missao.objects.create(nome=f'Missão {i % 4}', tipo='OPERACIONAL', data_inicio=data)
+
+    def percorrer(self, queryset, por_pagina=3):
+        """Pks de todas as páginas para frente e, a partir da última, para trás."""
+        pagina = paginar_por_cursor(queryset, '', por_pagina)
+        self.assertFalse(pagina.has_previous())
+        ida = [m.pk for m in pagina]
+        while pagina.has_next():
+            pagina = paginar_por_cursor(queryset, pagina.cursor_proximo, por_pagina)
+            ida += [m.pk for m in pagina]
+
+        volta = [m.pk for m in pagina]
+        while pagina.has_previous():
+            pagina = paginar_por_cursor(queryset, pagina.cursor_anterior, por_pagina)
+            volta = [m.pk for m in pagina] + volta
+        return ida, volta
+
+    def test_ordenacao_padrao(self):
+        esperado = list(Missao.objects.order_by('-data_inicio', 'nome', '-pk').values_list('pk', flat=True))
+        ida, volta = self.percorrer(Missao.objects.all())
+        self.assertEqual(ida, esperado)
+        self.assertEqual(volta, esperado)
+
+    def test_ordenacao_crescente_com_nulos(self):
+        queryset = Missao.objects.order_by('data_inicio')
+        esperado = list(queryset.order_by('data_inicio', 'pk').values_list('pk', flat=True))
+        ida, volta = self.percorrer(queryset)
+        self.assertEqual(ida, esperado)
+        self.assertEqual(volta, esperado)
+
+    def test_cursor_invalido_recomeca(self):
+        primeira = paginar_por_cursor(Missao.objects.all(), '', 3)
+        pagina = paginar_por_cursor(Missao.objects.all(), 'nao-e-um-cursor', 3)
+        self.assertEqual([m.pk for m in pagina], [m.pk for m in primeira])
+        self.assertFalse(pagina.has_previous())
+
+    def test_cursor_de_outra_ordenacao_recomeca(self):
+        pagina = paginar_por_cursor(Missao.objects.order_by('nome'), '', 3)
+        outra = paginar_por_cursor(Missao.objects.all(), pagina.cursor_proximo, 3)
+        self.assertFalse(outra.has_previous())
+
+
+# ============================================================
+# 🏢 RESOLUÇÃO DA OBM
+# ============================================================
+class ResolverObmTests(TestCase):
+    """Texto livre da OBM associado a uma única unidade."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.bbm = Unidade.objects.create(nome='1º Batalhão de Bombeiro Militar', sigla='1º BBM', tipo='BBM')
+        Unidade.objects.create(nome='Companhia Norte', sigla='CIA', tipo='CBM')
+        Unidade.objects.create(nome='Companhia Sul', sigla='CIA', tipo='CBM')
+
+    def test_sigla_e_nome(self):
+        self.assertEqual(Unidade.objects.resolver_obm('1º BBM'), self.bbm)
+        self.assertEqual(Unidade.objects.resolver_obm('1º batalhão de bombeiro militar'), self.bbm)
+
+    def test_espacos_normalizados(self):
+        self.assertEqual(Unidade.objects.resolver_obm('  1º   bbm '), self.bbm)
+
+    def test_sem_correspondencia_ou_ambigua(self):
+        self.assertIsNone(Unidade.objects.resolver_obm(''))
+        self.assertIsNone(Unidade.objects.resolver_obm(None))
+        self.assertIsNone(Unidade.objects.resolver_obm('2º BBM'))
+        self.assertIsNone(Unidade.objects.resolver_obm('CIA'))
+
+    def test_resolver_obms_em_lote(self):
+        self.assertEqual(
+            Unidade.objects.resolver_obms(['1º bbm', 'CIA', '', 'Inexistente']),
+            {'1º bbm': self.bbm, 'CIA': None, '': None, 'Inexistente': None},
+        )
+
+    def test_oficial_vinculado_pela_obm(self):
+        oficial = criar_oficial(1, obm='1º BBM')
+        self.assertEqual(oficial.unidade, self.bbm)
+
+
+class EscopoComandanteTests(TestCase):
+    """Comandante vê os oficiais da sua unidade e, sem unidade, pelo texto da OBM."""
+
+    def setUp(self):
+        cache.clear()
+        self.bbm = Unidade.objects.create(nome='1º Batalhão de Bombeiro Militar', sigla='1º BBM', tipo='BBM')
+        self.da_unidade = criar_oficial(2, obm='1º BBM')
+        self.mesma_obm = criar_oficial(3, obm='3º gbm')
+        self.outra_obm = criar_oficial(4, obm='Outra OBM')
+
+    def escopo_do_comandante(self, obm):
+        comandante = criar_oficial(1, obm=obm)
+        usuario = Usuario.objects.create_user('00000000191', 'senha', role='comandante', oficial=comandante)
+        return obter_escopo(usuario)
+
+    def test_obm_sem_unidade_usa_o_texto(self):
+        escopo = self.escopo_do_comandante('3º GBM')
+        self.assertIsNone(Oficial.objects.get(cpf='00000000001').unidade)
+
+        visiveis = set(Oficial.objects.filter(escopo.predicado_oficiais()))
+        self.assertIn(self.mesma_obm, visiveis)
+        self.assertNotIn(self.outra_obm, visiveis)
+        self.assertNotIn(self.da_unidade, visiveis)
+
+        self.assertTrue(escopo.pode_ver_oficial(self.mesma_obm))
+        self.assertFalse(escopo.pode_ver_oficial(self.outra_obm))
+        sugeridos = {s['id'] for s in sugerir_oficiais('', escopo, limite=50)}
+        self.assertIn(self.mesma_obm.pk, sugeridos)
+        self.assertNotIn(self.outra_obm.pk, sugeridos)
+
+    def test_comandante_com_unidade(self):
+        escopo = self.escopo_do_comandante('1º BBM')
+        visiveis = set(Oficial.objects.filter(escopo.predicado_oficiais()))
+        self.assertIn(self.da_unidade, visiveis)
+        self.assertNotIn(self.mesma_obm, visiveis)
+        self.assertTrue(escopo.pode_ver_oficial(self.da_unidade))
+        self.assertFalse(escopo.pode_ver_oficial(self.mesma_obm))
+
+
+
+# ============================================================
+# 🏷️ GET CONDICIONAL (ETag)
+# ============================================================
+class GetCondicionalTests(TestCase):
+    """Fragmentos HTMX respondem 304 enquanto as entidades não mudam."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = Usuario.objects.create_user('00000000191', 'senha', role='admin')
+        cls.missao = Missao.objects.create(nome='Operação Verão', tipo='OPERACIONAL')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.usuario)
+        self.url = reverse('htmx_missoes_lista')
+
+    def test_etag_repetido_responde_304(self):
+        resposta = self.client.get(self.url)
+        self.assertEqual(resposta.status_code, 200)
+        self.assertIn('ETag', resposta)
+
+        repetida = self.client.get(self.url, HTTP_IF_NONE_MATCH=resposta['ETag'])
+        self.assertEqual(repetida.status_code, 304)
+        self.assertEqual(repetida.content, b'')
+
+    def test_alteracao_invalida_etag(self):
+        etag = self.client.get(self.url)['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.missao.nome = 'Operação Inverno'
+            self.missao.save()
+
+        resposta = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resposta.status_code, 200)
+        self.assertNotEqual(resposta['ETag'], etag)
+        self.assertContains(resposta, 'Operação Inverno')
+
+    def test_etag_varia_com_a_consulta(self):
+        etag = self.client.get(self.url)['ETag']
+        resposta = self.client.get(self.url, {'status': 'PLANEJADA'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resposta.status_code, 200)
+
+
+# ============================================================
+# 🔁 LINHAS OUT-OF-BAND
+# ============================================================
+class AvaliarSolicitacaoTests(TestCase):
+    """A linha avaliada respeita o filtro de status ativo na lista."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = Usuario.objects.create_user('00000000191', 'senha', role='admin')
+        cls.solicitante = criar_oficial(1)
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+        self.solicitacao = SolicitacaoDesignacao.objects.create(
+            solicitante=self.solicitante, nome_missao='Operação Verão', funcao_na_missao='Apoio',
+        )
+        self.url = reverse('htmx_solicitacao_avaliar', args=[self.solicitacao.pk])
+
+    def test_lista_envia_o_filtro(self):
+        resposta = self.client.get(reverse('htmx_solicitacoes_lista'), {'status': 'PENDENTE'})
+        self.assertContains(resposta, f'id="solicitacao-{self.solicitacao.pk}"')
+        self.assertContains(resposta, 'hx-vals=\'{"status": "PENDENTE"}\'')
+
+    def test_filtro_pendentes_remove_a_linha(self):
+        resposta = self.client.post(self.url, {'acao': 'aprovar', 'status': 'PENDENTE'})
+        self.assertContains(resposta, 'hx-swap-oob="delete"')
+
+    def test_sem_filtro_substitui_a_linha(self):
+        resposta = self.client.post(self.url, {'acao': 'recusar', 'status': ''})
+        self.assertNotContains(resposta, 'hx-swap-oob="delete"')
+        self.assertContains(resposta, f'id="solicitacao-{self.solicitacao.pk}" hx-swap-oob="true"')
+        self.assertContains(resposta, 'Recusada')
+
+    def test_filtro_atendido_substitui_a_linha(self):
+        resposta = self.client.post(self.url, {'acao': 'aprovar', 'status': 'APROVADA'})
+        self.assertContains(resposta, 'hx-swap-oob="true"')
+
+
+# ============================================================
+# 📥 IMPORTAÇÃO EM SEGUNDO PLANO
+# ============================================================
+class ImportacaoPlanilhaTests(TestCase):
+    """Planilha pequena guardada no banco e processada pelo worker."""
+
+    def setUp(self):
+        self.unidade = Unidade.objects.create(nome='1º Batalhão de Bombeiro Militar', sigla='1º BBM', tipo='BBM')
+        self.existente = criar_oficial(1, nome='Nome Antigo')
+
+    def planilha(self, linhas):
+        wb = openpyxl.Workbook()
+        ws = wb.active
+        ws.append(['CPF', 'RG', 'Nome', 'Guerra', 'Posto', 'Quadro', 'OBM', 'Função', 'E-mail', 'Telefone'])
+        for linha in linhas:
+            ws.append(linha)
+        conteudo = io.BytesIO()
+        wb.save(conteudo)
+        return conteudo.getvalue()
+
+    def test_processar_importacao_de_oficiais(self):
+        importacao = ImportacaoPlanilha.objects.create(
+            tipo='oficiais',
+            nome_arquivo='oficiais.xlsx',
+            conteudo=self.planilha([
+                [self.existente.cpf, self.existente.rg, 'Nome Novo', '', 'Maj', 'QOC', '', '', '', ''],
+                ['00000000002', 'RG2', 'Oficial Importado', 'Importado', 'Cap', 'QOC', '1º BBM', '', '', ''],
+                ['00000000003', 'RG3', 'Posto Inválido', '', 'General', 'QOC', '', '', '', ''],
+            ]),
+        )
+
+        reservada = proxima_importacao()
+        self.assertEqual(reservada.pk, importacao.pk)
+        self.assertEqual(reservada.status, 'PROCESSANDO')
+        self.assertIsNone(proxima_importacao())
+
+        processar_importacao(reservada)
+
+        importacao.refresh_from_db()
+        self.assertEqual(importacao.status, 'CONCLUIDA')
+        self.assertEqual((importacao.criados, importacao.atualizados, importacao.total_erros), (1, 1, 1))
+        self.assertEqual(importacao.linhas_processadas, 3)
+        self.assertEqual(len(importacao.erros), 1)
+        self.assertIsNotNone(importacao.concluido_em)
+        # A planilha sai do banco ao final
+        self.assertIsNone(importacao.conteudo)
+
+        self.existente.refresh_from_db()
+        self.assertEqual((self.existente.nome, self.existente.posto), ('Nome Novo', 'Maj'))
+        novo = Oficial.objects.get(cpf='00000000002')
+        self.assertEqual(novo.unidade, self.unidade)
+        self.assertFalse(Oficial.objects.filter(cpf='00000000003').exists())
+
+    def test_copia_em_blocos(self):
+        conteudo = self.planilha([['00000000002', 'RG2', 'Oficial', '', 'Cap', 'QOC', '', '', '', '']])
+        importacao = ImportacaoPlanilha.objects.create(tipo='oficiais', nome_arquivo='o.xlsx', conteudo=conteudo)
+
+        destino = io.BytesIO()
+        copiar_conteudo(ImportacaoPlanilha.objects.filter(pk=importacao.pk), destino, tamanho=1000)
+        self.assertEqual(destino.read(), conteudo)
+
+    def test_planilha_invalida_falha(self):
+        importacao = ImportacaoPlanilha.objects.create(
+            tipo='oficiais', nome_arquivo='oficiais.xlsx', conteudo=b'isto nao e uma planilha',
+        )
+
+        processar_importacao(proxima_importacao())
 
-# Create your tests here.
+        importacao.refresh_from_db()
+        self.assertEqual(importacao.status, 'FALHOU')
+        self.assertTrue(importacao.mensagem.startswith('Erro na importação'))
@@ -30,12 +30,18 @@ urlpatterns = [
     # ============================================================
     path('admin-painel/', views.admin_painel, name='admin_painel'),
     
+    # ============================================================
+    # 🔎 BUSCA GLOBAL
+    # ============================================================
+    path('htmx/busca-global/', views.htmx_busca_global, name='htmx_busca_global'),
+    
     # ============================================================
     # 🔄 ENDPOINTS HTMX - OFICIAIS
     # ============================================================
     path('htmx/oficiais/lista/', views.htmx_oficiais_lista, name='htmx_oficiais_lista'),
     path('htmx/oficiais/selecao/', views.htmx_oficiais_selecao, name='htmx_oficiais_selecao'),
     path('htmx/oficiais/buscar/', views.htmx_buscar_oficiais, name='htmx_buscar_oficiais'),
+    path('htmx/oficiais/autocompletar/', views.htmx_oficiais_autocompletar, name='htmx_oficiais_autocompletar'),
     path('htmx/oficiais/cards/', views.htmx_oficiais_cards, name='htmx_oficiais_cards'),
     path('htmx/oficial/<int:pk>/card/', views.htmx_oficial_card, name='htmx_oficial_card'),
     path('htmx/oficial/<int:pk>/dados/', views.htmx_oficial_dados, name='htmx_oficial_dados'),
@@ -87,6 +93,12 @@ urlpatterns = [
     path('htmx/solicitacoes/lista/', views.htmx_solicitacoes_lista, name='htmx_solicitacoes_lista'),
     path('htmx/solicitacao/<int:pk>/avaliar/', views.htmx_solicitacao_avaliar, name='htmx_solicitacao_avaliar'),
     
+    # ============================================================
+    # 🔽 OPÇÕES DOS SELETORES (JSON)
+    # ============================================================
+    path('htmx/opcoes/missoes/', views.htmx_opcoes_missoes, name='htmx_opcoes_missoes'),
+    path('htmx/opcoes/oficiais/', views.htmx_opcoes_oficiais, name='htmx_opcoes_oficiais'),
+    
     # ============================================================
     # 📥 EXPORTAÇÃO
     # ============================================================
@@ -97,4 +109,5 @@ urlpatterns = [
     # 📤 IMPORTAÇÃO EM MASSA
     # ============================================================
     path('importar/<str:tipo>/', views.importar_excel, name='importar_excel'),
+    path('htmx/importacoes/', views.htmx_importacoes, name='htmx_importacoes'),
 ]
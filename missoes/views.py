@@ -5,17 +5,35 @@ Sistema de Gestão de Missões - CBMGO
 ============================================================
 """
 
+import json
+import zipfile
+
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import HttpResponse, JsonResponse
+from django.conf import settings
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.http import Http404, HttpResponse, JsonResponse
+from django.template.loader import render_to_string
 from django.db.models import Count, Q, Avg
 from django.utils import timezone
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
 from django.views.decorators.http import require_POST, require_GET
-from django.core.paginator import Paginator
 
-from .models import Oficial, Missao, Designacao, Unidade, Usuario, SolicitacaoDesignacao
+from .models import (
+    Oficial, Missao, Designacao, Unidade, Usuario, SolicitacaoDesignacao, ImportacaoPlanilha,
+    hash_senha_padrao,
+)
+from .busca import busca_global, filtro_identificador
+from .cache import em_cache
+from .carga import adiar_recalculo_carga, montar_comparacao
+from .condicional import get_condicional
+from .estatisticas import (
+    adiar_atualizacao_estatisticas, dados_dashboard, distribuicoes, totais_missoes_por_tipo,
+)
+from .paginacao import paginar
+from .sugestoes import sugerir_oficiais
 from .decorators import (
     acesso_dashboard, acesso_comparar, acesso_admin_painel,
     permissao_gerenciar_oficiais, permissao_gerenciar_missoes,
@@ -24,6 +42,80 @@ from .decorators import (
 )
 
 
+# ============================================================
+# 🗃️ LISTAS EM CACHE
+# ============================================================
+def _obms_disponiveis(apenas_ativos=False):
+    """OBMs distintas dos oficiais, em cache até a próxima alteração em oficiais."""
+    def calcular():
+        oficiais = Oficial.objects.exclude(obm__isnull=True).exclude(obm='')
+        if apenas_ativos:
+            oficiais = oficiais.filter(ativo=True)
+        return list(oficiais.values_list('obm', flat=True).distinct().order_by('obm'))
+    
+    return em_cache('obms', ('oficiais',), calcular, apenas_ativos)
+
+
+# ============================================================
+# 🔁 RESPOSTAS DAS ALTERAÇÕES (linhas out-of-band)
+# ============================================================
+# Entidade → id do <tbody> ({plural}-linhas) nas tabelas administrativas
+TABELAS_ALTERACAO = {
+    'oficial': 'oficiais',
+    'missao': 'missoes',
+    'designacao': 'designacoes',
+    'unidade': 'unidades',
+    'usuario': 'usuarios',
+    'solicitacao': 'solicitacoes',
+}
+
+
+def _resposta_alteracao(html, eventos):
+    """
+    Resposta HTMX que não troca o alvo (#tab-content): só os swaps
+    out-of-band do html e os eventos de HX-Trigger.
+    """
+    response = HttpResponse(html)
+    response['HX-Reswap'] = 'none'
+    response['HX-Trigger'] = json.dumps(eventos)
+    return response
+
+
+def _resposta_linha(request, entidade, acao, objeto, mensagem):
+    """
+    Devolve apenas a linha alterada da tabela administrativa:
+    - 'criado': nova linha no topo do <tbody> da tabela;
+    - 'editado': substitui <tr id="{entidade}-{pk}">;
+    - 'excluido': remove a linha (objeto pode ser só o pk).
+    Os eventos sigem:alterado (contadores, formulário) e sigem:mensagem
+    (aviso) são tratados em base.html.
+    """
+    pk = getattr(objeto, 'pk', objeto)
+    
+    if acao == 'excluido':
+        html = f'<tr id="{entidade}-{pk}" hx-swap-oob="delete"></tr>'
+    else:
+        variavel = {'oficial': 'o', 'missao': 'm', 'designacao': 'd', 'solicitacao': 's'}.get(entidade, 'u')
+        html = render_to_string(f'htmx/linhas/{entidade}.html', {
+            variavel: objeto,
+            'oob': 'true' if acao == 'editado' else '',
+            'user': request.user,
+        }, request=request)
+        if acao == 'criado':
+            plural = TABELAS_ALTERACAO[entidade]
+            html = f'<tbody hx-swap-oob="afterbegin:#{plural}-linhas">{html}</tbody>'
+    
+    return _resposta_alteracao(html, {
+        'sigem:alterado': {'entidade': entidade, 'acao': acao, 'id': pk},
+        'sigem:mensagem': {'tipo': 'success', 'texto': mensagem},
+    })
+
+
+def _resposta_erro(mensagem):
+    """Mantém a tabela e o formulário abertos e só exibe o erro."""
+    return _resposta_alteracao('', {'sigem:mensagem': {'tipo': 'danger', 'texto': mensagem}})
+
+
 # ============================================================
 # 🔐 AUTENTICAÇÃO
 # ============================================================
@@ -79,32 +171,11 @@ def logout_view(request):
 def dashboard(request):
     """Página principal - Visão Geral."""
     
-    # Estatísticas gerais
-    total_oficiais = Oficial.objects.filter(ativo=True).count()
-    total_missoes_ativas = Missao.objects.filter(status='EM_ANDAMENTO').count()
-    total_missoes = Missao.objects.count()
+    # Indicadores, ranking e missões recentes (em cache até a próxima alteração)
+    context = dict(dados_dashboard())
     
-    # Missões por tipo (apenas em andamento)
-    missoes_por_tipo = Missao.objects.filter(status='EM_ANDAMENTO').values('tipo').annotate(
-        total=Count('id')
-    ).order_by('-total')
-    
-    # Oficiais mais escalados (top 10)
-    oficiais_mais_escalados = Oficial.objects.filter(ativo=True).annotate(
-        total_designacoes=Count('designacoes', filter=Q(designacoes__missao__status='EM_ANDAMENTO'))
-    ).order_by('-total_designacoes')[:10]
-    
-    # Missões recentes
-    missoes_recentes = Missao.objects.order_by('-criado_em')[:5]
-    
-    context = {
-        'total_oficiais': total_oficiais,
-        'total_missoes_ativas': total_missoes_ativas,
-        'total_missoes': total_missoes,
-        'missoes_por_tipo': missoes_por_tipo,
-        'oficiais_mais_escalados': oficiais_mais_escalados,
-        'missoes_recentes': missoes_recentes,
-    }
+    # Distribuições das designações, lidas do cubo de estatísticas
+    context.update(distribuicoes(request))
     
     return render(request, 'pages/dashboard.html', context)
 
@@ -125,10 +196,9 @@ def comparar_oficiais(request):
     
     # Para comandante, filtrar apenas OBMs permitidas
     if user.is_comandante:
-        obms_permitidas = user.get_obm_subordinadas()
-        obms = obms_permitidas
+        obms = request.escopo.obms
     else:
-        obms = Oficial.objects.values_list('obm', flat=True).distinct().order_by('obm')
+        obms = _obms_disponiveis()
     
     context = {
         'postos': postos,
@@ -148,16 +218,7 @@ def missoes_dashboard(request):
     """Dashboard completo de missões com organograma."""
     
     # Totalizadores por tipo (em andamento)
-    tipos = ['OPERACIONAL', 'ADMINISTRATIVA', 'ENSINO', 'CORREICIONAL', 'COMISSAO', 'ACAO_SOCIAL']
-    
-    totais_por_tipo = []
-    for tipo in tipos:
-        total = Missao.objects.filter(tipo=tipo, status='EM_ANDAMENTO').count()
-        totais_por_tipo.append({
-            'tipo': tipo,
-            'tipo_display': dict(Missao.TIPO_CHOICES).get(tipo, tipo),
-            'total': total
-        })
+    totais_por_tipo = totais_missoes_por_tipo()
     
     # Filtros disponíveis
     status_choices = Missao.STATUS_CHOICES
@@ -191,7 +252,7 @@ def consultar_oficial(request, oficial_id=None):
         oficial = get_object_or_404(Oficial, pk=oficial_id)
         
         # Verificar permissão
-        if not usuario.pode_ver_oficial(oficial):
+        if not request.escopo.pode_ver_oficial(oficial):
             messages.error(request, 'Você não tem permissão para visualizar este oficial.')
             return redirect('consultar_oficial')
     else:
@@ -209,17 +270,10 @@ def consultar_oficial(request, oficial_id=None):
     if pode_consultar_outros:
         if usuario.role in ['admin', 'comando_geral']:
             # Admin e Comando-Geral veem todas as OBMs
-            obms_disponiveis = list(
-                Oficial.objects.filter(ativo=True)
-                .exclude(obm__isnull=True)
-                .exclude(obm='')
-                .values_list('obm', flat=True)
-                .distinct()
-                .order_by('obm')
-            )
+            obms_disponiveis = _obms_disponiveis(apenas_ativos=True)
         elif usuario.role == 'comandante':
             # Comandante vê apenas sua OBM e subordinadas
-            obms_disponiveis = usuario.get_obm_subordinadas()
+            obms_disponiveis = list(request.escopo.obms)
     
     # Designações do oficial
     designacoes = Designacao.objects.filter(oficial=oficial).select_related('missao').order_by('-criado_em')
@@ -271,17 +325,8 @@ def htmx_buscar_oficiais(request):
     if usuario.role not in ['admin', 'comando_geral', 'comandante']:
         return HttpResponse('<p class="text-danger">Sem permissão.</p>')
     
-    # Base query
-    oficiais = Oficial.objects.filter(ativo=True)
-    
-    # Filtrar por permissão do comandante
-    if usuario.role == 'comandante':
-        obms_permitidas = usuario.get_obm_subordinadas()
-        if obms_permitidas:
-            q_filter = Q()
-            for obm in obms_permitidas:
-                q_filter |= Q(obm__icontains=obm)
-            oficiais = oficiais.filter(q_filter)
+    # Base query (carga anotada em uma única consulta), no escopo do usuário
+    oficiais = Oficial.objects.with_carga().visible_to(request).filter(ativo=True)
     
     # Aplicar filtros da busca
     rg = request.GET.get('rg', '').strip()
@@ -290,12 +335,10 @@ def htmx_buscar_oficiais(request):
     posto = request.GET.get('posto', '').strip()
     quadro = request.GET.get('quadro', '').strip()
     
-    if rg:
-        oficiais = oficiais.filter(rg__icontains=rg)
-    if nome:
-        oficiais = oficiais.filter(
-            Q(nome__icontains=nome) | Q(nome_guerra__icontains=nome)
-        )
+    # RG e nome pela busca textual (índice GIN), ordenados por relevância
+    texto = ' '.join(filter(None, [rg, nome]))
+    if texto:
+        oficiais = oficiais.buscar(texto)
     if obm:
         oficiais = oficiais.filter(obm__icontains=obm)
     if posto:
@@ -304,7 +347,11 @@ def htmx_buscar_oficiais(request):
         oficiais = oficiais.filter(quadro=quadro)
     
     # Limitar resultados
-    oficiais = oficiais.order_by('posto', 'nome')[:20]
+    if texto:
+        oficiais = oficiais.order_by('-relevancia', 'posto', 'nome')
+    else:
+        oficiais = oficiais.order_by('posto', 'nome')
+    oficiais = list(oficiais[:20])
     
     # Verificar se há filtros ativos
     tem_filtros = any([rg, nome, obm, posto, quadro])
@@ -312,7 +359,39 @@ def htmx_buscar_oficiais(request):
     return render(request, 'htmx/oficiais_busca_resultado.html', {
         'oficiais': oficiais,
         'tem_filtros': tem_filtros,
-        'total': oficiais.count(),
+        'total': len(oficiais),
+    })
+
+
+@login_required
+def htmx_busca_global(request):
+    """Busca oficiais, missões, unidades e solicitações de uma só vez (HTMX)."""
+    
+    texto = request.GET.get('q', '').strip()
+    
+    # Uma consulta (UNION) nos vetores de busca, no escopo do usuário e em cache
+    resultados = []
+    if texto:
+        resultados = busca_global(
+            texto,
+            request.escopo,
+            ve_solicitacoes=request.user.pode_gerenciar_solicitacoes,
+        )
+    
+    return render(request, 'htmx/busca_global.html', {
+        'texto': texto,
+        'resultados': resultados,
+    })
+
+
+@login_required
+def htmx_oficiais_autocompletar(request):
+    """Sugestões de oficiais para os seletores (JSON, índice em memória)."""
+    
+    texto = request.GET.get('q', '').strip()
+    
+    return JsonResponse({
+        'resultados': sugerir_oficiais(texto, request.escopo),
     })
 
 
@@ -352,20 +431,14 @@ def admin_painel(request):
 # 🔄 HTMX - OFICIAIS
 # ============================================================
 @login_required
+@get_condicional('oficiais', 'designacoes', 'missoes', 'carga')
 def htmx_oficiais_lista(request):
     """Retorna a lista de oficiais para a tabela administrativa ou comparação."""
     
     user = request.user
-    oficiais = Oficial.objects.all().order_by('posto', 'nome')
     
-    # Se for comandante, filtrar apenas OBMs permitidas
-    if user.is_comandante:
-        obms_permitidas = user.get_obm_subordinadas()
-        if obms_permitidas:
-            q_filter = Q()
-            for obm in obms_permitidas:
-                q_filter |= Q(obm__icontains=obm)
-            oficiais = oficiais.filter(q_filter)
+    # Comandante vê apenas sua OBM e subordinadas
+    oficiais = Oficial.objects.with_carga().visible_to(request).order_by('posto', 'nome')
     
     # Filtros da interface
     posto = request.GET.get('posto', '')
@@ -381,12 +454,8 @@ def htmx_oficiais_lista(request):
     if obm:
         oficiais = oficiais.filter(obm__icontains=obm)
     if busca:
-        oficiais = oficiais.filter(
-            Q(nome__icontains=busca) | 
-            Q(nome_guerra__icontains=busca) |
-            Q(cpf__icontains=busca) |
-            Q(rg__icontains=busca)
-        )
+        # Busca textual (índice GIN): nome, nome de guerra, CPF e RG
+        oficiais = oficiais.buscar(busca).order_by('-relevancia', 'posto', 'nome')
     if ativo:
         oficiais = oficiais.filter(ativo=(ativo == 'true'))
     
@@ -396,7 +465,7 @@ def htmx_oficiais_lista(request):
     if template == 'lista':
         return render(request, 'htmx/oficiais_lista.html', {'oficiais': oficiais})
     
-    # Ordenação
+    # Ordenação (com busca e sem ordenação escolhida: por relevância)
     ordenar = request.GET.get('ordenar', 'posto')
     direcao = request.GET.get('direcao', 'asc')
     
@@ -405,23 +474,21 @@ def htmx_oficiais_lista(request):
     elif direcao == 'asc' and ordenar.startswith('-'):
         ordenar = ordenar[1:]
     
-    oficiais = oficiais.order_by(ordenar, 'nome')
+    if not (busca and 'ordenar' not in request.GET):
+        oficiais = oficiais.order_by(ordenar, 'nome')
     
     # Paginação
     por_pagina = int(request.GET.get('por_pagina', 25))
-    pagina = request.GET.get('pagina', 1)
-    
-    paginator = Paginator(oficiais, por_pagina)
-    page_obj = paginator.get_page(pagina)
+    page_obj = paginar(request, oficiais, por_pagina)
     
-    # Query string para paginação
+    # Query string para paginação (sem a página/cursor atual)
     query_params = request.GET.copy()
-    if 'pagina' in query_params:
-        del query_params['pagina']
+    for param in ('pagina', 'cursor'):
+        query_params.pop(param, None)
     query_string = query_params.urlencode()
     
     # Lista de OBMs disponíveis para filtro
-    obms_disponiveis = Oficial.objects.values_list('obm', flat=True).distinct().order_by('obm')
+    obms_disponiveis = _obms_disponiveis()
     
     context = {
         'page_obj': page_obj,
@@ -451,8 +518,8 @@ def htmx_oficiais_lista(request):
 def htmx_oficiais_selecao(request):
     """Retorna lista de oficiais com checkboxes para seleção (página Comparar)."""
     
-    user = request.user
-    oficiais = Oficial.objects.filter(ativo=True)
+    # Comandante vê apenas sua OBM e subordinadas
+    oficiais = Oficial.objects.with_carga().visible_to(request).filter(ativo=True)
     
     # Filtros
     posto = request.GET.get('posto', '')
@@ -468,23 +535,14 @@ def htmx_oficiais_selecao(request):
         oficiais = oficiais.filter(obm__icontains=obm)
     if busca:
         oficiais = oficiais.filter(
-            Q(nome__icontains=busca) | 
-            Q(nome_guerra__icontains=busca)
+            Q(nome__uicontains=busca) | 
+            Q(nome_guerra__uicontains=busca)
         )
     
-    # Filtro de OBM para comandante
-    if user.role == 'comandante' and hasattr(user, 'get_obm_subordinadas'):
-        obms_permitidas = user.get_obm_subordinadas()
-        if obms_permitidas:
-            q_filter = Q()
-            for obm_perm in obms_permitidas:
-                q_filter |= Q(obm__icontains=obm_perm)
-            oficiais = oficiais.filter(q_filter)
-    
     oficiais = oficiais.order_by('posto', 'nome')
     
     # Lista de OBMs disponíveis
-    obms_disponiveis = Oficial.objects.filter(ativo=True).values_list('obm', flat=True).distinct().order_by('obm')
+    obms_disponiveis = _obms_disponiveis(apenas_ativos=True)
     
     context = {
         'oficiais': oficiais,
@@ -510,23 +568,7 @@ def htmx_oficiais_cards(request):
     
     if ids:
         ids_list = [int(id) for id in ids.split(',') if id.isdigit()]
-        oficiais = Oficial.objects.filter(id__in=ids_list)
-        
-        # Para cada oficial, buscar dados para o card
-        oficiais_data = []
-        for oficial in oficiais:
-            ultimas_missoes = oficial.designacoes.select_related('missao').filter(
-                missao__status='EM_ANDAMENTO'
-            ).order_by('-criado_em')[:5]
-            
-            oficiais_data.append({
-                'oficial': oficial,
-                'total_baixa': oficial.total_baixa,
-                'total_media': oficial.total_media,
-                'total_alta': oficial.total_alta,
-                'carga_total': oficial.carga_total,
-                'ultimas_missoes': ultimas_missoes,
-            })
+        oficiais_data = montar_comparacao(ids_list)
     else:
         oficiais_data = []
     
@@ -534,26 +576,15 @@ def htmx_oficiais_cards(request):
 
 
 @login_required
+@get_condicional('oficiais', 'designacoes', 'missoes', 'carga', modelo=Oficial)
 def htmx_oficial_card(request, pk):
     """Retorna o card de um oficial específico."""
     
-    oficial = get_object_or_404(Oficial, pk=pk)
+    dados = montar_comparacao([pk])
+    if not dados:
+        raise Http404('Oficial não encontrado.')
     
-    # Últimas missões ativas
-    ultimas_missoes = oficial.designacoes.select_related('missao').filter(
-        missao__status='EM_ANDAMENTO'
-    ).order_by('-criado_em')[:5]
-    
-    context = {
-        'oficial': oficial,
-        'total_baixa': oficial.total_baixa,
-        'total_media': oficial.total_media,
-        'total_alta': oficial.total_alta,
-        'carga_total': oficial.carga_total,
-        'ultimas_missoes': ultimas_missoes,
-    }
-    
-    return render(request, 'htmx/oficial_card.html', context)
+    return render(request, 'htmx/oficial_card.html', dados[0])
 
 
 @login_required
@@ -578,20 +609,17 @@ def htmx_oficial_criar(request):
             telefone=request.POST.get('telefone', ''),
         )
         
-        # Criar usuário automaticamente
-        Usuario.objects.create_user(
+        # Criar usuário automaticamente (senha padrão, hash no primeiro login)
+        Usuario.objects.provisionar(
             cpf=oficial.cpf,
-            password='123456',
             oficial=oficial,
             role='oficial'
         )
         
-        messages.success(request, f'Oficial {oficial} criado com sucesso!')
-        
     except Exception as e:
-        messages.error(request, f'Erro ao criar oficial: {str(e)}')
+        return _resposta_erro(f'Erro ao criar oficial: {str(e)}')
     
-    return htmx_oficiais_lista(request)
+    return _resposta_linha(request, 'oficial', 'criado', oficial, f'Oficial {oficial} criado com sucesso!')
 
 
 @login_required
@@ -615,15 +643,14 @@ def htmx_oficial_editar(request, pk):
         oficial.telefone = request.POST.get('telefone', oficial.telefone)
         oficial.save()
         
-        messages.success(request, f'Oficial {oficial} atualizado!')
-        
     except Exception as e:
-        messages.error(request, f'Erro ao atualizar: {str(e)}')
+        return _resposta_erro(f'Erro ao atualizar: {str(e)}')
     
-    return htmx_oficiais_lista(request)
+    return _resposta_linha(request, 'oficial', 'editado', oficial, f'Oficial {oficial} atualizado!')
 
 
 @login_required
+@get_condicional('oficiais', modelo=Oficial)
 def htmx_oficial_dados(request, pk):
     """Retorna dados de um oficial em JSON para edição."""
     
@@ -657,18 +684,19 @@ def htmx_oficial_excluir(request, pk):
     nome = str(oficial)
     
     try:
-        oficial.delete()
-        messages.success(request, f'Oficial {nome} excluído!')
+        with adiar_recalculo_carga(), adiar_atualizacao_estatisticas():
+            oficial.delete()
     except Exception as e:
-        messages.error(request, f'Erro ao excluir: {str(e)}')
+        return _resposta_erro(f'Erro ao excluir: {str(e)}')
     
-    return htmx_oficiais_lista(request)
+    return _resposta_linha(request, 'oficial', 'excluido', pk, f'Oficial {nome} excluído!')
 
 
 # ============================================================
 # 🔄 HTMX - MISSÕES
 # ============================================================
 @login_required
+@get_condicional('missoes', 'designacoes')
 def htmx_missoes_lista(request):
     """Retorna a lista de missões filtrada (cards para página de Missões)."""
     
@@ -686,7 +714,7 @@ def htmx_missoes_lista(request):
     if status:
         missoes = missoes.filter(status=status)
     if local:
-        missoes = missoes.filter(local__icontains=local)
+        missoes = missoes.buscar(local, campos=('local',))
     if data_inicio:
         missoes = missoes.filter(data_inicio__gte=data_inicio)
     if data_fim:
@@ -696,6 +724,7 @@ def htmx_missoes_lista(request):
 
 
 @login_required
+@get_condicional('missoes', 'designacoes')
 def htmx_missoes_tabela(request):
     """Retorna tabela de missões com paginação e filtros (para Admin)."""
     
@@ -711,11 +740,8 @@ def htmx_missoes_tabela(request):
     data_fim = request.GET.get('data_fim', '')
     
     if busca:
-        missoes = missoes.filter(
-            Q(nome__icontains=busca) |
-            Q(local__icontains=busca) |
-            Q(documento_referencia__icontains=busca)
-        )
+        # Trecho em nome, local ou documento; nome tolera erros de digitação
+        missoes = missoes.buscar(busca)
     
     if tipo:
         missoes = missoes.filter(tipo=tipo)
@@ -737,21 +763,22 @@ def htmx_missoes_tabela(request):
     elif direcao == 'asc' and ordenar.startswith('-'):
         ordenar = ordenar[1:]
     
-    missoes = missoes.order_by(ordenar)
+    if busca and 'ordenar' not in request.GET:
+        # Sem ordenação escolhida: mais parecidas primeiro
+        missoes = missoes.order_by('-similaridade', ordenar)
+    else:
+        missoes = missoes.order_by(ordenar)
     
     # ============================================================
     # PAGINAÇÃO
     # ============================================================
     por_pagina = int(request.GET.get('por_pagina', 25))
-    pagina = request.GET.get('pagina', 1)
-    
-    paginator = Paginator(missoes, por_pagina)
-    page_obj = paginator.get_page(pagina)
+    page_obj = paginar(request, missoes, por_pagina)
     
-    # Query string para paginação
+    # Query string para paginação (sem a página/cursor atual)
     query_params = request.GET.copy()
-    if 'pagina' in query_params:
-        del query_params['pagina']
+    for param in ('pagina', 'cursor'):
+        query_params.pop(param, None)
     query_string = query_params.urlencode()
     
     context = {
@@ -778,6 +805,7 @@ def htmx_missoes_tabela(request):
 
 
 @login_required
+@get_condicional('missoes', 'designacoes', 'oficiais', modelo=Missao)
 def htmx_missao_organograma(request, pk):
     """Retorna o organograma de uma missão."""
     
@@ -811,7 +839,7 @@ def htmx_missao_criar(request):
         return HttpResponse('Sem permissão', status=403)
     
     try:
-        Missao.objects.create(
+        missao = Missao.objects.create(
             tipo=request.POST.get('tipo', ''),
             nome=request.POST.get('nome', ''),
             descricao=request.POST.get('descricao', ''),
@@ -821,12 +849,10 @@ def htmx_missao_criar(request):
             status=request.POST.get('status', 'PLANEJADA'),
             documento_referencia=request.POST.get('documento_referencia', ''),
         )
-        messages.success(request, 'Missão criada com sucesso!')
-        
     except Exception as e:
-        messages.error(request, f'Erro ao criar missão: {str(e)}')
+        return _resposta_erro(f'Erro ao criar missão: {str(e)}')
     
-    return htmx_missoes_lista(request)
+    return _resposta_linha(request, 'missao', 'criado', missao, 'Missão criada com sucesso!')
 
 
 @login_required
@@ -855,15 +881,15 @@ def htmx_missao_editar(request, pk):
             missao.data_fim = data_fim
         
         missao.save()
-        messages.success(request, 'Missão atualizada!')
         
     except Exception as e:
-        messages.error(request, f'Erro ao atualizar: {str(e)}')
+        return _resposta_erro(f'Erro ao atualizar: {str(e)}')
     
-    return htmx_missoes_lista(request)
+    return _resposta_linha(request, 'missao', 'editado', missao, 'Missão atualizada!')
 
 
 @login_required
+@get_condicional('missoes', modelo=Missao)
 def htmx_missao_dados(request, pk):
     """Retorna dados de uma missão em JSON para edição."""
     
@@ -894,18 +920,19 @@ def htmx_missao_excluir(request, pk):
     nome = missao.nome
     
     try:
-        missao.delete()
-        messages.success(request, f'Missão "{nome}" excluída!')
+        with adiar_recalculo_carga(), adiar_atualizacao_estatisticas():
+            missao.delete()
     except Exception as e:
-        messages.error(request, f'Erro ao excluir: {str(e)}')
+        return _resposta_erro(f'Erro ao excluir: {str(e)}')
     
-    return htmx_missoes_lista(request)
+    return _resposta_linha(request, 'missao', 'excluido', pk, f'Missão "{nome}" excluída!')
 
 
 # ============================================================
 # 🔄 HTMX - DESIGNAÇÕES
 # ============================================================
 @login_required
+@get_condicional('designacoes', 'missoes', 'oficiais')
 def htmx_designacoes_lista(request):
     """Retorna a lista de designações com paginação e filtros (para Admin)."""
     
@@ -921,9 +948,9 @@ def htmx_designacoes_lista(request):
     
     if busca:
         designacoes = designacoes.filter(
-            Q(oficial__nome__icontains=busca) |
-            Q(oficial__nome_guerra__icontains=busca) |
-            Q(missao__nome__icontains=busca)
+            Q(oficial__nome__uicontains=busca) |
+            Q(oficial__nome_guerra__uicontains=busca) |
+            Q(missao__nome__uicontains=busca)
         )
     
     if missao_id:
@@ -952,15 +979,12 @@ def htmx_designacoes_lista(request):
     # PAGINAÇÃO
     # ============================================================
     por_pagina = int(request.GET.get('por_pagina', 25))
-    pagina = request.GET.get('pagina', 1)
-    
-    paginator = Paginator(designacoes, por_pagina)
-    page_obj = paginator.get_page(pagina)
+    page_obj = paginar(request, designacoes, por_pagina)
     
-    # Query string para paginação
+    # Query string para paginação (sem a página/cursor atual)
     query_params = request.GET.copy()
-    if 'pagina' in query_params:
-        del query_params['pagina']
+    for param in ('pagina', 'cursor'):
+        query_params.pop(param, None)
     query_string = query_params.urlencode()
     
     context = {
@@ -979,8 +1003,8 @@ def htmx_designacoes_lista(request):
         'query_string': query_string,
         'funcao_choices': Designacao.FUNCAO_CHOICES,
         'complexidade_choices': Designacao.COMPLEXIDADE_CHOICES,
-        'missoes_disponiveis': Missao.objects.filter(status__in=['PLANEJADA', 'EM_ANDAMENTO']).order_by('nome'),
-        'oficiais_disponiveis': Oficial.objects.filter(ativo=True).order_by('posto', 'nome'),
+        # Opções dos seletores vêm de htmx/opcoes/... ao abrir; aqui só a missão filtrada
+        'missao_filtro': Missao.objects.filter(pk=missao_id).only('id', 'nome').first() if missao_id.isdigit() else None,
         'user': request.user,
     }
     
@@ -999,19 +1023,19 @@ def htmx_designacao_criar(request):
         missao_id = request.POST.get('missao_id')
         oficial_id = request.POST.get('oficial_id')
         
-        Designacao.objects.create(
+        designacao = Designacao.objects.create(
             missao_id=missao_id,
             oficial_id=oficial_id,
             funcao_na_missao=request.POST.get('funcao_na_missao', 'MEMBRO'),
             complexidade=request.POST.get('complexidade', 'MEDIA'),
             observacoes=request.POST.get('observacoes', ''),
         )
-        messages.success(request, 'Designação criada!')
-        
     except Exception as e:
-        messages.error(request, f'Erro ao criar designação: {str(e)}')
+        return _resposta_erro(f'Erro ao criar designação: {str(e)}')
     
-    return htmx_designacoes_lista(request)
+    # Missão e oficial da linha em uma única consulta
+    designacao = Designacao.objects.select_related('missao', 'oficial').get(pk=designacao.pk)
+    return _resposta_linha(request, 'designacao', 'criado', designacao, 'Designação criada!')
 
 
 @login_required
@@ -1022,22 +1046,22 @@ def htmx_designacao_editar(request, pk):
     if not request.user.pode_gerenciar_designacoes:
         return HttpResponse('Sem permissão', status=403)
     
-    designacao = get_object_or_404(Designacao, pk=pk)
+    designacao = get_object_or_404(Designacao.objects.select_related('missao', 'oficial'), pk=pk)
     
     try:
         designacao.funcao_na_missao = request.POST.get('funcao_na_missao', designacao.funcao_na_missao)
         designacao.complexidade = request.POST.get('complexidade', designacao.complexidade)
         designacao.observacoes = request.POST.get('observacoes', designacao.observacoes)
         designacao.save()
-        messages.success(request, 'Designação atualizada!')
         
     except Exception as e:
-        messages.error(request, f'Erro ao atualizar: {str(e)}')
+        return _resposta_erro(f'Erro ao atualizar: {str(e)}')
     
-    return htmx_designacoes_lista(request)
+    return _resposta_linha(request, 'designacao', 'editado', designacao, 'Designação atualizada!')
 
 
 @login_required
+@get_condicional('designacoes', modelo=Designacao)
 def htmx_designacao_dados(request, pk):
     """Retorna dados de uma designação em JSON para edição."""
     
@@ -1065,21 +1089,21 @@ def htmx_designacao_excluir(request, pk):
     
     try:
         designacao.delete()
-        messages.success(request, 'Designação excluída!')
     except Exception as e:
-        messages.error(request, f'Erro ao excluir: {str(e)}')
+        return _resposta_erro(f'Erro ao excluir: {str(e)}')
     
-    return htmx_designacoes_lista(request)
+    return _resposta_linha(request, 'designacao', 'excluido', pk, 'Designação excluída!')
 
 
 # ============================================================
 # 🔄 HTMX - UNIDADES
 # ============================================================
 @login_required
+@get_condicional('unidades')
 def htmx_unidades_lista(request):
     """Retorna a lista de unidades com paginação e filtros."""
     
-    unidades = Unidade.objects.all()
+    unidades = Unidade.objects.select_related('comando_superior')
     
     # Filtros
     busca = request.GET.get('busca', '').strip()
@@ -1087,8 +1111,8 @@ def htmx_unidades_lista(request):
     
     if busca:
         unidades = unidades.filter(
-            Q(nome__icontains=busca) |
-            Q(sigla__icontains=busca)
+            Q(nome__uicontains=busca) |
+            Q(sigla__uicontains=busca)
         )
     
     if tipo:
@@ -1107,15 +1131,12 @@ def htmx_unidades_lista(request):
     
     # Paginação
     por_pagina = int(request.GET.get('por_pagina', 25))
-    pagina = request.GET.get('pagina', 1)
-    
-    paginator = Paginator(unidades, por_pagina)
-    page_obj = paginator.get_page(pagina)
+    page_obj = paginar(request, unidades, por_pagina)
     
-    # Query string
+    # Query string (sem a página/cursor atual)
     query_params = request.GET.copy()
-    if 'pagina' in query_params:
-        del query_params['pagina']
+    for param in ('pagina', 'cursor'):
+        query_params.pop(param, None)
     query_string = query_params.urlencode()
     
     context = {
@@ -1149,18 +1170,16 @@ def htmx_unidade_criar(request):
     try:
         comando_superior_id = request.POST.get('comando_superior_id')
         
-        Unidade.objects.create(
+        unidade = Unidade.objects.create(
             nome=request.POST.get('nome', ''),
             sigla=request.POST.get('sigla', ''),
             tipo=request.POST.get('tipo', ''),
             comando_superior_id=comando_superior_id if comando_superior_id else None,
         )
-        messages.success(request, 'Unidade criada!')
-        
     except Exception as e:
-        messages.error(request, f'Erro ao criar unidade: {str(e)}')
+        return _resposta_erro(f'Erro ao criar unidade: {str(e)}')
     
-    return htmx_unidades_lista(request)
+    return _resposta_linha(request, 'unidade', 'criado', unidade, 'Unidade criada!')
 
 
 @login_required
@@ -1182,12 +1201,11 @@ def htmx_unidade_editar(request, pk):
         unidade.comando_superior_id = comando_superior_id if comando_superior_id else None
         
         unidade.save()
-        messages.success(request, 'Unidade atualizada!')
         
     except Exception as e:
-        messages.error(request, f'Erro ao atualizar: {str(e)}')
+        return _resposta_erro(f'Erro ao atualizar: {str(e)}')
     
-    return htmx_unidades_lista(request)
+    return _resposta_linha(request, 'unidade', 'editado', unidade, 'Unidade atualizada!')
 
 
 @login_required
@@ -1203,17 +1221,17 @@ def htmx_unidade_excluir(request, pk):
     
     try:
         unidade.delete()
-        messages.success(request, f'Unidade "{nome}" excluída!')
     except Exception as e:
-        messages.error(request, f'Erro ao excluir: {str(e)}')
+        return _resposta_erro(f'Erro ao excluir: {str(e)}')
     
-    return htmx_unidades_lista(request)
+    return _resposta_linha(request, 'unidade', 'excluido', pk, f'Unidade "{nome}" excluída!')
 
 
 # ============================================================
 # 🔄 HTMX - USUÁRIOS
 # ============================================================
 @login_required
+@get_condicional('usuarios', 'oficiais')
 def htmx_usuarios_lista(request):
     """Retorna a lista de usuários com paginação e filtros."""
     
@@ -1228,11 +1246,15 @@ def htmx_usuarios_lista(request):
     ativo = request.GET.get('ativo', '')
     
     if busca:
-        usuarios = usuarios.filter(
-            Q(cpf__icontains=busca) |
-            Q(oficial__nome__icontains=busca) |
-            Q(oficial__nome_guerra__icontains=busca)
-        )
+        # CPF/RG vão aos índices b-tree; texto livre, aos nomes
+        identificador = filtro_identificador(busca, cpf='cpf', rg='oficial__rg')
+        if identificador is not None:
+            usuarios = usuarios.filter(identificador)
+        else:
+            usuarios = usuarios.filter(
+                Q(oficial__nome__uicontains=busca) |
+                Q(oficial__nome_guerra__uicontains=busca)
+            )
     
     if role:
         usuarios = usuarios.filter(role=role)
@@ -1253,20 +1275,14 @@ def htmx_usuarios_lista(request):
     
     # Paginação
     por_pagina = int(request.GET.get('por_pagina', 25))
-    pagina = request.GET.get('pagina', 1)
-    
-    paginator = Paginator(usuarios, por_pagina)
-    page_obj = paginator.get_page(pagina)
+    page_obj = paginar(request, usuarios, por_pagina)
     
-    # Query string
+    # Query string (sem a página/cursor atual)
     query_params = request.GET.copy()
-    if 'pagina' in query_params:
-        del query_params['pagina']
+    for param in ('pagina', 'cursor'):
+        query_params.pop(param, None)
     query_string = query_params.urlencode()
     
-    # Oficiais sem usuário (para vincular)
-    oficiais_disponiveis = Oficial.objects.filter(usuario__isnull=True).order_by('posto', 'nome')
-    
     context = {
         'page_obj': page_obj,
         'filtros': {
@@ -1281,7 +1297,6 @@ def htmx_usuarios_lista(request):
         },
         'query_string': query_string,
         'role_choices': Usuario.ROLE_CHOICES,
-        'oficiais_disponiveis': oficiais_disponiveis,
         'user': request.user,
     }
     
@@ -1300,18 +1315,15 @@ def htmx_usuario_criar(request):
         cpf = request.POST.get('cpf', '').replace('.', '').replace('-', '')
         oficial_id = request.POST.get('oficial_id')
         
-        Usuario.objects.create_user(
+        usuario = Usuario.objects.provisionar(
             cpf=cpf,
-            password='123456',
             role=request.POST.get('role', 'oficial'),
             oficial_id=oficial_id if oficial_id else None,
         )
-        messages.success(request, f'Usuário {cpf} criado com senha padrão 123456!')
-        
     except Exception as e:
-        messages.error(request, f'Erro ao criar usuário: {str(e)}')
+        return _resposta_erro(f'Erro ao criar usuário: {str(e)}')
     
-    return htmx_usuarios_lista(request)
+    return _resposta_linha(request, 'usuario', 'criado', usuario, f'Usuário {cpf} criado com senha padrão 123456!')
 
 
 @login_required
@@ -1322,18 +1334,17 @@ def htmx_usuario_editar(request, pk):
     if not request.user.is_admin:
         return HttpResponse('Sem permissão', status=403)
     
-    usuario = get_object_or_404(Usuario, pk=pk)
+    usuario = get_object_or_404(Usuario.objects.select_related('oficial'), pk=pk)
     
     try:
         usuario.role = request.POST.get('role', usuario.role)
         usuario.is_active = request.POST.get('is_active') == 'on'
         usuario.save()
-        messages.success(request, 'Usuário atualizado!')
         
     except Exception as e:
-        messages.error(request, f'Erro ao atualizar: {str(e)}')
+        return _resposta_erro(f'Erro ao atualizar: {str(e)}')
     
-    return htmx_usuarios_lista(request)
+    return _resposta_linha(request, 'usuario', 'editado', usuario, 'Usuário atualizado!')
 
 
 @login_required
@@ -1347,16 +1358,14 @@ def htmx_usuario_excluir(request, pk):
     usuario = get_object_or_404(Usuario, pk=pk)
     
     if usuario == request.user:
-        messages.error(request, 'Você não pode excluir seu próprio usuário!')
-        return htmx_usuarios_lista(request)
+        return _resposta_erro('Você não pode excluir seu próprio usuário!')
     
     try:
         usuario.delete()
-        messages.success(request, 'Usuário excluído!')
     except Exception as e:
-        messages.error(request, f'Erro ao excluir: {str(e)}')
+        return _resposta_erro(f'Erro ao excluir: {str(e)}')
     
-    return htmx_usuarios_lista(request)
+    return _resposta_linha(request, 'usuario', 'excluido', pk, 'Usuário excluído!')
 
 
 @login_required
@@ -1370,13 +1379,15 @@ def htmx_usuario_reset_senha(request, pk):
     usuario = get_object_or_404(Usuario, pk=pk)
     
     try:
-        usuario.set_password('123456')
+        usuario.password = hash_senha_padrao()
         usuario.save()
-        messages.success(request, f'Senha do usuário {usuario.cpf} redefinida para 123456!')
     except Exception as e:
-        messages.error(request, f'Erro ao resetar senha: {str(e)}')
+        return _resposta_erro(f'Erro ao resetar senha: {str(e)}')
     
-    return htmx_usuarios_lista(request)
+    # A linha não muda: só o aviso
+    return _resposta_alteracao('', {
+        'sigem:mensagem': {'tipo': 'success', 'texto': f'Senha do usuário {usuario.cpf} redefinida para 123456!'},
+    })
 
 
 # ============================================================
@@ -1409,6 +1420,7 @@ def htmx_solicitacao_criar(request):
 
 
 @login_required
+@get_condicional('solicitacoes', 'oficiais')
 def htmx_solicitacoes_lista(request):
     """Lista solicitações com paginação e filtros."""
     
@@ -1423,9 +1435,9 @@ def htmx_solicitacoes_lista(request):
     
     if busca:
         solicitacoes = solicitacoes.filter(
-            Q(solicitante__nome__icontains=busca) |
-            Q(solicitante__nome_guerra__icontains=busca) |
-            Q(nome_missao__icontains=busca)
+            Q(solicitante__nome__uicontains=busca) |
+            Q(solicitante__nome_guerra__uicontains=busca) |
+            Q(nome_missao__uicontains=busca)
         )
     
     if status:
@@ -1444,15 +1456,12 @@ def htmx_solicitacoes_lista(request):
     
     # Paginação
     por_pagina = int(request.GET.get('por_pagina', 25))
-    pagina = request.GET.get('pagina', 1)
-    
-    paginator = Paginator(solicitacoes, por_pagina)
-    page_obj = paginator.get_page(pagina)
+    page_obj = paginar(request, solicitacoes, por_pagina)
     
-    # Query string
+    # Query string (sem a página/cursor atual)
     query_params = request.GET.copy()
-    if 'pagina' in query_params:
-        del query_params['pagina']
+    for param in ('pagina', 'cursor'):
+        query_params.pop(param, None)
     query_string = query_params.urlencode()
     
     context = {
@@ -1493,12 +1502,102 @@ def htmx_solicitacao_avaliar(request, pk):
         solicitacao.observacao_avaliador = request.POST.get('observacao', '')
         solicitacao.save()
         
-        messages.success(request, f'Solicitação {solicitacao.get_status_display().lower()}!')
-        
     except Exception as e:
-        messages.error(request, f'Erro ao avaliar: {str(e)}')
+        return _resposta_erro(f'Erro ao avaliar: {str(e)}')
+    
+    # Filtro de status ativo na lista: se o novo status não o atende, a linha sai
+    filtro_status = request.POST.get('status', '')
+    if filtro_status and filtro_status != solicitacao.status:
+        acao_linha, objeto = 'excluido', pk
+    else:
+        acao_linha, objeto = 'editado', solicitacao
+    
+    return _resposta_linha(
+        request, 'solicitacao', acao_linha, objeto,
+        f'Solicitação {solicitacao.get_status_display().lower()}!'
+    )
+
+
+# ============================================================
+# 🔽 OPÇÕES DOS SELETORES (JSON, carregadas ao abrir o formulário)
+# ============================================================
+OPCOES_POR_PAGINA = 20
+
+
+def _inicio_opcoes(request):
+    """Deslocamento da página pedida (?pagina=, a partir de 1)."""
+    try:
+        pagina = max(int(request.GET.get('pagina', 1)), 1)
+    except ValueError:
+        pagina = 1
+    return (pagina - 1) * OPCOES_POR_PAGINA
+
+
+def _resposta_opcoes(itens):
+    """JSON dos seletores: até OPCOES_POR_PAGINA itens e se há mais (itens traz um a mais)."""
+    return JsonResponse({
+        'resultados': itens[:OPCOES_POR_PAGINA],
+        'tem_mais': len(itens) > OPCOES_POR_PAGINA,
+    })
+
+
+@login_required
+def htmx_opcoes_missoes(request):
+    """
+    Missões planejadas ou em andamento, no escopo do usuário, para os
+    seletores (?q=, ?pagina=, ?id=).
+    """
     
-    return htmx_solicitacoes_lista(request)
+    texto = request.GET.get('q', '').strip()
+    pk = request.GET.get('id', '')
+    inicio = _inicio_opcoes(request)
+    
+    missoes = Missao.objects.visible_to(request)
+    if pk.isdigit():
+        # Opção do registro em edição (a missão pode já ter sido concluída)
+        missoes = missoes.filter(pk=pk)
+    else:
+        missoes = missoes.filter(status__in=['PLANEJADA', 'EM_ANDAMENTO'])
+        if texto:
+            missoes = missoes.buscar(texto).order_by('-similaridade', 'nome')
+        else:
+            missoes = missoes.order_by('nome')
+    
+    linhas = missoes.values_list('pk', 'nome')[inicio:inicio + OPCOES_POR_PAGINA + 1]
+    return _resposta_opcoes([{'id': pk, 'rotulo': nome} for pk, nome in linhas])
+
+
+@login_required
+def htmx_opcoes_oficiais(request):
+    """
+    Oficiais para os seletores (?q=, ?pagina=, ?id=). Ativos pelo índice em
+    memória; com ?sem_usuario=1, os ainda sem usuário vinculado (banco).
+    """
+    
+    texto = request.GET.get('q', '').strip()
+    pk = request.GET.get('id', '')
+    inicio = _inicio_opcoes(request)
+    
+    if not pk.isdigit() and request.GET.get('sem_usuario') != '1':
+        return _resposta_opcoes(sugerir_oficiais(
+            texto, request.escopo, limite=OPCOES_POR_PAGINA + 1, deslocamento=inicio,
+        ))
+    
+    oficiais = Oficial.objects.visible_to(request)
+    if pk.isdigit():
+        oficiais = oficiais.filter(pk=pk)
+    else:
+        oficiais = oficiais.filter(usuario__isnull=True)
+        if texto:
+            oficiais = oficiais.buscar(texto).order_by('-relevancia', 'posto', 'nome')
+        else:
+            oficiais = oficiais.order_by('posto', 'nome')
+    
+    linhas = oficiais.values_list('pk', 'posto', 'nome_guerra', 'nome')[inicio:inicio + OPCOES_POR_PAGINA + 1]
+    return _resposta_opcoes([
+        {'id': pk, 'rotulo': f'{posto} {nome_guerra or nome}'}
+        for pk, posto, nome_guerra, nome in linhas
+    ])
 
 
 # ============================================================
@@ -1564,7 +1663,7 @@ def exportar_excel(request, tipo):
             # Consultando outro oficial
             try:
                 oficial_consulta = Oficial.objects.get(pk=oficial_id)
-                if request.user.pode_ver_oficial(oficial_consulta):
+                if request.escopo.pode_ver_oficial(oficial_consulta):
                     designacoes = Designacao.objects.select_related('missao', 'oficial').filter(
                         oficial=oficial_consulta
                     )
@@ -1677,9 +1776,9 @@ def gerar_modelo_importacao():
     # Aba Designações
     ws3 = wb.create_sheet('Designacoes')
     setup_sheet(ws3,
-        ['ID Missão*', 'RG Oficial*', 'Função*', 'Complexidade*', 'Observações'],
-        [15, 18, 20, 15, 40],
-        [1, 'RG123456', 'COMANDANTE', 'ALTA', 'Observação opcional'],
+        ['Missão* (ID ou nome)', 'RG Oficial*', 'Função*', 'Complexidade*', 'Observações'],
+        [25, 18, 20, 15, 40],
+        ['Operação Exemplo', 'RG123456', 'COMANDANTE', 'ALTA', 'Observação opcional'],
         7,
         {'FUNÇÕES:': ['COMANDANTE', 'SUBCOMANDANTE', 'COORDENADOR', 'PRESIDENTE', 'MEMBRO', 'AUXILIAR', 'INSTRUTOR', 'ENCARREGADO', 'RELATOR', 'ESCRIVAO'],
          'COMPLEXIDADE:': ['BAIXA', 'MEDIA', 'ALTA']}
@@ -1688,8 +1787,8 @@ def gerar_modelo_importacao():
     # Aba Unidades
     ws4 = wb.create_sheet('Unidades')
     setup_sheet(ws4,
-        ['Nome*', 'Sigla', 'Tipo*', 'ID Cmd Superior'],
-        [40, 15, 18, 18],
+        ['Nome*', 'Sigla', 'Tipo*', 'Cmd Superior (nome, sigla ou ID)'],
+        [40, 15, 18, 30],
         ['1º Batalhão BM', '1º BBM', 'BBM', ''],
         6,
         {'TIPOS:': ['COMANDO_GERAL', 'DIRETORIA', 'BBM', 'CIBM', 'CBM', 'SECAO']}
@@ -1742,7 +1841,7 @@ def exportar_pdf(request, tipo):
         oficial = get_object_or_404(Oficial, pk=oficial_id)
         
         # Verificar permissão
-        if not request.user.pode_ver_oficial(oficial):
+        if not request.escopo.pode_ver_oficial(oficial):
             messages.error(request, 'Você não tem permissão para gerar relatório deste oficial.')
             return redirect('consultar_oficial')
     else:
@@ -2059,17 +2158,45 @@ def exportar_pdf(request, tipo):
 # ============================================================
 # 📤 IMPORTAÇÃO EM MASSA
 # ============================================================
+def _mensagem_tamanho_maximo():
+    limite_mb = settings.IMPORTACAO_TAMANHO_MAXIMO / (1024 * 1024)
+    return f'Arquivo maior que o limite de {limite_mb:g} MB.'
+
+
+@csrf_exempt
 @login_required
 @require_POST
 def importar_excel(request, tipo):
-    """Importa dados de arquivo Excel."""
+    """
+    Recebe a planilha direto em arquivo temporário e a põe na fila: a
+    importação roda no comando processar_importacoes, fora da requisição.
+    Os handlers de upload só podem ser trocados antes de o POST ser lido,
+    por isso a verificação CSRF fica em _importar_excel.
+    """
+    
+    try:
+        tamanho = int(request.META.get('CONTENT_LENGTH') or 0)
+    except ValueError:
+        tamanho = 0
+    if tamanho > settings.IMPORTACAO_TAMANHO_MAXIMO:
+        messages.error(request, _mensagem_tamanho_maximo())
+        return redirect('admin_painel')
+    
+    request.upload_handlers = [TemporaryFileUploadHandler(request)]
+    return _importar_excel(request, tipo)
+
+
+@csrf_protect
+def _importar_excel(request, tipo):
+    """Coloca a planilha na fila de importação (processada pelo worker)."""
     
     if not request.user.is_admin:
         messages.error(request, 'Sem permissão.')
         return redirect('admin_painel')
     
-    import openpyxl
-    from datetime import datetime
+    if tipo not in dict(ImportacaoPlanilha.TIPO_CHOICES):
+        messages.error(request, 'Tipo de importação inválido.')
+        return redirect('admin_painel')
     
     arquivo = request.FILES.get('arquivo')
     
@@ -2077,190 +2204,61 @@ def importar_excel(request, tipo):
         messages.error(request, 'Nenhum arquivo enviado.')
         return redirect('admin_painel')
     
-    try:
-        wb = openpyxl.load_workbook(arquivo)
-        ws = wb.active
-        
-        count = 0
-        errors = []
-        
-        # ============================================================
-        # IMPORTAR OFICIAIS
-        # ============================================================
-        if tipo == 'oficiais':
-            for row_num, row in enumerate(ws.iter_rows(min_row=2, values_only=True), start=2):
-                if row[0]:  # Se tem CPF
-                    try:
-                        cpf = str(row[0]).replace('.', '').replace('-', '').strip()
-                        oficial, created = Oficial.objects.update_or_create(
-                            cpf=cpf,
-                            defaults={
-                                'rg': str(row[1]).strip() if row[1] else '',
-                                'nome': str(row[2]).strip() if row[2] else '',
-                                'nome_guerra': str(row[3]).strip() if row[3] else '',
-                                'posto': str(row[4]).strip() if row[4] else '',
-                                'quadro': str(row[5]).strip() if row[5] else '',
-                                'obm': str(row[6]).strip() if row[6] else '',
-                                'funcao': str(row[7]).strip() if row[7] else '',
-                                'email': str(row[8]).strip() if row[8] else '',
-                                'telefone': str(row[9]).strip() if row[9] else '',
-                            }
-                        )
-                        count += 1
-                        
-                        # Criar usuário automaticamente se não existir
-                        if created and not Usuario.objects.filter(cpf=cpf).exists():
-                            Usuario.objects.create_user(
-                                cpf=cpf,
-                                password='123456',
-                                oficial=oficial,
-                                role='oficial'
-                            )
-                    except Exception as e:
-                        errors.append(f'Linha {row_num}: {str(e)}')
-        
-        # ============================================================
-        # IMPORTAR MISSÕES
-        # ============================================================
-        elif tipo == 'missoes':
-            for row_num, row in enumerate(ws.iter_rows(min_row=2, values_only=True), start=2):
-                if row[0] and row[1]:  # Se tem tipo e nome
-                    try:
-                        # Processar datas
-                        data_inicio = None
-                        data_fim = None
-                        
-                        if row[4]:
-                            if isinstance(row[4], datetime):
-                                data_inicio = row[4].date()
-                            else:
-                                data_inicio = datetime.strptime(str(row[4]), '%Y-%m-%d').date()
-                        
-                        if row[5]:
-                            if isinstance(row[5], datetime):
-                                data_fim = row[5].date()
-                            else:
-                                data_fim = datetime.strptime(str(row[5]), '%Y-%m-%d').date()
-                        
-                        Missao.objects.create(
-                            tipo=str(row[0]).strip().upper(),
-                            nome=str(row[1]).strip(),
-                            descricao=str(row[2]).strip() if row[2] else '',
-                            local=str(row[3]).strip() if row[3] else '',
-                            data_inicio=data_inicio,
-                            data_fim=data_fim,
-                            status=str(row[6]).strip().upper() if row[6] else 'PLANEJADA',
-                            documento_referencia=str(row[7]).strip() if row[7] else '',
-                        )
-                        count += 1
-                    except Exception as e:
-                        errors.append(f'Linha {row_num}: {str(e)}')
-        
-        # ============================================================
-        # IMPORTAR DESIGNAÇÕES
-        # ============================================================
-        elif tipo == 'designacoes':
-            for row_num, row in enumerate(ws.iter_rows(min_row=2, values_only=True), start=2):
-                if row[0] and row[1]:  # Se tem missao_id e oficial_rg
-                    try:
-                        missao_id = int(row[0])
-                        oficial_rg = str(row[1]).strip()
-                        
-                        # Buscar missão e oficial
-                        missao = Missao.objects.get(id=missao_id)
-                        oficial = Oficial.objects.get(rg=oficial_rg)
-                        
-                        Designacao.objects.update_or_create(
-                            missao=missao,
-                            oficial=oficial,
-                            defaults={
-                                'funcao_na_missao': str(row[2]).strip().upper() if row[2] else 'MEMBRO',
-                                'complexidade': str(row[3]).strip().upper() if row[3] else 'MEDIA',
-                                'observacoes': str(row[4]).strip() if row[4] else '',
-                            }
-                        )
-                        count += 1
-                    except Missao.DoesNotExist:
-                        errors.append(f'Linha {row_num}: Missão ID {row[0]} não encontrada')
-                    except Oficial.DoesNotExist:
-                        errors.append(f'Linha {row_num}: Oficial RG {row[1]} não encontrado')
-                    except Exception as e:
-                        errors.append(f'Linha {row_num}: {str(e)}')
-        
-        # ============================================================
-        # IMPORTAR UNIDADES
-        # ============================================================
-        elif tipo == 'unidades':
-            for row_num, row in enumerate(ws.iter_rows(min_row=2, values_only=True), start=2):
-                if row[0]:  # Se tem nome
-                    try:
-                        comando_superior = None
-                        if row[3]:
-                            try:
-                                comando_superior = Unidade.objects.get(id=int(row[3]))
-                            except Unidade.DoesNotExist:
-                                pass
-                        
-                        Unidade.objects.update_or_create(
-                            nome=str(row[0]).strip(),
-                            defaults={
-                                'sigla': str(row[1]).strip() if row[1] else '',
-                                'tipo': str(row[2]).strip().upper() if row[2] else '',
-                                'comando_superior': comando_superior,
-                            }
-                        )
-                        count += 1
-                    except Exception as e:
-                        errors.append(f'Linha {row_num}: {str(e)}')
-        
-        # ============================================================
-        # IMPORTAR USUÁRIOS
-        # ============================================================
-        elif tipo == 'usuarios':
-            for row_num, row in enumerate(ws.iter_rows(min_row=2, values_only=True), start=2):
-                if row[0]:  # Se tem CPF
-                    try:
-                        cpf = str(row[0]).replace('.', '').replace('-', '').strip()
-                        role = str(row[1]).strip().lower() if row[1] else 'oficial'
-                        
-                        # Buscar oficial vinculado pelo RG
-                        oficial = None
-                        if row[2]:
-                            try:
-                                oficial = Oficial.objects.get(rg=str(row[2]).strip())
-                            except Oficial.DoesNotExist:
-                                pass
-                        
-                        if not Usuario.objects.filter(cpf=cpf).exists():
-                            Usuario.objects.create_user(
-                                cpf=cpf,
-                                password='123456',
-                                role=role,
-                                oficial=oficial,
-                            )
-                            count += 1
-                        else:
-                            # Atualizar usuário existente
-                            usuario = Usuario.objects.get(cpf=cpf)
-                            usuario.role = role
-                            if oficial:
-                                usuario.oficial = oficial
-                            usuario.save()
-                            count += 1
-                    except Exception as e:
-                        errors.append(f'Linha {row_num}: {str(e)}')
-        
-        # Mensagem de resultado
-        if count > 0:
-            messages.success(request, f'{count} registros importados/atualizados com sucesso!')
-        
-        if errors:
-            error_msg = f'Erros encontrados ({len(errors)}): ' + '; '.join(errors[:5])
-            if len(errors) > 5:
-                error_msg += f' ... e mais {len(errors) - 5} erros.'
-            messages.warning(request, error_msg)
-        
-    except Exception as e:
-        messages.error(request, f'Erro na importação: {str(e)}')
+    # Uploads sem Content-Length só têm o tamanho conhecido aqui
+    if arquivo.size > settings.IMPORTACAO_TAMANHO_MAXIMO:
+        messages.error(request, _mensagem_tamanho_maximo())
+        return redirect('admin_painel')
+    
+    # .xlsx é um pacote zip: recusa outros formatos já no envio
+    if not zipfile.is_zipfile(arquivo.temporary_file_path()):
+        messages.error(request, 'O arquivo não é uma planilha .xlsx.')
+        return redirect('admin_painel')
+    
+    ImportacaoPlanilha.objects.create(
+        tipo=tipo,
+        nome_arquivo=arquivo.name[:255],
+        conteudo=arquivo.read(),
+        criado_por=request.user,
+    )
+    messages.success(request, f'Planilha "{arquivo.name}" enviada. A importação segue em segundo plano; acompanhe o progresso abaixo.')
+    
+    return redirect('admin_painel')
+
+
+@login_required
+@require_GET
+def htmx_importacoes(request):
+    """
+    Importações recentes com o progresso. Enquanto houver alguma em
+    andamento o fragmento se consulta de novo a cada 2s; as que terminaram
+    desde a última consulta (?acompanhando=ids) geram um aviso.
+    """
+    
+    if not request.user.is_admin:
+        return HttpResponse('Sem permissão', status=403)
+    
+    importacoes = list(ImportacaoPlanilha.objects.defer('conteudo')[:5])
     
-    return redirect('admin_painel')
\ No newline at end of file
+    acompanhando = {int(pk) for pk in request.GET.get('acompanhando', '').split(',') if pk.isdigit()}
+    terminadas = [i for i in importacoes if i.pk in acompanhando and not i.em_andamento]
+    
+    context = {
+        'importacoes': importacoes,
+        'em_andamento': ','.join(str(i.pk) for i in importacoes if i.em_andamento),
+    }
+    response = render(request, 'htmx/importacoes.html', context)
+    
+    if terminadas:
+        avisos = []
+        for i in terminadas:
+            if i.status == 'FALHOU':
+                avisos.append(f'{i.nome_arquivo}: falhou.')
+            elif i.total_erros:
+                avisos.append(f'{i.nome_arquivo}: {i.total_importados} registros importados/atualizados, {i.total_erros} erros.')
+            else:
+                avisos.append(f'{i.nome_arquivo}: {i.total_importados} registros importados/atualizados.')
+        falhou = any(i.status == 'FALHOU' or i.total_erros for i in terminadas)
+        response['HX-Trigger'] = json.dumps({
+            'sigem:mensagem': {'tipo': 'warning' if falhou else 'success', 'texto': ' '.join(avisos)},
+        })
+    return response